@@ -1,78 +1,105 @@
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
+import dj_database_url
 import os
 
 
 load_dotenv()
 X_API_KEY = os.getenv("X-API-KEY")
+# Проверенные ключи из реестра (core.ApiKey) кэшируются в процессе;
+# отзыв ключа вступает в силу не позже чем через TTL секунд
+API_KEY_CACHE_TTL = float(os.getenv('API_KEY_CACHE_TTL', '5'))
+API_KEY_CACHE_MAX_ENTRIES = int(os.getenv('API_KEY_CACHE_MAX_ENTRIES', '10000'))
+# Неизвестные ключи — в своём, меньшем кэше, чтобы не вытесняли настоящие
+API_KEY_NEGATIVE_CACHE_MAX_ENTRIES = int(
+    os.getenv('API_KEY_NEGATIVE_CACHE_MAX_ENTRIES', '1000'))
+
+# Token bucket на пару (ключ, маршрут): RATE_LIMIT_BURST запросов подряд,
+# дальше RATE_LIMIT_RATE в секунду. Бэкенд memory — свой лимит у каждого
+# процесса, cache — общий через кэш RATE_LIMIT_CACHE_ALIAS.
+# Для общего X_API_KEY ведро своё у каждого адреса клиента; за прокси
+# адрес берётся из RATE_LIMIT_CLIENT_HEADER (например, X-Forwarded-For):
+# тот, что дописал RATE_LIMIT_TRUSTED_PROXIES-й с конца доверенный прокси
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True') == 'True'
+RATE_LIMIT_CLIENT_HEADER = os.getenv('RATE_LIMIT_CLIENT_HEADER', '')
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '1'))
+RATE_LIMIT_RATE = float(os.getenv('RATE_LIMIT_RATE', '20'))
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '100'))
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_CACHE_ALIAS = os.getenv('RATE_LIMIT_CACHE_ALIAS', 'default')
+RATE_LIMIT_MAX_BUCKETS = 100000
+# Тяжёлые маршруты (по имени из core/urls.py): (запросов в секунду, ведро)
+RATE_LIMIT_ROUTES = {
+    'export': (0.1, 3),
+    'search': (5, 20),
+    # Проверка ключей, которых нет в кэше (ведро на адрес клиента)
+    'api-key-lookup': (1, 20),
+}
 admin_password = os.getenv("admin_password")
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 APPEND_SLASH = False
 
+# Логи пишутся фоновым потоком: запросы только кладут записи в очередь.
+# LOG_FILE='' — без файла, JSON в консоль (контейнер с несколькими
+# воркерами gunicorn: один файл на всех ротируется с потерей записей)
+LOG_FILE = os.getenv('LOG_FILE', 'logs/django.log')
+LOG_INFO_SAMPLE_RATE = float(os.getenv('LOG_INFO_SAMPLE_RATE', '1.0'))
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {message}',
-            'style': '{',
-        },
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
+    'filters': {
+        'info_sampling': {
+            '()': 'core.log.SamplingFilter',
+            'rate': LOG_INFO_SAMPLE_RATE,
         },
     },
     'handlers': {
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(BASE_DIR, 'logs/django.log'),
-            'formatter': 'verbose',
-        },
-        'console': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+        'queue': {
+            '()': 'core.log.NonBlockingQueueHandler',
+            'filename': os.path.join(BASE_DIR, LOG_FILE) if LOG_FILE else None,
+            'max_bytes': LOG_MAX_BYTES,
+            'backup_count': LOG_BACKUP_COUNT,
+            'console': os.getenv('LOG_CONSOLE', 'True') == 'True',
+            'filters': ['info_sampling'],
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': True,
         },
         'core': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
             'level': 'DEBUG',
             'propagate': True,
         },
     },
 }
 
-# Настройки для тестовой базы данных
-if os.environ.get('POSTGRES_DB', '').endswith('_test'):
-    DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.postgresql',
-            'NAME': os.environ.get('POSTGRES_DB', 'test_test'),
-            'USER': os.environ.get('POSTGRES_USER', 'django_user_test'),
-            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'admin123_test'),
-            'HOST': os.environ.get('POSTGRES_HOST', 'db_test'),
-            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
-        }
-    }
-
 # Создаем папку для логов если ее нет
-LOG_DIR = os.path.join(BASE_DIR, 'logs')
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
+if LOG_FILE:
+    LOG_DIR = os.path.dirname(os.path.join(BASE_DIR, LOG_FILE))
+    if not os.path.exists(LOG_DIR):
+        os.makedirs(LOG_DIR)
 
-SECRET_KEY = 'django-insecure-^c=k#&t07s_*!j0njs$^=kpez=pl$4wrzo!jr^vqw9b7%^zh+-'
+# В продакшене DEBUG=False: при DEBUG Django хранит каждый выполненный
+# SQL-запрос в памяти процесса
+DEBUG = os.getenv('DEBUG', 'True') == 'True'
 
-DEBUG = True
+# Ключ из репозитория годится только для отладки: без DEBUG он обязателен
+SECRET_KEY = os.getenv('SECRET_KEY')
+if not SECRET_KEY:
+    if not DEBUG:
+        raise ImproperlyConfigured('При DEBUG=False нужно задать SECRET_KEY')
+    SECRET_KEY = 'django-insecure-^c=k#&t07s_*!j0njs$^=kpez=pl$4wrzo!jr^vqw9b7%^zh+-'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.getenv('ALLOWED_HOSTS', '').split(',') if host]
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -85,6 +112,106 @@ INSTALLED_APPS = [
     'core'
 ]
 
+# Курсорная пагинация GET /api/questions
+QUESTIONS_PAGE_SIZE = int(os.getenv('QUESTIONS_PAGE_SIZE', '50'))
+QUESTIONS_MAX_PAGE_SIZE = int(os.getenv('QUESTIONS_MAX_PAGE_SIZE', '500'))
+
+# Фоновое удаление вопроса (DELETE /api/questions/{id}?mode=purge):
+# ответы удаляются пачками, каждая в своей транзакции
+PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', '5000'))
+
+# Страница ответов в GET /api/questions/{id}
+ANSWERS_PAGE_SIZE = int(os.getenv('ANSWERS_PAGE_SIZE', '100'))
+ANSWERS_MAX_PAGE_SIZE = int(os.getenv('ANSWERS_MAX_PAGE_SIZE', '1000'))
+
+# Лента изменений GET /api/changes: размер пачки и сколько секунд запись
+# журнала «отлёживается», прежде чем попасть в ленту (см. core.changes)
+CHANGES_PAGE_SIZE = int(os.getenv('CHANGES_PAGE_SIZE', '500'))
+CHANGES_MAX_PAGE_SIZE = int(os.getenv('CHANGES_MAX_PAGE_SIZE', '5000'))
+CHANGES_SETTLE_SECONDS = float(os.getenv('CHANGES_SETTLE_SECONDS', '1'))
+
+# Поток новых ответов GET /api/questions/{id}/stream (только под ASGI).
+# PUBSUB_BACKEND: local — события видны в своём процессе, postgres —
+# NOTIFY/LISTEN в канале PUBSUB_CHANNEL, для нескольких воркеров
+PUBSUB_BACKEND = os.getenv('PUBSUB_BACKEND', 'local')
+PUBSUB_CHANNEL = os.getenv('PUBSUB_CHANNEL', 'core_events')
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', '100'))
+SSE_MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', '10000'))
+
+# Буферизованная запись ответов (core.ingest): POST .../answers отвечает
+# 202, а ответы пишутся в БД пачками до INGEST_BATCH_SIZE раз в
+# INGEST_FLUSH_MS мс. INGEST_SPOOL_DIR — каталог файлов очереди, которые
+# переживают падение процесса (пусто — только память)
+ANSWER_WRITE_BEHIND = os.getenv('ANSWER_WRITE_BEHIND', 'False') == 'True'
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', '10000'))
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '500'))
+INGEST_FLUSH_MS = int(os.getenv('INGEST_FLUSH_MS', '50'))
+INGEST_RETRY_SECONDS = float(os.getenv('INGEST_RETRY_SECONDS', '1'))
+INGEST_DRAIN_SECONDS = float(os.getenv('INGEST_DRAIN_SECONDS', '20'))
+INGEST_SPOOL_DIR = os.getenv('INGEST_SPOOL_DIR', '')
+INGEST_SPOOL_FSYNC = os.getenv('INGEST_SPOOL_FSYNC', 'False') == 'True'
+INGEST_STATUS_TTL = int(os.getenv('INGEST_STATUS_TTL', '3600'))
+
+# Размер пачки серверного курсора для GET /api/export и размер блока
+# (в символах), которыми строки уходят клиенту
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+EXPORT_BUFFER_SIZE = int(os.getenv('EXPORT_BUFFER_SIZE', '65536'))
+
+# Пакетное создание: максимум элементов в запросе и размер пачки INSERT
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', '5000'))
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', '500'))
+
+# Кэш GET /api/questions/{id}. По умолчанию locmem (LRU на процесс):
+# запись сбрасывает его только в своём процессе, поэтому с несколькими
+# воркерами задайте общий QUESTION_CACHE_BACKEND и QUESTION_CACHE_LOCATION,
+# например RedisCache или FileBasedCache
+QUESTION_CACHE_ALIAS = 'questions'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    QUESTION_CACHE_ALIAS: {
+        'BACKEND': os.getenv(
+            'QUESTION_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('QUESTION_CACHE_LOCATION', 'questions'),
+        'TIMEOUT': int(os.getenv('QUESTION_CACHE_TTL', '60')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('QUESTION_CACHE_MAX_ENTRIES', '10000')),
+        },
+    },
+}
+
+# Статусы буферизованной записи ответов по tracking_id. С несколькими
+# воркерами нужен общий кэш (INGEST_STATUS_CACHE_BACKEND/LOCATION)
+INGEST_STATUS_CACHE_ALIAS = 'ingest'
+CACHES[INGEST_STATUS_CACHE_ALIAS] = {
+    'BACKEND': os.getenv(
+        'INGEST_STATUS_CACHE_BACKEND',
+        'django.core.cache.backends.locmem.LocMemCache'
+    ),
+    'LOCATION': os.getenv('INGEST_STATUS_CACHE_LOCATION', 'ingest'),
+    'OPTIONS': {
+        'MAX_ENTRIES': int(os.getenv('INGEST_STATUS_MAX_ENTRIES', '100000')),
+    },
+}
+
+# Сжатие ответов (core.middleware.CompressionMiddleware): brotli, если
+# установлен пакет brotli и клиент его принимает, иначе gzip. Обычные
+# ответы — от COMPRESS_MIN_BYTES байт, потоковые — всегда
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '4'))
+
+# Поиск: дальше этого смещения страницы не отдаются
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '1000'))
+
+# Предупреждать об N+1: одинаковый SELECT за запрос не меньше порога раз
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '10'))
+N_PLUS_ONE_WARNINGS = os.getenv('N_PLUS_ONE_WARNINGS', str(DEBUG)) == 'True'
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -92,6 +219,9 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.PrimaryStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -120,16 +250,66 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'Test.wsgi.application'
 
-DATABASES = {
-    'default': {
-         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.environ.get('POSTGRES_DB', 'test'),
-        'USER': os.environ.get('POSTGRES_USER', 'django_user'),
-        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'admin123'),
-        'HOST': os.environ.get('POSTGRES_HOST', 'db'),
-        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+# Соединения с БД живут DB_CONN_MAX_AGE секунд и переиспользуются между
+# запросами (с проверкой живости перед первым запросом). DB_POOL=True
+# включает пул psycopg 3 — тогда CONN_MAX_AGE должен быть 0
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+
+if os.getenv('DATABASE_URL'):
+    DATABASES = {
+        'default': dj_database_url.parse(
+            os.environ['DATABASE_URL'],
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        )
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'test'),
+            'USER': os.environ.get('POSTGRES_USER', 'django_user'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'admin123'),
+            'HOST': os.environ.get('POSTGRES_HOST', 'db'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        }
+    }
+
+# Реплики для чтения: DATABASE_REPLICA_URLS — URL через запятую, алиасы
+# replica1, replica2, ... Чтения GET-представлений распределяются по ним
+# (core.routers); клиент, который только что писал, REPLICA_STICKY_SECONDS
+# секунд читает с основной БД. Недоступная реплика исключается на
+# REPLICA_RETRY_SECONDS секунд
+DATABASE_REPLICAS = []
+for number, url in enumerate(
+        (url for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url),
+        start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dj_database_url.parse(
+        url,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+    )
+    # В тестах реплика — та же тестовая БД, что и default
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+REPLICA_RETRY_SECONDS = float(os.getenv('REPLICA_RETRY_SECONDS', '30'))
+
+if DB_POOL:
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        }
 
 
 AUTH_PASSWORD_VALIDATORS = [
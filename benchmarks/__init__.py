@@ -0,0 +1,3 @@
+"""
+Нагрузочные замеры API. Запуск: python manage.py bench --help
+"""
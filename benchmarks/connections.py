@@ -0,0 +1,90 @@
+"""
+Задержка запроса к БД при разных режимах соединений.
+
+Каждая итерация повторяет то, что Django делает с соединением в HTTP-запросе:
+close_old_connections() по сигналам request_started и request_finished и
+SQL-запрос между ними. Режимы:
+
+- no-persistence: CONN_MAX_AGE=0, новое соединение на каждый запрос;
+- persistent: соединение живёт между запросами, перед первым SQL в
+  запросе проверяется его живость (CONN_HEALTH_CHECKS);
+- pool: пул psycopg 3 (только PostgreSQL с установленным psycopg[pool]).
+
+Для каждого режима создаётся отдельное соединение с копией настроек
+default, так что транзакция прогона сценариев не затрагивается.
+"""
+import copy
+import time
+
+from django.db import connections
+from django.db.utils import load_backend
+
+from .harness import percentile
+
+MODES = {
+    'no-persistence': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False,
+             'OPTIONS': {'pool': {'min_size': 1, 'max_size': 2}}},
+}
+
+
+def pool_supported():
+    if connections['default'].vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    if not is_psycopg3:
+        return False
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _connection_for(mode, overrides):
+    settings_dict = copy.deepcopy(connections['default'].settings_dict)
+    options = overrides.get('OPTIONS', {})
+    settings_dict.update(overrides)
+    settings_dict['OPTIONS'] = {**settings_dict.get('OPTIONS', {}), **options}
+    backend = load_backend(settings_dict['ENGINE'])
+    return backend.DatabaseWrapper(settings_dict, alias=f'bench-{mode}')
+
+
+def _measure(conn, requests):
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        conn.close_if_unusable_or_obsolete()
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        conn.close_if_unusable_or_obsolete()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def compare_connections(requests=200):
+    """
+    p50/p95/среднее (мс) по режимам соединений. Режим, недоступный
+    в этом окружении, возвращается как None
+    """
+    results = {}
+    for mode, overrides in MODES.items():
+        if 'pool' in overrides.get('OPTIONS', {}) and not pool_supported():
+            results[mode] = None
+            continue
+        conn = _connection_for(mode, overrides)
+        try:
+            latencies = sorted(_measure(conn, requests))
+        finally:
+            conn.close()
+            if conn.settings_dict['OPTIONS'].get('pool'):
+                conn.close_pool()
+        results[mode] = {
+            'requests': len(latencies),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        }
+    return results
@@ -0,0 +1,65 @@
+"""
+Сравнение форматов ответа: размер и время кодирования страницы вопросов и
+вопроса с ответами в JSON, колоночном JSON и MessagePack, без сжатия и со
+сжатием gzip / brotli (если установлен).
+
+Строки из БД читаются заранее, замеряется только рендеринг и сжатие.
+"""
+from django.conf import settings
+
+from core.middleware import brotli, compress
+from core.models import Answer, Question
+from core.renderers import COMPACT_RENDERERS, FastJSONRenderer
+from core.serializers import (
+    ANSWER_FIELDS, QUESTION_FIELDS, answer_rows, question_rows
+)
+
+from .harness import best_of
+
+ENCODINGS = ['gzip'] + (['br'] if brotli is not None else [])
+
+
+def _payloads():
+    """Самые большие ответы API: страница списка и вопрос с ответами"""
+    questions = question_rows(list(
+        Question.objects.order_by('created_at', 'id')
+        .values(*QUESTION_FIELDS)[:settings.QUESTIONS_MAX_PAGE_SIZE]))
+    payloads = {'question-list': {'next': None, 'results': questions}}
+
+    busiest = (Question.objects.order_by('-answer_count')
+               .values(*QUESTION_FIELDS).first())
+    if busiest is not None:
+        answers = answer_rows(list(
+            Answer.objects.filter(question_id=busiest['id'])
+            .order_by('created_at', 'id')
+            .values(*ANSWER_FIELDS)[:settings.ANSWERS_MAX_PAGE_SIZE]))
+        payloads['question-detail'] = {
+            'question': question_rows([busiest])[0],
+            'answers': answers,
+            'next': None,
+        }
+    return payloads
+
+
+def compare_formats(repeat=5):
+    """
+    {ответ: {формат: {bytes, encode_ms, <сжатие>_bytes, <сжатие>_ms}}};
+    время сжатия — поверх кодирования
+    """
+    renderers = [FastJSONRenderer, *COMPACT_RENDERERS]
+    results = {}
+    for name, data in _payloads().items():
+        rows = {}
+        for renderer_class in renderers:
+            renderer = renderer_class()
+            encode_time, body = best_of(lambda: renderer.render(data), repeat)
+            row = {'bytes': len(body),
+                   'encode_ms': round(encode_time * 1000, 3)}
+            for encoding in ENCODINGS:
+                compress_time, compressed = best_of(
+                    lambda: compress(encoding, body), repeat)
+                row[f'{encoding}_bytes'] = len(compressed)
+                row[f'{encoding}_ms'] = round(compress_time * 1000, 3)
+            rows[renderer_class.format] = row
+        results[name] = rows
+    return results
@@ -0,0 +1,263 @@
+"""
+Прогон сценариев по всем маршрутам API и сбор метрик.
+
+Каждый сценарий — функция, которая по контексту (выборка id вопросов,
+ответов, генератор случайных чисел) возвращает запрос (метод, путь, тело).
+Клиент — тестовый клиент Django (в процессе, со счётчиком SQL-запросов)
+или настоящий HTTP-сервер (urllib, без счётчика запросов).
+"""
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.ingest import WRITTEN, set_status
+
+from .seed import SEED_PREFIX
+
+
+class Context:
+    """Данные, на которых работают сценарии"""
+
+    def __init__(self, question_ids, answer_ids, rng):
+        self.question_ids = list(question_ids)
+        self.answer_ids = list(answer_ids)
+        self.rng = rng
+        self._tracking_id = None
+
+    def question(self):
+        return self.rng.choice(self.question_ids)
+
+    def pop_question(self):
+        return self.question_ids.pop(self.rng.randrange(len(self.question_ids)))
+
+    def pop_answer(self):
+        return self.answer_ids.pop(self.rng.randrange(len(self.answer_ids)))
+
+    def tracking_id(self):
+        """
+        tracking_id записанного ответа для /ingest/{id}. Статус кладётся в
+        кэш INGEST_STATUS_CACHE_ALIAS этого процесса: с --live-url кэш
+        должен быть общим с сервером
+        """
+        if self._tracking_id is None:
+            self._tracking_id = 'bench'
+            set_status(self._tracking_id, {
+                'status': WRITTEN, 'question_id': self.question(),
+                'answer_id': self.rng.choice(self.answer_ids)})
+        return self._tracking_id
+
+
+def _body(text):
+    return {'text': f"{SEED_PREFIX} {text}"}
+
+
+# Имя сценария -> функция(ctx) -> (метод, путь, тело)
+SCENARIOS = {
+    'question-list': lambda ctx: (
+        'GET', reverse('question-list'), None),
+    'question-create': lambda ctx: (
+        'POST', reverse('question-list'), _body('new question')),
+    'question-bulk-create': lambda ctx: (
+        'POST', reverse('question-bulk-create'),
+        [_body(f'bulk question {i}') for i in range(100)]),
+    'question-detail': lambda ctx: (
+        'GET', reverse('question-detail', kwargs={'id': ctx.question()}), None),
+    'question-delete': lambda ctx: (
+        'DELETE', reverse('question-detail', kwargs={'id': ctx.pop_question()}),
+        None),
+    'answer-create': lambda ctx: (
+        'POST', reverse('answer-create', kwargs={'id': ctx.question()}),
+        _body('new answer')),
+    'answer-bulk-create': lambda ctx: (
+        'POST', reverse('answer-bulk-create', kwargs={'id': ctx.question()}),
+        [_body(f'bulk answer {i}') for i in range(100)]),
+    'answer-detail': lambda ctx: (
+        'GET', reverse('answer-detail',
+                       kwargs={'answer_id': ctx.rng.choice(ctx.answer_ids)}),
+        None),
+    'answer-delete': lambda ctx: (
+        'DELETE', reverse('answer-detail',
+                          kwargs={'answer_id': ctx.pop_answer()}),
+        None),
+    'ingest-status': lambda ctx: (
+        'GET', reverse('ingest-status',
+                       kwargs={'tracking_id': ctx.tracking_id()}),
+        None),
+    'export': lambda ctx: (
+        'GET', reverse('export') + '?format=ndjson', None),
+    'search': lambda ctx: (
+        'GET', reverse('search') + '?q=question', None),
+    'changes': lambda ctx: (
+        'GET', reverse('changes'), None),
+    'async-question-list': lambda ctx: (
+        'GET', reverse('async-question-list'), None),
+    'async-question-detail': lambda ctx: (
+        'GET', reverse('async-question-detail', kwargs={'id': ctx.question()}),
+        None),
+    'async-question-delete': lambda ctx: (
+        'DELETE', reverse('async-question-detail',
+                          kwargs={'id': ctx.pop_question()}),
+        None),
+    'async-answer-create': lambda ctx: (
+        'POST', reverse('async-answer-create', kwargs={'id': ctx.question()}),
+        _body('new async answer')),
+    'async-answer-detail': lambda ctx: (
+        'GET', reverse('async-answer-detail',
+                       kwargs={'answer_id': ctx.rng.choice(ctx.answer_ids)}),
+        None),
+    'async-answer-delete': lambda ctx: (
+        'DELETE', reverse('async-answer-detail',
+                          kwargs={'answer_id': ctx.pop_answer()}),
+        None),
+    'metrics': lambda ctx: (
+        'GET', reverse('metrics'), None),
+}
+
+# Маршруты без сценария: у потока SSE нет конца, по которому мерить задержку
+UNMEASURED = {'answer-stream'}
+
+# Удаляющие сценарии расходуют данные, остальные гоняем в полный объём
+QUESTION_DELETES = {'question-delete', 'async-question-delete'}
+ANSWER_DELETES = {'answer-delete', 'async-answer-delete'}
+DESTRUCTIVE = QUESTION_DELETES | ANSWER_DELETES
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1,
+                max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def best_of(call, repeat):
+    """Лучшее из repeat время вызова call (в секундах) и его результат"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def summarize(latencies, queries, elapsed, statuses):
+    """Сводка по одному сценарию; время в миллисекундах"""
+    ordered = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'queries_per_request': (
+            round(statistics.fmean(queries), 2) if queries else None),
+        'errors': sum(1 for code in statuses if code >= 400),
+    }
+
+
+class ClientDriver:
+    """Запросы через тестовый клиент Django в текущем процессе"""
+    counts_queries = True
+
+    def __init__(self, api_key):
+        self.client = Client(HTTP_X_API_KEY=api_key)
+
+    def __call__(self, method, path, body):
+        kwargs = {}
+        if body is not None:
+            kwargs = {'data': json.dumps(body),
+                      'content_type': 'application/json'}
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method.lower())(path, **kwargs)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        return response.status_code, len(ctx.captured_queries)
+
+
+class HttpDriver:
+    """Запросы к настоящему серверу по HTTP"""
+    counts_queries = False
+
+    def __init__(self, base_url, api_key):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+
+    def __call__(self, method, path, body):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={'X-API-KEY': self.api_key,
+                     'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as error:
+            return error.code, None
+
+
+def run_scenario(driver, scenario, ctx, requests, concurrency=1):
+    """Выполняет сценарий requests раз и возвращает сводку"""
+    build = SCENARIOS[scenario]
+    calls = [build(ctx) for _ in range(requests)]
+
+    def timed(call):
+        started = time.perf_counter()
+        status, queries = driver(*call)
+        return time.perf_counter() - started, status, queries
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(timed, calls))
+    else:
+        results = [timed(call) for call in calls]
+    elapsed = time.perf_counter() - started
+
+    return summarize(
+        [latency for latency, _, _ in results],
+        [queries for _, _, queries in results if queries is not None],
+        elapsed,
+        [status for _, status, _ in results],
+    )
+
+
+def compare(results, baseline, threshold):
+    """
+    Сравнивает с сохранённым прогоном. Регрессия — p95 или число запросов
+    выросли больше чем на threshold (доля), либо упала пропускная способность
+    """
+    regressions = []
+    for scenario, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(scenario)
+        if not previous:
+            continue
+        limit = 1 + threshold
+        if current['p95_ms'] > previous['p95_ms'] * limit:
+            regressions.append(
+                f"{scenario}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if (current['queries_per_request'] is not None
+                and previous.get('queries_per_request') is not None
+                and current['queries_per_request']
+                > previous['queries_per_request'] * limit):
+            regressions.append(
+                f"{scenario}: запросов к БД {previous['queries_per_request']}"
+                f" -> {current['queries_per_request']}")
+        if (current['throughput_rps'] and previous.get('throughput_rps')
+                and current['throughput_rps'] * limit
+                < previous['throughput_rps']):
+            regressions.append(
+                f"{scenario}: rps {previous['throughput_rps']}"
+                f" -> {current['throughput_rps']}")
+    return regressions
@@ -0,0 +1,74 @@
+import random
+
+from django.db import transaction
+
+from core.changes import questions_deleted
+from core.counters import recompute
+from core.models import Change, Question, Answer
+from core.utils import get_system_user_id
+
+# По этому префиксу данные бенчмарка потом удаляются
+SEED_PREFIX = '[bench]'
+
+
+def answer_counts(questions, max_answers, skew, rng):
+    """
+    Неравномерное число ответов: большинство вопросов почти без ответов,
+    немногие «вирусные» получают до max_answers (распределение Парето)
+    """
+    for _ in range(questions):
+        yield min(max_answers, int(rng.paretovariate(skew)) - 1)
+
+
+def seed(questions, max_answers=50, skew=1.2, batch_size=5000, random_seed=42,
+         sample_size=10000):
+    """
+    Заполняет БД вопросами и ответами через bulk_create пачками.
+
+    Возвращает случайную выборку id созданных вопросов (не больше
+    sample_size), чтобы на 10M строк не держать в памяти все id.
+    """
+    rng = random.Random(random_seed)
+    user_id = get_system_user_id()
+    question_ids = []
+    seen = 0
+    with transaction.atomic():
+        for start in range(0, questions, batch_size):
+            size = min(batch_size, questions - start)
+            created = Question.objects.bulk_create(
+                Question(text=f"{SEED_PREFIX} question {start + i}")
+                for i in range(size)
+            )
+            answers = [
+                Answer(question_id_id=question.id, user_id_id=user_id,
+                       text=f"{SEED_PREFIX} answer {j}")
+                for question, count in zip(
+                    created, answer_counts(size, max_answers, skew, rng))
+                for j in range(count)
+            ]
+            Answer.objects.bulk_create(answers, batch_size=batch_size)
+            recompute(Question.objects.filter(
+                id__gte=created[0].id, id__lte=created[-1].id))
+
+            for question in created:
+                seen += 1
+                if len(question_ids) < sample_size:
+                    question_ids.append(question.id)
+                else:
+                    slot = rng.randrange(seen)
+                    if slot < sample_size:
+                        question_ids[slot] = question.id
+    return question_ids
+
+
+def cleanup():
+    """Удаляет всё, что создал seed() и сами сценарии"""
+    questions = Question.objects.filter(text__startswith=SEED_PREFIX)
+    with transaction.atomic():
+        # Клиенты ленты изменений могли успеть получить созданное
+        # сценариями — им нужны надгробия. Данные seed() в журнал не попадают
+        questions_deleted(
+            Change.objects.filter(question_id__in=questions.values('id'))
+            .values_list('question_id', flat=True).distinct())
+        Answer.objects.filter(text__startswith=SEED_PREFIX).delete()
+        return questions.delete()[0]
@@ -0,0 +1,34 @@
+"""
+Сравнение сериализации страницы вопросов: ModelSerializer + JSONRenderer
+DRF против .values() + question_rows + FastJSONRenderer.
+
+Замеряется только сериализация: строки из БД читаются заранее.
+"""
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Question
+from core.renderers import FastJSONRenderer
+from core.serializers import QUESTION_FIELDS, QuestionSerializer, question_rows
+
+from .harness import best_of
+
+
+def compare_serialization(limit=10000, repeat=3):
+    queryset = Question.objects.order_by('created_at', 'id')[:limit]
+    objects = list(queryset)
+    rows = list(queryset.values(*QUESTION_FIELDS))
+
+    drf_time, drf_body = best_of(
+        lambda: JSONRenderer().render(
+            QuestionSerializer(objects, many=True).data), repeat)
+    copies = [[dict(row) for row in rows] for _ in range(repeat)]
+    fast_time, fast_body = best_of(
+        lambda: FastJSONRenderer().render(question_rows(copies.pop())), repeat)
+
+    return {
+        'rows': len(objects),
+        'drf_ms': round(drf_time * 1000, 3),
+        'fast_ms': round(fast_time * 1000, 3),
+        'speedup': round(drf_time / fast_time, 2) if fast_time else None,
+        'identical': drf_body == fast_body,
+    }
@@ -0,0 +1,404 @@
+"""
+Асинхронные (ASGI) варианты эндпоинтов вопросов и ответов.
+
+Работают на async ORM Django и не занимают поток на время ожидания БД,
+поэтому запускать их имеет смысл под uvicorn/daphne через Test.asgi.
+Формат ответов совпадает с синхронными представлениями из core.views.
+"""
+import asyncio
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from .models import Question, Answer
+from core.serializers import (
+    ANSWER_FIELDS, QUESTION_FIELDS, AnswerSerializer, QuestionSerializer,
+    answer_page_fields, answer_rows, question_rows, split_answer_page
+)
+from .cache import aget_question_payload, ainvalidate_question
+from .changes import answers_created, questions_created
+from .counters import answers_added
+from .deletion import (
+    delete_answer, delete_question, schedule_purge, start_purge
+)
+from .conditional import (
+    make_etag, not_modified, question_versions, set_validators, timestamp
+)
+from .pagination import (
+    InvalidCursor, akeyset_page, answer_page_params, get_page_size
+)
+from .pubsub import (
+    ANSWER, QUESTION_DELETED, backend, encode, hub, publish_answers
+)
+from .routers import is_sticky
+from .utils import async_api_key_required, get_system_user_id, json_response
+
+logger = logging.getLogger(__name__)
+
+
+def parse_json(request):
+    """Тело запроса как JSON; None, если разобрать не удалось"""
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+class AsyncQuestionListView(View):
+    @async_api_key_required
+    async def post(self, request):
+        """
+        POST /async/questions — создать новый вопрос
+        """
+        data = parse_json(request)
+        logger.info(
+            "POST /async/questions - создание вопроса. Данные: %s", data)
+
+        serializer = QuestionSerializer(data=data)
+        if not serializer.is_valid():
+            logger.warning("Ошибка валидации вопроса: %s", serializer.errors)
+            return json_response(serializer.errors,
+                                 status=status.HTTP_400_BAD_REQUEST)
+
+        question = await sync_to_async(self._create)(serializer.validated_data)
+        logger.info("Вопрос создан успешно. ID: %s", question.id)
+        return json_response(QuestionSerializer(question).data,
+                             status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _create(validated_data):
+        # Вопрос и запись журнала изменений — одной транзакцией
+        with transaction.atomic():
+            question = Question.objects.create(**validated_data)
+            questions_created([question.id])
+        return question
+
+    @async_api_key_required
+    async def get(self, request):
+        """
+        GET /async/questions — список вопросов постранично
+        """
+        logger.info("GET /async/questions - получение списка вопросов")
+
+        try:
+            questions, next_cursor = await akeyset_page(
+                Question.objects.values(*QUESTION_FIELDS),
+                request.GET.get('cursor'),
+                get_page_size(request)
+            )
+        except InvalidCursor:
+            logger.warning("Передан некорректный курсор пагинации")
+            return json_response({"error": "Некорректный курсор"},
+                                 status=status.HTTP_400_BAD_REQUEST)
+
+        # Без Last-Modified, как и в QuestionListView
+        etag = make_etag(
+            'questions', next_cursor, *question_versions(questions))
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        logger.info("Найдено %s вопросов на странице", len(questions))
+        return set_validators(json_response({
+            "next": next_cursor,
+            "results": question_rows(questions)
+        }), etag)
+
+
+class AsyncQuestionDetailView(View):
+    @async_api_key_required
+    async def get(self, request, id):
+        """
+        GET /async/questions/{id} — получить вопрос и страницу ответов на него
+        """
+        logger.info(
+            "GET /async/questions/%s - получение вопроса с ответами", id)
+
+        cursor, page_size, with_username, default_page = (
+            answer_page_params(request))
+        try:
+            def load():
+                return self._load_payload(id, cursor, page_size, with_username)
+
+            # «Липкий» клиент читает мимо кэша, как и в QuestionDetailView
+            if default_page and not is_sticky(request):
+                payload = await aget_question_payload(id, load)
+            else:
+                payload = await load()
+        except InvalidCursor:
+            logger.warning("Передан некорректный курсор ответов")
+            return json_response({"error": "Некорректный курсор"},
+                                 status=status.HTTP_400_BAD_REQUEST)
+        except Question.DoesNotExist:
+            logger.warning("Вопрос с id=%s не найден", id)
+            return json_response({"error": f"Вопрос id={id} не найден!"},
+                                 status=status.HTTP_404_NOT_FOUND)
+
+        cached = not_modified(request, payload['etag'])
+        if cached is not None:
+            return cached
+
+        logger.info(
+            "Вопрос %s найден. Ответов на странице: %s", id, len(payload['data']['answers']))
+        return set_validators(json_response(payload['data']), payload['etag'])
+
+    @staticmethod
+    async def _load_payload(id, cursor, page_size, with_username):
+        """То же, что QuestionDetailView._load_payload, на async ORM"""
+        rows, next_cursor = await akeyset_page(
+            Answer.objects.filter(question_id=id,
+                                  question_id__purge_started_at__isnull=True)
+            .values(*answer_page_fields(with_username)),
+            cursor, page_size
+        )
+        question, answers = split_answer_page(rows, with_username)
+        if question is None:
+            question = await Question.objects.values(
+                *QUESTION_FIELDS).aget(id=id)
+        etag = make_etag(
+            'question', question['id'], question['created_at'].isoformat(),
+            question['answer_count'], cursor, next_cursor, with_username,
+            *(a['id'] for a in answers)
+        )
+        return {
+            "etag": etag,
+            "data": {
+                "question": question_rows([question])[0],
+                "answers": answer_rows(answers),
+                "next": next_cursor
+            }
+        }
+
+    @async_api_key_required
+    async def delete(self, request, id):
+        """
+        DELETE /async/questions/{id} — удалить вопрос (вместе с ответами),
+        ?mode=purge — удалить в фоне
+        """
+        logger.info("DELETE /async/questions/%s - удаление вопроса", id)
+
+        if request.GET.get('mode') == 'purge':
+            if not await sync_to_async(start_purge)(id):
+                return self._not_found(id)
+            await ainvalidate_question(id)
+            await sync_to_async(schedule_purge)(id)
+            logger.info("Вопрос %s скрыт, ответы удаляются в фоне", id)
+            return json_response({"id": id, "status": "purging"},
+                                 status=status.HTTP_202_ACCEPTED)
+
+        answers_count = await sync_to_async(delete_question)(id)
+        if answers_count is None:
+            return self._not_found(id)
+        await ainvalidate_question(id)
+        logger.info("Вопрос %s удален. Удалено ответов: %s", id, answers_count)
+        return json_response(None, status=status.HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    def _not_found(id):
+        logger.warning("Попытка удаления несуществующего вопроса id=%s", id)
+        return json_response({"error": f"Вопроса с id={id} не найдено!"},
+                             status=status.HTTP_404_NOT_FOUND)
+
+
+class AsyncAnswerCreateView(View):
+    @async_api_key_required
+    async def post(self, request, id):
+        """
+        POST /async/questions/{id}/answers — добавить ответ к вопросу
+        """
+        data = parse_json(request)
+        logger.info(
+            "POST /async/questions/%s/answers - создание ответа. Данные: %s", id, data)
+
+        serializer = AnswerSerializer(data=data)
+        if not serializer.is_valid():
+            logger.warning("Ошибка валидации ответа: %s", serializer.errors)
+            return json_response(serializer.errors,
+                                 status=status.HTTP_400_BAD_REQUEST)
+
+        user_id = await sync_to_async(get_system_user_id)()
+        try:
+            # Транзакции в async ORM нет: INSERT и UPDATE счётчиков идут
+            # одним синхронным блоком в потоке соединения
+            answer = await sync_to_async(self._create)(
+                id, user_id, serializer.validated_data)
+        except Question.DoesNotExist:
+            logger.warning(
+                "Попытка создания ответа для несуществующего вопроса id=%s", id)
+            return json_response({"error": f"Вопрос с id={id} не был найден"},
+                                 status=status.HTTP_404_NOT_FOUND)
+        except IntegrityError:
+            get_system_user_id.cache_clear()
+            logger.error(
+                "Системный пользователь не найден при создании ответа для вопроса %s", id)
+            return json_response(
+                {"error": "Произошла ошибка при создании ответа"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        await ainvalidate_question(id)
+        logger.info(
+            "Ответ создан успешно. ID ответа: %s, вопрос: %s", answer.id, id)
+        return json_response(AnswerSerializer(answer).data,
+                             status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _create(question_id, user_id, validated_data):
+        with transaction.atomic():
+            answer = Answer.objects.create(
+                question_id_id=question_id,
+                user_id_id=user_id,
+                **validated_data
+            )
+            if not answers_added(question_id, answer.created_at):
+                raise Question.DoesNotExist
+            answers_created(question_id, [answer.id])
+            publish_answers(question_id, [answer])
+        return answer
+
+
+class AsyncAnswerDetailView(View):
+    @async_api_key_required
+    async def get(self, request, answer_id):
+        """
+        GET /async/answers/{id} — получить конкретный ответ
+        """
+        logger.info("GET /async/answers/%s - получение ответа", answer_id)
+
+        try:
+            answer = await Answer.objects.values(*ANSWER_FIELDS).aget(
+                id=answer_id)
+        except Answer.DoesNotExist:
+            logger.warning("Ответ с id=%s не найден", answer_id)
+            return json_response(
+                {"error": f"Ответ с id={answer_id} не был найден."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        etag = make_etag(
+            'answer', answer['id'], answer['created_at'].isoformat())
+        last_modified = timestamp(answer['created_at'])
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+
+        logger.info("Ответ %s найден", answer_id)
+        return set_validators(json_response(answer_rows([answer])[0]),
+                              etag, last_modified)
+
+    @async_api_key_required
+    async def delete(self, request, answer_id):
+        """
+        DELETE /async/answers/{id} — удалить ответ
+        """
+        logger.info("DELETE /async/answers/%s - удаление ответа", answer_id)
+
+        question_id = await sync_to_async(delete_answer)(answer_id)
+        if question_id is None:
+            logger.warning(
+                "Попытка удаления несуществующего ответа id=%s", answer_id)
+            return json_response(
+                {"error": f"Ответ с id={answer_id} не был найден."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        await ainvalidate_question(question_id)
+        logger.info("Ответ %s удален успешно", answer_id)
+        return json_response(None, status=status.HTTP_204_NO_CONTENT)
+
+
+class AnswerStreamView(View):
+    @async_api_key_required
+    async def get(self, request, id):
+        """
+        GET /questions/{id}/stream — новые ответы на вопрос (Server-Sent Events).
+
+        Соединение держится открытым; ответы приходят из core.pubsub сразу
+        после коммита, без опроса БД. С заголовком Last-Event-ID сначала
+        досылаются ответы, пропущенные за время переподключения
+        """
+        logger.info("GET /questions/%s/stream - подписка на ответы", id)
+
+        if not isinstance(request, ASGIRequest):
+            # Под WSGI бесконечный поток занял бы поток воркера навсегда
+            return json_response(
+                {"error": "Поток ответов доступен только при запуске под ASGI"},
+                status=status.HTTP_501_NOT_IMPLEMENTED)
+        if not await Question.objects.filter(id=id).aexists():
+            logger.warning("Вопрос с id=%s не найден", id)
+            return json_response({"error": f"Вопрос id={id} не найден!"},
+                                 status=status.HTTP_404_NOT_FOUND)
+
+        # Подписываемся до чтения пропущенного, чтобы не потерять ответы
+        # между запросом и подпиской
+        subscription = hub.subscribe(id)
+        if subscription is None:
+            logger.warning("Превышено число подписчиков: %s",
+                           settings.SSE_MAX_SUBSCRIBERS)
+            response = json_response(
+                {"error": "Слишком много подписчиков, повторите позже"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = '5'
+            return response
+        try:
+            backend().ensure_listening()
+            backlog = await self._backlog(
+                id, request.headers.get('Last-Event-ID'))
+        except BaseException:
+            hub.unsubscribe(subscription)
+            raise
+
+        response = StreamingHttpResponse(
+            self._events(subscription, backlog),
+            content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx не должен буферизовать поток
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @staticmethod
+    async def _backlog(question_id, last_event_id):
+        try:
+            last_id = int(last_event_id)
+        except (TypeError, ValueError):
+            return []
+        rows = [row async for row in
+                Answer.objects.filter(question_id=question_id, id__gt=last_id)
+                .order_by('id').values(*ANSWER_FIELDS)
+                [:settings.ANSWERS_MAX_PAGE_SIZE]]
+        return [(ANSWER, row['id'], encode(row)) for row in answer_rows(rows)]
+
+    @staticmethod
+    def _format(event, event_id, data):
+        head = f"id: {event_id}\n" if event_id is not None else ''
+        return f"{head}event: {event}\ndata: {data}\n\n"
+
+    async def _events(self, subscription, backlog):
+        last_id = 0
+        try:
+            yield f"retry: {int(settings.SSE_HEARTBEAT_SECONDS * 1000)}\n\n"
+            for event, event_id, data in backlog:
+                last_id = event_id
+                yield self._format(event, event_id, data)
+            while not (subscription.overflowed and subscription.queue.empty()):
+                try:
+                    event, event_id, data = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Комментарий держит соединение через прокси и
+                    # обнаруживает отключившихся клиентов
+                    yield ": ping\n\n"
+                    continue
+                if event_id is not None and event_id <= last_id:
+                    continue  # уже отправлен из backlog
+                yield self._format(event, event_id, data)
+                if event == QUESTION_DELETED:
+                    break
+        finally:
+            hub.unsubscribe(subscription)
@@ -0,0 +1,207 @@
+"""
+Проверка API-ключей.
+
+Ключи клиентов хранятся в core.ApiKey в виде SHA-256. Результат проверки
+кэшируется в процессе на API_KEY_CACHE_TTL секунд, поэтому обычный запрос
+обходится без SQL. Найденные ключи и неизвестные лежат в разных кэшах:
+поток случайных ключей не вытесняет настоящие. Поход в БД за ключом,
+которого нет ни в одном кэше, стоит клиенту токен из ведра
+ratelimit.LOOKUP_ROUTE (на адрес клиента) — перебор ключей упирается
+в 429, а не в базу. Общий ключ X_API_KEY из настроек по-прежнему принимается.
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed, Throttled
+from rest_framework.permissions import BasePermission
+
+from . import ratelimit
+from .models import ApiKey
+
+# Значение request.auth для общего ключа из настроек
+LEGACY_KEY = 'legacy'
+
+_MISSING = object()
+
+
+def hash_key(raw_key):
+    # Ключи случайные и длинные, медленный KDF им не нужен
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+
+def generate_key():
+    return secrets.token_urlsafe(32)
+
+
+class KeyLookupThrottled(Exception):
+    """Клиент исчерпал попытки проверить неизвестный ключ"""
+
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class KeyCache:
+    """
+    LRU-кэш hash -> id ключа (None — ключа нет или он отозван) с TTL.
+    Размер берётся из настройки max_entries_setting
+    """
+
+    def __init__(self, max_entries_setting):
+        self._lock = threading.Lock()
+        self._max_entries_setting = max_entries_setting
+        self._entries = OrderedDict()
+
+    def get(self, key_hash):
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None:
+                return _MISSING
+            key_id, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key_hash]
+                return _MISSING
+            self._entries.move_to_end(key_hash)
+            return key_id
+
+    def set(self, key_hash, key_id):
+        with self._lock:
+            self._entries[key_hash] = (
+                key_id, time.monotonic() + settings.API_KEY_CACHE_TTL)
+            self._entries.move_to_end(key_hash)
+            max_entries = getattr(settings, self._max_entries_setting)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key_hash):
+        with self._lock:
+            self._entries.pop(key_hash, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+key_cache = KeyCache('API_KEY_CACHE_MAX_ENTRIES')
+# Неизвестные и отозванные ключи — отдельно и в меньшем объёме
+negative_cache = KeyCache('API_KEY_NEGATIVE_CACHE_MAX_ENTRIES')
+
+
+def _legacy_match(raw_key):
+    legacy = settings.X_API_KEY
+    return bool(legacy) and hmac.compare_digest(raw_key.encode(), legacy.encode())
+
+
+def _active_keys(key_hash):
+    return ApiKey.objects.filter(
+        key_hash=key_hash, revoked_at__isnull=True).values_list('id', flat=True)
+
+
+def _cached(key_hash):
+    key_id = key_cache.get(key_hash)
+    if key_id is _MISSING and negative_cache.get(key_hash) is None:
+        return None
+    return key_id
+
+
+def _remember(key_hash, key_id):
+    if key_id is None:
+        negative_cache.set(key_hash, None)
+    else:
+        key_cache.set(key_hash, key_id)
+
+
+def check_key(raw_key, request=None):
+    """
+    Возвращает id ключа из реестра, LEGACY_KEY для общего ключа
+    или None, если ключ неверный. С request поход в БД списывает токен
+    из ведра клиента; пустое ведро — KeyLookupThrottled
+    """
+    if not raw_key:
+        return None
+    if _legacy_match(raw_key):
+        return LEGACY_KEY
+    key_hash = hash_key(raw_key)
+    key_id = _cached(key_hash)
+    if key_id is _MISSING:
+        if request is not None:
+            retry_after = ratelimit.take_lookup(request)
+            if retry_after is not None:
+                raise KeyLookupThrottled(retry_after)
+        key_id = _active_keys(key_hash).first()
+        _remember(key_hash, key_id)
+    return key_id
+
+
+async def acheck_key(raw_key, request=None):
+    """Асинхронный вариант check_key: в БД идёт только при промахе кэша"""
+    if not raw_key:
+        return None
+    if _legacy_match(raw_key):
+        return LEGACY_KEY
+    key_hash = hash_key(raw_key)
+    key_id = _cached(key_hash)
+    if key_id is _MISSING:
+        if request is not None:
+            retry_after = await ratelimit.atake_lookup(request)
+            if retry_after is not None:
+                raise KeyLookupThrottled(retry_after)
+        key_id = await _active_keys(key_hash).afirst()
+        _remember(key_hash, key_id)
+    return key_id
+
+
+def create_key(name):
+    """Создаёт ключ в реестре; возвращает (ApiKey, ключ в открытом виде)"""
+    raw_key = generate_key()
+    api_key = ApiKey.objects.create(
+        name=name, prefix=raw_key[:8], key_hash=hash_key(raw_key))
+    return api_key, raw_key
+
+
+def revoke_key(api_key):
+    """
+    Отзывает ключ. В этом процессе — сразу, в остальных — когда истечёт
+    API_KEY_CACHE_TTL
+    """
+    api_key.revoked_at = timezone.now()
+    api_key.save(update_fields=['revoked_at'])
+    key_cache.discard(api_key.key_hash)
+
+
+class ApiKeyAuthentication(BaseAuthentication):
+    """
+    DRF-аутентификация по заголовку X-API-KEY. request.auth — id ключа
+    (или LEGACY_KEY), пользователь анонимный
+    """
+
+    def authenticate(self, request):
+        raw_key = request.headers.get('X-API-KEY')
+        if not raw_key:
+            return None
+        try:
+            key_id = check_key(raw_key, request)
+        except KeyLookupThrottled as exc:
+            raise Throttled(wait=exc.retry_after)
+        if key_id is None:
+            raise AuthenticationFailed("Неверный API-Ключ")
+        return AnonymousUser(), key_id
+
+    def authenticate_header(self, request):
+        return 'X-API-KEY'
+
+
+class HasApiKey(BasePermission):
+    """Пускает только запросы, прошедшие ApiKeyAuthentication"""
+    message = "Неверный API-Ключ"
+
+    def has_permission(self, request, view):
+        return request.auth is not None
@@ -0,0 +1,78 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_question_cache():
+    """Кэш для вопросов с ответами (алиас из QUESTION_CACHE_ALIAS)"""
+    return caches[settings.QUESTION_CACHE_ALIAS]
+
+
+def question_cache_key(question_id):
+    return f"question-detail:{question_id}"
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_question_payload(question_id, loader):
+    """
+    Read-through: отдаёт сериализованный вопрос с ответами из кэша,
+    при промахе вызывает loader() и кладёт результат в кэш.
+
+    Исключения loader (например, Question.DoesNotExist) пробрасываются,
+    отсутствие вопроса не кэшируется.
+    """
+    cache = get_question_cache()
+    key = question_cache_key(question_id)
+    payload = cache.get(key)
+    if payload is not None:
+        _count('hits')
+        return payload
+
+    _count('misses')
+    payload = loader()
+    cache.set(key, payload)
+    return payload
+
+
+async def aget_question_payload(question_id, loader):
+    """Асинхронный вариант get_question_payload: loader — корутинная функция"""
+    cache = get_question_cache()
+    key = question_cache_key(question_id)
+    payload = await cache.aget(key)
+    if payload is not None:
+        _count('hits')
+        return payload
+
+    _count('misses')
+    payload = await loader()
+    await cache.aset(key, payload)
+    return payload
+
+
+def invalidate_question(question_id):
+    """Сбрасывает закэшированный вопрос после изменения его ответов"""
+    get_question_cache().delete(question_cache_key(question_id))
+
+
+async def ainvalidate_question(question_id):
+    await get_question_cache().adelete(question_cache_key(question_id))
+
+
+def cache_stats():
+    """Счётчики попаданий и промахов кэша вопросов"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
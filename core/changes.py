@@ -0,0 +1,125 @@
+"""
+Журнал изменений для дельта-синхронизации: GET /api/changes?since=<курсор>.
+
+Создание и удаление вопросов и ответов дописывают строку в core.Change в
+той же транзакции, что и сама запись. Исключение — delete_question: его
+надгробие пишется отдельной транзакцией сразу после COMMIT удаления. Курсор — id последней полученной
+записи. Удаление вопроса даёт одно «надгробие»: его ответы уходят вместе
+с ним и отдельных записей не получают.
+
+id выдаётся при INSERT, а виден после COMMIT, поэтому запись с меньшим id
+может появиться позже записи с большим. Чтобы клиент её не перескочил,
+лента отдаёт только записи старше CHANGES_SETTLE_SECONDS: транзакции,
+которые пишут в журнал, короче этого окна. Долгие удаления поэтому пишут
+в журнал не в своей транзакции, а после неё.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Answer, Change, Question
+from .serializers import ANSWER_FIELDS, QUESTION_FIELDS, answer_rows, question_rows
+
+
+class InvalidSince(ValueError):
+    """Курсор ленты не удалось разобрать"""
+
+
+def questions_created(question_ids):
+    Change.objects.bulk_create([
+        Change(kind=Change.QUESTION, action=Change.CREATED,
+               object_id=question_id, question_id=question_id)
+        for question_id in question_ids
+    ])
+
+
+def questions_deleted(question_ids):
+    Change.objects.bulk_create([
+        Change(kind=Change.QUESTION, action=Change.DELETED,
+               object_id=question_id, question_id=question_id)
+        for question_id in question_ids
+    ])
+
+
+def answers_created(question_id, answer_ids):
+    Change.objects.bulk_create([
+        Change(kind=Change.ANSWER, action=Change.CREATED,
+               object_id=answer_id, question_id=question_id)
+        for answer_id in answer_ids
+    ])
+
+
+def answer_deleted(answer_id, question_id):
+    Change.objects.create(kind=Change.ANSWER, action=Change.DELETED,
+                          object_id=answer_id, question_id=question_id)
+
+
+def parse_since(value):
+    """
+    since из запроса: число (id записи), пусто — с начала журнала,
+    'head' — с текущего конца (для начальной выгрузки через /export)
+    """
+    if not value:
+        return 0
+    if value == 'head':
+        return Change.objects.aggregate(head=Max('id'))['head'] or 0
+    try:
+        since = int(value)
+    except ValueError:
+        raise InvalidSince(value)
+    if since < 0:
+        raise InvalidSince(value)
+    return since
+
+
+def _current(model, fields, ids, to_rows):
+    if not ids:
+        return {}
+    rows = to_rows(list(model.objects.filter(id__in=ids).values(*fields)))
+    return {row['id']: row for row in rows}
+
+
+def changes_since(since, limit):
+    """
+    До limit записей после since: (записи, курсор продолжения, есть ли ещё).
+
+    К созданиям приложено текущее состояние объекта (data); если объект
+    с тех пор удалён, data — None, а его удаление будет дальше в ленте
+    """
+    settled = timezone.now() - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS)
+    entries = list(
+        Change.objects.filter(id__gt=since).order_by('id')[:limit + 1])
+    # Останавливаемся на первой свежей записи: за ней могут быть ещё не
+    # закоммиченные записи с меньшими id
+    for index, entry in enumerate(entries):
+        if entry.created_at > settled:
+            entries = entries[:index]
+            break
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    created = {Change.QUESTION: set(), Change.ANSWER: set()}
+    for entry in entries:
+        if entry.action == Change.CREATED:
+            created[entry.kind].add(entry.object_id)
+    data = {
+        Change.QUESTION: _current(Question, QUESTION_FIELDS,
+                                  created[Change.QUESTION], question_rows),
+        Change.ANSWER: _current(Answer, ANSWER_FIELDS,
+                                created[Change.ANSWER], answer_rows),
+    }
+
+    changes = [{
+        'seq': entry.id,
+        'type': entry.kind,
+        'action': entry.action,
+        'id': entry.object_id,
+        'question_id': entry.question_id,
+        'at': entry.created_at,
+        'data': (data[entry.kind].get(entry.object_id)
+                 if entry.action == Change.CREATED else None),
+    } for entry in entries]
+    next_since = entries[-1].id if entries else since
+    return changes, next_since, has_more
@@ -0,0 +1,59 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Сильный ETag из дешёвых признаков версии (id, счётчики, даты)"""
+    raw = '|'.join(str(part) for part in parts).encode()
+    return quote_etag(hashlib.blake2b(raw, digest_size=12).hexdigest())
+
+
+def representation_etag(request, etag):
+    """
+    ETag согласованного формата ответа. У JSON (и Browsable API) — как
+    есть, у остальных форматов свой: кэш не должен отдать MessagePack
+    клиенту, который сверяет копию JSON
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    if etag is None or renderer is None or renderer.format in ('json', 'api'):
+        return etag
+    return make_etag(etag, renderer.format)
+
+
+def timestamp(value):
+    """datetime -> секунды эпохи для Last-Modified (None остаётся None)"""
+    return int(value.timestamp()) if value is not None else None
+
+
+def question_versions(questions):
+    """
+    Признаки версии строк списка вопросов для ETag: кроме id, счётчики
+    ответов — они меняются, когда к вопросу добавляют или удаляют ответ
+    """
+    for question in questions:
+        yield question['id']
+        yield question['answer_count']
+        yield question['last_answer_at']
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Проставляет ETag / Last-Modified в ответ"""
+    if etag:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """
+    304, если копия клиента актуальна по If-None-Match / If-Modified-Since,
+    иначе None. Проверяется до сериализации, чтобы 304 ничего не стоил.
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
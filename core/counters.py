@@ -0,0 +1,61 @@
+"""
+Денормализованные счётчики вопроса: answer_count и last_answer_at.
+
+Обновляются одним UPDATE с F()-выражениями в той же транзакции, что и
+запись ответа, поэтому параллельные запросы не теряют инкременты.
+"""
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Question, Answer
+
+
+def _added(count, created_at):
+    return {
+        'answer_count': F('answer_count') + count,
+        'last_answer_at': Greatest(
+            Coalesce(F('last_answer_at'), Value(created_at)),
+            Value(created_at)
+        ),
+    }
+
+
+def _latest_answer_at():
+    return Subquery(
+        Answer.objects.filter(question_id=OuterRef('pk'))
+        .order_by('-created_at').values('created_at')[:1]
+    )
+
+
+def _removed(count):
+    return {
+        # Не уходим в минус на данных, где счётчик ещё не пересчитан
+        'answer_count': Greatest(F('answer_count') - count, Value(0)),
+        'last_answer_at': _latest_answer_at(),
+    }
+
+
+def answers_added(question_id, created_at, count=1):
+    """
+    Учитывает новые ответы. Возвращает число обновлённых строк:
+    0 означает, что вопроса нет и транзакцию нужно откатить
+    """
+    return Question.objects.filter(id=question_id).update(
+        **_added(count, created_at))
+
+
+def answers_removed(question_id, count=1):
+    """Учитывает удалённые ответы (вызывать после DELETE)"""
+    return Question.objects.filter(id=question_id).update(**_removed(count))
+
+
+def recompute(questions):
+    """Пересчитывает счётчики для набора вопросов по фактическим ответам"""
+    stats = Answer.objects.filter(
+        question_id=OuterRef('pk')).order_by().values('question_id')
+    return questions.update(
+        answer_count=Coalesce(
+            Subquery(stats.annotate(n=Count('id')).values('n')), 0),
+        last_answer_at=Subquery(
+            stats.annotate(last=Max('created_at')).values('last')),
+    )
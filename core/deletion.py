@@ -0,0 +1,154 @@
+"""
+Удаление вопросов вместе с ответами и отдельных ответов.
+
+delete_question удаляет сразу: в PostgreSQL — одним DELETE с CTE, который
+возвращает число удалённых ответов, в остальных БД — через коллектор
+Django (ответы удаляются одним DELETE без загрузки в память). Надгробие в
+журнал изменений (core.changes) пишется после COMMIT удаления отдельной
+короткой транзакцией: удаление большой ветки идёт дольше
+CHANGES_SETTLE_SECONDS, и запись журнала, полученная в его начале, стала
+бы видна, когда курсоры читателей уже ушли дальше.
+
+Для вопросов с огромным числом ответов есть фоновая очистка: вопрос сразу
+скрывается (purge_started_at), ответы удаляются пачками по
+PURGE_BATCH_SIZE, каждая в своей короткой транзакции. Очистку, прерванную
+перезапуском процесса, доделывает manage.py purge_questions.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import invalidate_question
+from .changes import answer_deleted, questions_deleted
+from .counters import answers_removed
+from .models import Answer, Question
+from .pubsub import publish_question_deleted
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='purge')
+
+
+def _delete_sql():
+    answer = Answer._meta
+    return f"""
+        WITH deleted_question AS (
+            DELETE FROM {Question._meta.db_table}
+            WHERE id = %s AND purge_started_at IS NULL
+            RETURNING id
+        ), deleted_answers AS (
+            DELETE FROM {answer.db_table}
+            WHERE {answer.get_field('question_id').column} IN (
+                SELECT id FROM deleted_question)
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM deleted_question),
+               (SELECT count(*) FROM deleted_answers)
+    """
+
+
+def delete_question(question_id):
+    """
+    Удаляет вопрос с ответами, затем пишет надгробие в журнал изменений.
+    Возвращает число удалённых ответов или None, если вопроса нет
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(_delete_sql(), [question_id])
+            questions, answers = cursor.fetchone()
+    else:
+        with transaction.atomic():
+            _, deleted = Question.objects.filter(id=question_id).delete()
+            questions = deleted.get(Question._meta.label, 0)
+            answers = deleted.get(Answer._meta.label, 0)
+    if not questions:
+        return None
+    with transaction.atomic():
+        questions_deleted([question_id])
+        publish_question_deleted(question_id)
+    return answers
+
+
+def delete_answer(answer_id):
+    """
+    Удаляет ответ. Возвращает id его вопроса или None, если ответа нет.
+
+    Счётчики вопроса и журнал меняются, только если DELETE действительно
+    удалил строку: два параллельных удаления одного ответа не уменьшат
+    answer_count дважды и не запишут два надгробия
+    """
+    question_id = (Answer.objects.filter(id=answer_id)
+                   .values_list('question_id', flat=True).first())
+    if question_id is None:
+        return None
+    with transaction.atomic():
+        deleted, _ = Answer.objects.filter(id=answer_id).delete()
+        if deleted != 1:
+            return None
+        answers_removed(question_id)
+        answer_deleted(answer_id, question_id)
+    return question_id
+
+
+def start_purge(question_id):
+    """
+    Скрывает вопрос до фоновой очистки; для клиентов ленты изменений он
+    удалён уже сейчас. False, если вопроса нет
+    """
+    with transaction.atomic():
+        hidden = bool(Question.objects.filter(id=question_id).update(
+            purge_started_at=timezone.now()))
+        if hidden:
+            questions_deleted([question_id])
+            publish_question_deleted(question_id)
+    return hidden
+
+
+def purge_question(question_id, batch_size=None):
+    """
+    Удаляет ответы вопроса пачками, затем сам вопрос.
+    Возвращает число удалённых ответов
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Answer.objects.filter(question_id=question_id)
+                .order_by('created_at', 'id')
+                .values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += Answer.objects.filter(id__in=ids).delete()[0]
+    Question.all_objects.filter(id=question_id).delete()
+    invalidate_question(question_id)
+    logger.info("Вопрос %s удалён в фоне. Удалено ответов: %s",
+                question_id, deleted)
+    return deleted
+
+
+def _purge_in_thread(question_id):
+    try:
+        purge_question(question_id)
+    except Exception:
+        logger.exception("Фоновое удаление вопроса %s прервано", question_id)
+    finally:
+        connection.close()
+
+
+def run_in_background(question_id):
+    _executor.submit(_purge_in_thread, question_id)
+
+
+def schedule_purge(question_id):
+    """Запускает фоновую очистку после коммита текущей транзакции"""
+    transaction.on_commit(lambda: run_in_background(question_id))
+
+
+def pending_purges():
+    """id вопросов, очистка которых начата, но не закончена"""
+    return list(Question.all_objects.filter(purge_started_at__isnull=False)
+                .order_by('purge_started_at').values_list('id', flat=True))
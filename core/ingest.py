@@ -0,0 +1,416 @@
+"""
+Буферизованная запись ответов (write-behind), включается
+ANSWER_WRITE_BEHIND=True.
+
+POST /api/questions/{id}/answers проверяет ответ и вопрос, кладёт ответ в
+ограниченную очередь процесса и сразу отвечает 202 с tracking_id. Фоновый
+поток забирает из очереди пачки — до INGEST_BATCH_SIZE ответов или всё,
+что набралось за INGEST_FLUSH_MS мс, — и пишет каждую пачку одной
+транзакцией: bulk_create, счётчики вопросов, журнал изменений, публикация
+в потоки. Одна транзакция на пачку вместо одной на ответ.
+
+Очередь полна — ответ не принимается (IngestQueueFull, 503 у клиента).
+Статус по tracking_id (queued, written, failed) хранится в кэше
+INGEST_STATUS_CACHE_ALIAS; с несколькими воркерами кэш должен быть общим.
+
+С INGEST_SPOOL_DIR принятый ответ сначала дописывается в файл процесса, а
+после COMMIT отмечается в нём записанным. Файл держится под flock; файлы,
+которые не держит ни один живой процесс, дописываются в БД при старте
+потока записи в следующем процессе. Доставка «хотя бы раз»: при падении
+между COMMIT и отметкой ответ будет записан повторно.
+
+При остановке процесса (atexit и хук worker_exit в gunicorn.conf.py)
+очередь дописывается в БД не дольше INGEST_DRAIN_SECONDS секунд.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import InterfaceError, OperationalError, connection, transaction
+
+from .cache import invalidate_question
+from .changes import answers_created
+from .counters import answers_added
+from .models import Answer, Question
+from .pubsub import publish_answers
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+WRITTEN = 'written'
+FAILED = 'failed'
+
+Pending = namedtuple('Pending', 'tracking_id question_id user_id text')
+
+
+class IngestQueueFull(Exception):
+    """Очередь записи переполнена или процесс останавливается"""
+
+
+def status_cache():
+    return caches[settings.INGEST_STATUS_CACHE_ALIAS]
+
+
+def _status_key(tracking_id):
+    return f"ingest:{tracking_id}"
+
+
+def _set_statuses(statuses):
+    status_cache().set_many(
+        {_status_key(tracking_id): status
+         for tracking_id, status in statuses.items()},
+        timeout=settings.INGEST_STATUS_TTL)
+
+
+def get_status(tracking_id):
+    """Статус ответа по tracking_id или None, если он неизвестен"""
+    return status_cache().get(_status_key(tracking_id))
+
+
+def set_status(tracking_id, status):
+    """Записывает статус ответа (словарь, как его отдаёт /ingest/{id})"""
+    _set_statuses({tracking_id: status})
+
+
+def write_batch(batch):
+    """
+    Пишет пачку ответов одной транзакцией и возвращает их статусы.
+
+    Ответы к вопросам, которых уже нет (или которые удаляются в фоне), не
+    пишутся и получают статус failed. Строки вопросов блокируются до
+    COMMIT, чтобы вопрос не удалили между проверкой и вставкой
+    """
+    question_ids = {item.question_id for item in batch}
+    with transaction.atomic():
+        live = set(Question.objects.select_for_update()
+                   .filter(id__in=question_ids).values_list('id', flat=True))
+        accepted = [item for item in batch if item.question_id in live]
+        answers = Answer.objects.bulk_create(
+            [
+                Answer(question_id_id=item.question_id,
+                       user_id_id=item.user_id, text=item.text)
+                for item in accepted
+            ],
+            batch_size=settings.BULK_BATCH_SIZE
+        )
+        by_question = {}
+        for answer in answers:
+            by_question.setdefault(answer.question_id_id, []).append(answer)
+        for question_id, group in by_question.items():
+            answers_added(question_id, max(a.created_at for a in group),
+                          count=len(group))
+            answers_created(question_id, [a.id for a in group])
+            publish_answers(question_id, group)
+    for question_id in by_question:
+        invalidate_question(question_id)
+
+    statuses = {
+        item.tracking_id: {'status': WRITTEN, 'question_id': item.question_id,
+                           'answer_id': answer.id}
+        for item, answer in zip(accepted, answers)
+    }
+    for item in batch:
+        if item.question_id not in live:
+            statuses[item.tracking_id] = {
+                'status': FAILED, 'question_id': item.question_id,
+                'error': 'Вопрос не найден'}
+    return statuses
+
+
+class Spool:
+    """
+    Файл принятых, но ещё не записанных ответов одного процесса: строка
+    на ответ и строки {"done": [...]} с отметками о записи. Когда
+    незаписанных не остаётся, файл обрезается.
+
+    fsync (INGEST_SPOOL_FSYNC) групповой: он идёт вне блокировки записи, и
+    один вызов покрывает все строки, дописанные к его началу, — потоки,
+    пришедшие во время fsync, ждут один следующий, а не по одному на ответ
+    """
+    PREFIX = 'spool-'
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(
+            directory, f'{self.PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl')
+        self._file = open(self.path, 'ab')
+        fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._pending = 0
+        self._written = 0
+        self._synced = 0
+
+    def append(self, item):
+        with self._lock:
+            self._write(item._asdict())
+            self._pending += 1
+            written = self._written
+        self._sync(written)
+
+    def done(self, tracking_ids):
+        with self._lock:
+            self._pending -= len(tracking_ids)
+            if self._pending <= 0:
+                self._pending = 0
+                self._file.truncate(0)
+            else:
+                self._write({'done': tracking_ids})
+            written = self._written
+        self._sync(written)
+
+    def _write(self, record):
+        self._file.write(
+            json.dumps(record, ensure_ascii=False).encode() + b'\n')
+        self._file.flush()
+        self._written += 1
+
+    def _sync(self, written):
+        """Ждёт, пока строки до номера written окажутся на диске"""
+        if not settings.INGEST_SPOOL_FSYNC:
+            return
+        with self._sync_lock:
+            if self._synced >= written:
+                return
+            with self._lock:
+                target = self._written
+            os.fsync(self._file.fileno())
+            self._synced = target
+
+    @classmethod
+    def orphans(cls, directory):
+        """
+        Файлы, брошенные остановившимися процессами: (путь, незаписанные
+        ответы). Файл удаляется, когда вызывающий код вернёт управление
+        """
+        if not os.path.isdir(directory):
+            return
+        for name in sorted(os.listdir(directory)):
+            if not name.startswith(cls.PREFIX):
+                continue
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as file:
+                try:
+                    fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Файл живого процесса (в том числе своего)
+                    continue
+                yield path, cls._unwritten(file)
+                os.remove(path)
+
+    @staticmethod
+    def _unwritten(file):
+        items, done = {}, set()
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Строка, оборванная при падении процесса
+                continue
+            if 'done' in record:
+                done.update(record['done'])
+            else:
+                items[record['tracking_id']] = Pending(**record)
+        return [item for tracking_id, item in items.items()
+                if tracking_id not in done]
+
+
+class Ingestor:
+    """
+    Очередь ответов процесса и поток, который пишет её в БД пачками.
+    Запускается при первом ответе, то есть уже в воркере после fork.
+    С flusher=False поток не запускается, очередь пишется вызовом flush()
+    """
+
+    def __init__(self, flusher=True):
+        self.flusher = flusher
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _start(self):
+        self._queue = queue.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+        self._stopping = threading.Event()
+        self._spool = (Spool(settings.INGEST_SPOOL_DIR)
+                       if settings.INGEST_SPOOL_DIR else None)
+        self._thread = None
+        if self.flusher:
+            self._start_thread()
+        self._pid = os.getpid()
+
+    def _start_thread(self):
+        self._thread = threading.Thread(
+            target=self._run, name='ingest-flush', daemon=True)
+        self._thread.start()
+
+    def _check_started(self):
+        """Запускает очередь в новом процессе и перезапускает упавший поток"""
+        if self._pid != os.getpid():
+            self._start()
+        elif (self._thread is not None and not self._thread.is_alive()
+                and not self._stopping.is_set()):
+            logger.error("Поток записи ответов остановился, перезапускаем")
+            self._start_thread()
+
+    def submit(self, question_id, user_id, text):
+        """
+        Ставит ответ в очередь и возвращает его tracking_id. Кэш статусов
+        и файл очереди — вне общей блокировки, чтобы запросы не ждали
+        друг друга; в очередь ответ попадает последним
+        """
+        item = Pending(uuid.uuid4().hex, question_id, user_id, text)
+        with self._lock:
+            self._check_started()
+            if self._stopping.is_set() or self._queue.full():
+                raise IngestQueueFull
+            spool = self._spool
+        # Статус ставится до того, как ответ увидит поток записи
+        _set_statuses({item.tracking_id: {
+            'status': QUEUED, 'question_id': question_id}})
+        if spool is not None:
+            spool.append(item)
+        with self._lock:
+            try:
+                if self._stopping.is_set():
+                    raise queue.Full
+                self._queue.put_nowait(item)
+            except queue.Full:
+                # Место заняли, пока писали файл: ответ не принят
+                if spool is not None:
+                    spool.done([item.tracking_id])
+                raise IngestQueueFull
+        return item.tracking_id
+
+    def depth(self):
+        """Сколько ответов ждёт записи"""
+        return self._queue.qsize() if self._pid == os.getpid() else 0
+
+    def flush(self):
+        """Пишет всё, что сейчас в очереди, в текущем потоке"""
+        while self.depth():
+            self._write(self._take(wait=False))
+
+    def drain(self, timeout=None):
+        """
+        Останавливает приём ответов и ждёт, пока очередь запишется.
+        Возвращает False, если за timeout (INGEST_DRAIN_SECONDS) не успели
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                return True
+            self._stopping.set()
+        if self._thread is None or not self._thread.is_alive():
+            self.flush()
+        else:
+            self._thread.join(
+                settings.INGEST_DRAIN_SECONDS if timeout is None else timeout)
+        left = self.depth()
+        if left:
+            logger.error("Не записано ответов из очереди: %s", left)
+        return not left
+
+    def replay_orphans(self):
+        """Дописывает в БД ответы из файлов остановившихся процессов"""
+        if not settings.INGEST_SPOOL_DIR:
+            return
+        size = settings.INGEST_BATCH_SIZE
+        for path, items in Spool.orphans(settings.INGEST_SPOOL_DIR):
+            logger.warning("Дописываем %s ответов из %s", len(items), path)
+            for start in range(0, len(items), size):
+                self._write(items[start:start + size], spooled=False)
+
+    def _run(self):
+        try:
+            self.replay_orphans()
+        except Exception:
+            logger.exception("Не удалось дописать ответы из файлов очереди")
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._take(wait=True)
+            if batch:
+                self._write(batch)
+        connection.close()
+
+    def _take(self, wait):
+        """
+        Пачка до INGEST_BATCH_SIZE ответов. Первый ждём (при wait), потом
+        добираем то, что придёт за INGEST_FLUSH_MS; при остановке не ждём
+        """
+        try:
+            first = self._queue.get(timeout=0.5) if wait else self._queue.get_nowait()
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + settings.INGEST_FLUSH_MS / 1000
+        while len(batch) < settings.INGEST_BATCH_SIZE:
+            remaining = 0 if self._stopping.is_set() or not wait else (
+                max(deadline - time.monotonic(), 0))
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch, spooled=True):
+        """
+        Пишет пачку; пока БД недоступна, повторяет каждые
+        INGEST_RETRY_SECONDS (очередь тем временем заполняется, и новые
+        ответы получают 503). Прочие ошибки помечают пачку failed
+        """
+        while True:
+            connection.close_if_unusable_or_obsolete()
+            try:
+                statuses = write_batch(batch)
+                break
+            except (OperationalError, InterfaceError) as e:
+                logger.warning(
+                    "БД недоступна, пачка из %s ответов будет записана "
+                    "повторно: %s", len(batch), e)
+                connection.close()
+                time.sleep(settings.INGEST_RETRY_SECONDS)
+            except Exception as e:
+                logger.exception(
+                    "Не удалось записать пачку из %s ответов", len(batch))
+                statuses = {
+                    item.tracking_id: {'status': FAILED,
+                                       'question_id': item.question_id,
+                                       'error': str(e)}
+                    for item in batch
+                }
+                break
+        # Сбой кэша или файла не должен останавливать поток записи: ответы
+        # уже в БД, в худшем случае статус не обновится или ответ из файла
+        # запишется повторно
+        try:
+            _set_statuses(statuses)
+        except Exception:
+            logger.exception("Не удалось сохранить статусы пачки")
+        if spooled and self._spool is not None:
+            try:
+                self._spool.done([item.tracking_id for item in batch])
+            except Exception:
+                logger.exception("Не удалось отметить пачку в файле очереди")
+        written = sum(s['status'] == WRITTEN for s in statuses.values())
+        logger.info("Записано ответов пачкой: %s из %s", written, len(batch))
+
+
+ingestor = Ingestor()
+
+
+def submit_answer(question_id, user_id, text):
+    """Ставит ответ в очередь записи; IngestQueueFull, если места нет"""
+    return ingestor.submit(question_id, user_id, text)
+
+
+def drain(timeout=None):
+    return ingestor.drain(timeout)
+
+
+atexit.register(drain)
@@ -0,0 +1,132 @@
+"""
+Неблокирующее логирование: поток запроса только кладёт запись в очередь,
+форматирование (JSON) и запись на диск делает фоновый QueueListener.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Атрибуты LogRecord, которые не считаются пользовательскими полями extra=
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись; поля из extra= попадают в объект как есть"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает только долю rate записей уровня INFO и ниже;
+    WARNING и выше проходят всегда
+    """
+
+    def __init__(self, rate=1.0, name=''):
+        super().__init__(name)
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Кладёт записи в ограниченную очередь и никогда не ждёт: если очередь
+    переполнена, запись отбрасывается (счётчик dropped).
+
+    Фоновый QueueListener пишет в RotatingFileHandler (JSON, ротация по
+    размеру) и, при console=True, в консоль. Подключается через dictConfig
+    с ключом '()'. Ротация одного файла из нескольких процессов не
+    синхронизирована — воркерам gunicorn лучше давать разные файлы или
+    писать только в stdout (filename=None, записи в JSON).
+
+    Фоновый поток не переживает fork (gunicorn с preload_app), поэтому в
+    дочернем процессе очередь и поток создаются заново.
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5,
+                 console=True, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.dropped = 0
+
+        handlers = []
+        if filename:
+            file_handler = RotatingFileHandler(
+                filename, maxBytes=max_bytes, backupCount=backup_count,
+                encoding='utf-8', delay=True)
+            file_handler.setLevel(logging.INFO)
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        if not filename:
+            # Единственный вывод (контейнер): полный JSON в stdout
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(JsonFormatter())
+            handlers.append(console_handler)
+        elif console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(
+                logging.Formatter('{levelname} {message}', style='{'))
+            handlers.append(console_handler)
+
+        self.listener = QueueListener(
+            self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+        os.register_at_fork(after_in_child=self._restart_after_fork)
+
+    def _restart_after_fork(self):
+        if self.listener._thread is None:
+            return
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self.listener = QueueListener(
+            self.queue, *self.listener.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def prepare(self, record):
+        # Сообщение не форматируем: это сделает фоновый поток. Трейсбек
+        # превращаем в текст сразу, пока живы кадры стека
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """Дописывает очередь и останавливает фоновый поток"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self):
+        self.stop()
+        super().close()
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.auth import create_key, revoke_key
+from core.models import ApiKey
+
+
+class Command(BaseCommand):
+    help = "Реестр API-ключей: создать, отозвать, показать список"
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+        create = subparsers.add_parser('create', help="Создать ключ")
+        create.add_argument('name', help="Кому выдан ключ")
+        revoke = subparsers.add_parser('revoke', help="Отозвать ключ")
+        revoke.add_argument('prefix', help="Первые символы ключа (из списка)")
+        subparsers.add_parser('list', help="Показать ключи")
+
+    def handle(self, *args, action, **options):
+        getattr(self, f'_{action}')(**options)
+
+    def _create(self, name, **options):
+        api_key, raw_key = create_key(name)
+        self.stdout.write(f"Ключ для {api_key.name} (показывается один раз):")
+        self.stdout.write(raw_key)
+
+    def _revoke(self, prefix, **options):
+        keys = list(ApiKey.objects.filter(prefix=prefix, revoked_at__isnull=True))
+        if len(keys) != 1:
+            raise CommandError(
+                f"Активных ключей с префиксом {prefix}: {len(keys)}, нужен ровно один")
+        revoke_key(keys[0])
+        self.stdout.write(self.style.SUCCESS(f"Ключ {keys[0]} отозван"))
+
+    def _list(self, **options):
+        for api_key in ApiKey.objects.order_by('created_at'):
+            state = (f"отозван {api_key.revoked_at:%Y-%m-%d %H:%M}"
+                     if api_key.revoked_at else "активен")
+            self.stdout.write(f"{api_key.prefix}  {api_key.name}  {state}")
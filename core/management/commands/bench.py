@@ -0,0 +1,198 @@
+import json
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.testcases import LiveServerThread
+from django.test.utils import override_settings
+
+from benchmarks.harness import (
+    ANSWER_DELETES, DESTRUCTIVE, QUESTION_DELETES, SCENARIOS, ClientDriver,
+    Context, HttpDriver, compare, run_scenario
+)
+from benchmarks.connections import compare_connections
+from benchmarks.formats import compare_formats
+from benchmarks.seed import cleanup, seed
+from benchmarks.serialization import compare_serialization
+from core.cache import get_question_cache
+from core.models import Answer
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет БД тестовыми данными и замеряет пропускную способность, "
+        "p50/p95/p99 и число SQL-запросов для каждого маршрута API"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=10000,
+                            help="Сколько вопросов создать (10k ... 10M)")
+        parser.add_argument('--max-answers', type=int, default=200,
+                            help="Максимум ответов у одного вопроса")
+        parser.add_argument('--skew', type=float, default=1.2,
+                            help="Параметр Парето: меньше — больше «вирусных» вопросов")
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Запросов на каждый сценарий")
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=sorted(SCENARIOS),
+                            help="Прогнать только этот сценарий (можно несколько раз)")
+        parser.add_argument('--live', action='store_true',
+                            help="Поднять локальный HTTP-сервер и гонять запросы через него")
+        parser.add_argument('--live-url',
+                            help="Гонять запросы на уже запущенный сервер (например, gunicorn)")
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help="Параллельных запросов (только для HTTP)")
+        parser.add_argument('--output', help="Куда записать результаты (JSON)")
+        parser.add_argument('--baseline', help="JSON прошлого прогона для сравнения")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Допустимое ухудшение относительно baseline (доля)")
+        parser.add_argument('--keep-data', action='store_true',
+                            help="Не удалять созданные данные после прогона")
+        parser.add_argument('--serialization', action='store_true',
+                            help="Сравнить сериализацию DRF и быстрый путь на 10k вопросов")
+        parser.add_argument('--connections', action='store_true',
+                            help="Сравнить задержку с новым соединением на запрос, "
+                                 "постоянными соединениями и пулом")
+        parser.add_argument('--formats', action='store_true',
+                            help="Сравнить размер и время кодирования JSON, "
+                                 "колоночного JSON и MessagePack со сжатием и без")
+
+    def handle(self, *args, **options):
+        if not settings.X_API_KEY:
+            raise CommandError("Не задан X-API-KEY: сценариям нечем авторизоваться")
+        http = options['live'] or options['live_url']
+
+        if http:
+            # Серверу нужны закоммиченные данные — чистим за собой сами
+            try:
+                results = self._run(options)
+            finally:
+                if not options['keep_data']:
+                    cleanup()
+        else:
+            with transaction.atomic():
+                results = self._run(options)
+                if not options['keep_data']:
+                    transaction.set_rollback(True)
+        get_question_cache().clear()
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, ensure_ascii=False)
+        self._report(results)
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = compare(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError(
+                    "Регрессия производительности:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Регрессий относительно baseline нет"))
+
+    def _run(self, options):
+        http = options['live'] or options['live_url']
+        question_ids = seed(options['questions'], options['max_answers'],
+                            options['skew'])
+        answer_ids = list(
+            Answer.objects.filter(question_id__in=question_ids[:1000])
+            .values_list('id', flat=True)[:10000])
+        self.stdout.write(
+            f"Создано вопросов: {options['questions']}, "
+            f"ответов в выборке: {len(answer_ids)}")
+
+        server = None
+        if options['live']:
+            server = LiveServerThread('127.0.0.1', static_handler=lambda app: app)
+            server.daemon = True
+            server.start()
+            server.is_ready.wait()
+            if server.error:
+                raise server.error
+            driver = HttpDriver(f"http://127.0.0.1:{server.port}", settings.X_API_KEY)
+        elif options['live_url']:
+            driver = HttpDriver(options['live_url'], settings.X_API_KEY)
+        else:
+            driver = ClientDriver(settings.X_API_KEY)
+
+        ctx = Context(question_ids, answer_ids, random.Random(7))
+        scenarios = options['scenarios'] or list(SCENARIOS)
+        # Удаления в конце, чтобы не выбивать данные у остальных сценариев,
+        # и вопросы последними — вместе с ними уходят их ответы
+        scenarios.sort(key=lambda name: (name in DESTRUCTIVE,
+                                         name in QUESTION_DELETES))
+        # Замеряем сами маршруты, а не лимитер: у внешнего сервера
+        # (--live-url) его нужно выключить через RATE_LIMIT_ENABLED=False.
+        # Хосты тестового клиента и локального сервера разрешаем так же,
+        # как это делает тестовый раннер Django
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1']
+        try:
+            with override_settings(RATE_LIMIT_ENABLED=False,
+                                   ALLOWED_HOSTS=allowed_hosts):
+                summaries = {}
+                for name in scenarios:
+                    requests = options['requests']
+                    if name in QUESTION_DELETES:
+                        requests = min(requests, len(ctx.question_ids) - 1)
+                    if name in ANSWER_DELETES:
+                        requests = min(requests, len(ctx.answer_ids))
+                    if requests <= 0:
+                        continue
+                    summaries[name] = run_scenario(
+                        driver, name, ctx, requests,
+                        concurrency=options['concurrency'] if http else 1)
+        finally:
+            if server is not None:
+                server.terminate()
+
+        results = {
+            'mode': 'http' if http else 'client',
+            'questions': options['questions'],
+            'max_answers': options['max_answers'],
+            'skew': options['skew'],
+            'requests_per_scenario': options['requests'],
+            'scenarios': summaries,
+        }
+        if options['serialization']:
+            results['serialization'] = compare_serialization(
+                min(options['questions'], 10000))
+        if options['connections']:
+            results['connections'] = compare_connections(options['requests'])
+        if options['formats']:
+            results['formats'] = compare_formats()
+        return results
+
+    def _report(self, results):
+        self.stdout.write(
+            f"{'сценарий':<24}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'SQL':>7}{'err':>6}")
+        for name, row in results['scenarios'].items():
+            queries = row['queries_per_request']
+            self.stdout.write(
+                f"{name:<24}{row['throughput_rps'] or 0:>10}{row['p50_ms']:>10}"
+                f"{row['p95_ms']:>10}{row['p99_ms']:>10}"
+                f"{queries if queries is not None else '-':>7}{row['errors']:>6}")
+        serialization = results.get('serialization')
+        if serialization:
+            self.stdout.write(
+                f"Сериализация {serialization['rows']} вопросов: DRF "
+                f"{serialization['drf_ms']} ms, быстрый путь "
+                f"{serialization['fast_ms']} ms (x{serialization['speedup']}), "
+                f"вывод {'совпадает' if serialization['identical'] else 'РАЗЛИЧАЕТСЯ'}")
+        for mode, row in results.get('connections', {}).items():
+            if row is None:
+                self.stdout.write(f"Соединения {mode}: недоступно в этом окружении")
+            else:
+                self.stdout.write(
+                    f"Соединения {mode}: p50 {row['p50_ms']} ms, "
+                    f"p95 {row['p95_ms']} ms, среднее {row['mean_ms']} ms")
+        for name, rows in results.get('formats', {}).items():
+            for fmt, row in rows.items():
+                encodings = [key[:-len('_bytes')] for key in row
+                             if key.endswith('_bytes')]
+                compressed = ', '.join(
+                    f"{encoding} {row[encoding + '_bytes']} Б / "
+                    f"{row[encoding + '_ms']} ms" for encoding in encodings)
+                self.stdout.write(
+                    f"Формат {name} {fmt}: {row['bytes']} Б, "
+                    f"кодирование {row['encode_ms']} ms; {compressed}")
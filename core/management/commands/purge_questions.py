@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.deletion import pending_purges, purge_question
+
+
+class Command(BaseCommand):
+    help = (
+        "Доделывает фоновое удаление вопросов (DELETE ?mode=purge), "
+        "прерванное перезапуском процесса"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Сколько ответов удалять за транзакцию "
+                                 "(по умолчанию PURGE_BATCH_SIZE)")
+
+    def handle(self, *args, batch_size, **options):
+        question_ids = pending_purges()
+        for question_id in question_ids:
+            deleted = purge_question(question_id, batch_size)
+            self.stdout.write(
+                f"Вопрос {question_id}: удалено ответов {deleted}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Удалено вопросов: {len(question_ids)}"))
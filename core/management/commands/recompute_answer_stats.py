@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from core.cache import get_question_cache
+from core.counters import recompute
+from core.models import Question
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает answer_count и last_answer_at у вопросов пачками по id"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Сколько вопросов обновлять за транзакцию")
+
+    def handle(self, *args, batch_size, **options):
+        last_id = Question.objects.aggregate(last=Max('id'))['last'] or 0
+        updated = 0
+        for start in range(0, last_id + 1, batch_size):
+            with transaction.atomic():
+                updated += recompute(Question.objects.filter(
+                    id__gte=start, id__lt=start + batch_size))
+            self.stdout.write(f"Обработано до id={start + batch_size - 1}")
+
+        get_question_cache().clear()
+        self.stdout.write(self.style.SUCCESS(
+            f"Счётчики пересчитаны для {updated} вопросов"))
@@ -0,0 +1,229 @@
+"""
+Метрики запросов: время, SQL-запросы, время сериализации, размер ответа.
+
+Данные текущего запроса лежат в contextvar (работает и для потоков, и для
+async), агрегаты по маршрутам — в гистограммах процесса, которые
+отдаются на /metrics в текстовом формате Prometheus.
+"""
+import logging
+import threading
+import time
+import warnings
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class NPlusOneWarning(UserWarning):
+    """Один и тот же SELECT повторён в запросе слишком много раз"""
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.timings = Counter()
+        self.statements = Counter()
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+            if sql.lstrip()[:6].upper() == 'SELECT':
+                self.statements[sql] += 1
+
+    def repeated_selects(self, threshold):
+        return [(sql, count) for sql, count in self.statements.items()
+                if count >= threshold]
+
+
+@contextmanager
+def timer(name):
+    """Добавляет длительность блока к метрике name текущего запроса"""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.timings[name] += time.perf_counter() - started
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(
+                        f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{label_text}}} {series["sum"]}')
+                lines.append(f'{self.name}_count{{{label_text}}} {series["count"]}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', "Время обработки запроса", DURATION_BUCKETS)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', "Время в БД за запрос", DURATION_BUCKETS)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', "SQL-запросов за запрос", QUERY_BUCKETS)
+REQUEST_SERIALIZE_TIME = Histogram(
+    'http_request_serialize_seconds', "Время сериализации за запрос",
+    DURATION_BUCKETS)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', "Размер тела ответа", SIZE_BUCKETS)
+HISTOGRAMS = (REQUEST_DURATION, REQUEST_DB_TIME, REQUEST_DB_QUERIES,
+              REQUEST_SERIALIZE_TIME, RESPONSE_SIZE)
+
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else 'unmatched'
+
+
+def _server_timing(metrics, total):
+    parts = [
+        f"app;dur={total * 1000:.2f}",
+        f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.db_queries} queries"',
+    ]
+    parts.extend(f"{name};dur={value * 1000:.2f}"
+                 for name, value in sorted(metrics.timings.items()))
+    return ', '.join(parts)
+
+
+def _check_n_plus_one(request, metrics):
+    repeated = metrics.repeated_selects(settings.N_PLUS_ONE_THRESHOLD)
+    if not repeated or not settings.N_PLUS_ONE_WARNINGS:
+        return
+    for sql, count in repeated:
+        message = f"N+1 в {request.method} {request.path}: {count} раз {sql[:200]}"
+        logger.warning(message)
+        warnings.warn(message, NPlusOneWarning, stacklevel=2)
+
+
+@contextmanager
+def _collect():
+    """Метрики текущего запроса + перехват SQL на всех соединениях"""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(metrics.db_wrapper))
+            yield metrics
+    finally:
+        _current.reset(token)
+
+
+def _finish(request, response, metrics):
+    total = time.perf_counter() - metrics.started
+    labels = (('method', request.method), ('route', route_of(request)))
+    REQUEST_DURATION.observe(labels, total)
+    REQUEST_DB_TIME.observe(labels, metrics.db_time)
+    REQUEST_DB_QUERIES.observe(labels, metrics.db_queries)
+    REQUEST_SERIALIZE_TIME.observe(labels, metrics.timings['serialize'])
+    # Потоковые и ещё не отрендеренные (DRF внутри декоратора) — без размера
+    if not response.streaming and getattr(response, 'is_rendered', True):
+        RESPONSE_SIZE.observe(labels, len(response.content))
+
+    response['Server-Timing'] = _server_timing(metrics, total)
+    _check_n_plus_one(request, metrics)
+    return response
+
+
+def measure(request, call):
+    """
+    Выполняет call() и записывает метрики запроса: Server-Timing в ответ,
+    гистограммы по маршруту, предупреждение о N+1.
+
+    Для потоковых ответов учитывается только время до первого байта.
+    """
+    with _collect() as metrics:
+        response = call()
+    return _finish(request, response, metrics)
+
+
+async def ameasure(request, call):
+    """То же, что measure, для корутины call()"""
+    with _collect() as metrics:
+        response = await call()
+    return _finish(request, response, metrics)
+
+
+def instrumented(view_func):
+    """
+    Декоратор для отдельных представлений, если middleware не подключено.
+    Для методов классов — через django.utils.decorators.method_decorator
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            return await ameasure(
+                request, lambda: view_func(request, *args, **kwargs))
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        return measure(request, lambda: view_func(request, *args, **kwargs))
+    return wrapper
+
+
+def metrics_view(request):
+    """GET /metrics — гистограммы по маршрутам в формате Prometheus"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return HttpResponse('\n'.join(lines) + '\n',
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
@@ -0,0 +1,210 @@
+import gzip
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import ameasure, measure
+from .routers import stick_to_primary
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class InstrumentationMiddleware:
+    """
+    Время запроса, число и время SQL-запросов, время сериализации и размер
+    ответа: заголовок Server-Timing и гистограммы для /metrics.
+
+    Поддерживает sync и async цепочки, чтобы не переводить async-представления
+    в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return measure(request, lambda: self.get_response(request))
+
+    async def __acall__(self, request):
+        return await ameasure(request, lambda: self.get_response(request))
+
+
+class PrimaryStickinessMiddleware:
+    """
+    После успешного изменяющего запроса (POST, PUT, PATCH, DELETE) клиент
+    какое-то время читает с основной БД, а не с реплик (см. core.routers).
+    Без реплик ничего не делает
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._process(request, await self.get_response(request))
+
+    @staticmethod
+    def _process(request, response):
+        if (settings.DATABASE_REPLICAS
+                and request.method not in SAFE_METHODS
+                and response.status_code < 400):
+            stick_to_primary(response)
+        return response
+
+
+def accepted_encoding(header):
+    """br (если установлен brotli), gzip или None по Accept-Encoding"""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0
+        accepted[coding.strip().lower()] = quality
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+class _GzipStream:
+    def __init__(self):
+        self._compressor = zlib.compressobj(
+            settings.COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(
+            quality=settings.COMPRESS_BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def compress(encoding, content):
+    """Тело ответа целиком в br или gzip"""
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.COMPRESS_GZIP_LEVEL,
+                         mtime=0)
+
+
+def _stream(encoding):
+    return _BrotliStream() if encoding == 'br' else _GzipStream()
+
+
+def _compress_chunks(encoding, chunks):
+    stream = _stream(encoding)
+    for chunk in chunks:
+        data = stream.compress(chunk)
+        if data:
+            yield data
+    yield stream.finish()
+
+
+async def _acompress_chunks(encoding, chunks):
+    stream = _stream(encoding)
+    async for chunk in chunks:
+        data = stream.compress(chunk)
+        if data:
+            yield data
+    yield stream.finish()
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов brotli (если установлен пакет brotli) или gzip — что
+    принимает клиент. Обычные ответы сжимаются от COMPRESS_MIN_BYTES,
+    потоковые (выгрузка) — всегда: куски сжимаются по мере отдачи, весь
+    ответ в памяти не собирается.
+
+    Поток SSE не сжимается: событие должно уходить сразу, а не копиться в
+    буфере компрессора, и держать компрессор на каждого подписчика дорого.
+    Сильный ETag сжатого ответа становится слабым, как в GZipMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._process(request, await self.get_response(request))
+
+    @staticmethod
+    def _process(request, response):
+        if (response.has_header('Content-Encoding')
+                or response.status_code in (204, 304)
+                or response.get('Content-Type', '').startswith(
+                    'text/event-stream')):
+            return response
+        if not response.streaming and (
+                len(response.content) < settings.COMPRESS_MIN_BYTES):
+            return response
+        patch_vary_headers(response, ['Accept-Encoding'])
+        encoding = accepted_encoding(
+            request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _acompress_chunks(
+                    encoding, response.streaming_content)
+            else:
+                response.streaming_content = _compress_chunks(
+                    encoding, response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = compress(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
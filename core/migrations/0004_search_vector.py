@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:33
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Конфигурация без стемминга: в базе вопросы на разных языках
+SEARCH_CONFIG = 'pg_catalog.simple'
+TABLES = ('core_question', 'core_answer')
+
+
+def create_search_triggers(apps, schema_editor):
+    """
+    Триггер поддерживает search_vector при INSERT/UPDATE (в том числе для
+    bulk_create), GIN-индекс ускоряет @@. Только для PostgreSQL: в SQLite
+    поиск работает через LIKE и колонка остаётся пустой.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_search_vector_trg "
+            f"BEFORE INSERT OR UPDATE OF text ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger("
+            f"search_vector, '{SEARCH_CONFIG}', text)"
+        )
+        schema_editor.execute(
+            f"UPDATE {table} SET search_vector = "
+            f"to_tsvector('{SEARCH_CONFIG}', text)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {table}_search_vector_gin "
+            f"ON {table} USING gin (search_vector)"
+        )
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_vector_gin")
+        schema_editor.execute(
+            f"DROP TRIGGER IF EXISTS {table}_search_vector_trg ON {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_question_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_question_purge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('question', 'Вопрос'), ('answer', 'Ответ')], max_length=8)),
+                ('action', models.CharField(choices=[('created', 'Создан'), ('deleted', 'Удалён')], max_length=8)),
+                ('object_id', models.IntegerField()),
+                ('question_id', models.IntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -1,14 +1,105 @@
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
+
+
+class TextSearchManager(models.Manager):
+    """Не тянет search_vector в обычных выборках — он нужен только поиску"""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
+class QuestionManager(TextSearchManager):
+    """Скрывает вопросы, которые удаляются в фоне (см. core.deletion)"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(purge_started_at__isnull=True)
+
 
 class Question(models.Model):
     id = models.AutoField(primary_key=True)
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Денормализованы, обновляются вместе с ответами (см. core.counters)
+    answer_count = models.PositiveIntegerField(default=0)
+    last_answer_at = models.DateTimeField(null=True, blank=True)
+    # Заполняется триггером PostgreSQL (см. миграцию 0004), в SQLite пуст
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Задано, пока ответы вопроса удаляются пачками в фоне
+    purge_started_at = models.DateTimeField(null=True, blank=True,
+                                            editable=False)
+
+    objects = QuestionManager()
+    # Включая удаляемые — для самой фоновой очистки
+    all_objects = TextSearchManager()
+
+    class Meta:
+        indexes = [
+            # Ключ курсорной пагинации списка вопросов
+            models.Index(fields=['created_at', 'id'],
+                         name='core_question_created_id_idx'),
+            # Сортировка по активности без агрегации по ответам
+            models.Index(fields=['last_answer_at', 'id'],
+                         name='core_question_activity_idx'),
+        ]
 
 class Answer(models.Model):
     id = models.AutoField(primary_key=True)
-    question_id = models.ForeignKey(Question, on_delete=models.CASCADE)
+    # Отдельный индекс по FK не нужен: его покрывает core_answer_q_created_idx
+    question_id = models.ForeignKey(Question, on_delete=models.CASCADE,
+                                    db_index=False)
     user_id = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = TextSearchManager()
+
+    class Meta:
+        indexes = [
+            # Ответы вопроса в порядке создания; им же пользуются
+            # FK-поиски, каскадное удаление и пересчёт last_answer_at
+            models.Index(fields=['question_id', 'created_at', 'id'],
+                         name='core_answer_q_created_idx'),
+            models.Index(fields=['created_at'],
+                         name='core_answer_created_idx'),
+        ]
+
+
+class ApiKey(models.Model):
+    """
+    Ключ клиента API. Хранится только SHA-256 от ключа: сам ключ
+    показывается один раз при создании (manage.py api_keys create)
+    """
+    name = models.CharField(max_length=100)
+    # Первые символы ключа — чтобы отличать ключи в списке и логах
+    prefix = models.CharField(max_length=8)
+    key_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix}…)"
+
+
+class Change(models.Model):
+    """
+    Запись журнала изменений для GET /api/changes (см. core.changes).
+    Журнал только дописывается; позиция в ленте — id
+    """
+    QUESTION = 'question'
+    ANSWER = 'answer'
+    CREATED = 'created'
+    DELETED = 'deleted'
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=8, choices=[
+        (QUESTION, 'Вопрос'), (ANSWER, 'Ответ')])
+    action = models.CharField(max_length=8, choices=[
+        (CREATED, 'Создан'), (DELETED, 'Удалён')])
+    object_id = models.IntegerField()
+    # Для ответа — его вопрос, для вопроса — он сам
+    question_id = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
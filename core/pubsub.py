@@ -0,0 +1,242 @@
+"""
+Раздача событий подписчикам потоков GET /api/questions/{id}/stream.
+
+Hub держит подписки процесса: тема (id вопроса) -> очереди подписчиков.
+Событие кодируется в JSON один раз и раскладывается по очередям через
+call_soon_threadsafe, поэтому публиковать можно из любого потока, а
+ожидающий подписчик не стоит ничего, кроме asyncio.Queue, и не ходит в БД.
+
+Как событие попадает в Hub, решает бэкенд PUBSUB_BACKEND:
+
+- local: сразу в Hub своего процесса (один процесс или тесты);
+- postgres: через NOTIFY в канал PUBSUB_CHANNEL. В каждом процессе, где
+  есть подписчики, один поток слушает канал (LISTEN) и раздаёт события в
+  свой Hub — так события доходят до подписчиков на всех воркерах.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+from .models import Answer
+from .renderers import FastJSONRenderer
+from .serializers import ANSWER_FIELDS, answer_rows
+
+logger = logging.getLogger(__name__)
+
+ANSWER = 'answer'
+QUESTION_DELETED = 'question-deleted'
+
+# NOTIFY принимает не больше 8000 байт
+_NOTIFY_LIMIT = 7900
+
+
+class Subscription:
+    """Очередь одного подписчика в его event loop"""
+    __slots__ = ('topic', 'loop', 'queue', 'overflowed')
+
+    def __init__(self, topic, loop, queue_size):
+        self.topic = topic
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # Подписчик не успевает читать: поток закрывается, а клиент
+        # переподключается с Last-Event-ID и дочитывает пропущенное из БД
+        self.overflowed = False
+
+    def offer(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Hub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics = {}
+        self._count = 0
+
+    def subscribe(self, topic):
+        """Подписка в текущем event loop; None, если подписчиков слишком много"""
+        with self._lock:
+            if self._count >= settings.SSE_MAX_SUBSCRIBERS:
+                return None
+            subscription = Subscription(topic, asyncio.get_running_loop(),
+                                        settings.SSE_QUEUE_SIZE)
+            self._topics.setdefault(topic, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._topics[subscription.topic]
+            self._count -= 1
+
+    def dispatch(self, topic, message):
+        """Раздаёт сообщение подписчикам темы; можно вызывать из любого потока"""
+        with self._lock:
+            subscribers = tuple(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription.offer, message)
+            except RuntimeError:
+                # event loop подписчика уже закрыт
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        return self._count
+
+    def clear(self):
+        with self._lock:
+            self._topics.clear()
+            self._count = 0
+
+
+hub = Hub()
+
+
+class LocalBackend:
+    """События видны только подписчикам этого процесса"""
+
+    def publish(self, topic, messages):
+        for message in messages:
+            hub.dispatch(topic, message)
+
+    def ensure_listening(self):
+        pass
+
+
+class PostgresBackend:
+    """
+    NOTIFY/LISTEN PostgreSQL. Слушающий поток запускается при первой
+    подписке в процессе (то есть уже в воркере, после fork) и держит
+    отдельное соединение вне пула Django
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def publish(self, topic, messages):
+        with connection.cursor() as cursor:
+            for payload in self._payloads(topic, messages):
+                cursor.execute('SELECT pg_notify(%s, %s)',
+                               [settings.PUBSUB_CHANNEL, payload])
+
+    @staticmethod
+    def _payloads(topic, messages):
+        """Упаковывает сообщения в как можно меньше NOTIFY"""
+        batch = []
+        for event, event_id, body in messages:
+            message = [event, event_id, body]
+            if len(json.dumps(message).encode()) > _NOTIFY_LIMIT:
+                # Длинный ответ не влезает в NOTIFY: отправляем только id,
+                # слушатель дочитает ответ из БД один раз на процесс
+                message = [event, event_id, None]
+            payload = json.dumps({'topic': topic, 'messages': batch + [message]})
+            if batch and len(payload.encode()) > _NOTIFY_LIMIT:
+                yield json.dumps({'topic': topic, 'messages': batch})
+                batch = []
+            batch.append(message)
+        if batch:
+            yield json.dumps({'topic': topic, 'messages': batch})
+
+    def ensure_listening(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._listen, name='pubsub-listen', daemon=True)
+                self._thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception("Соединение LISTEN потеряно, переподключение")
+                time.sleep(1)
+
+    def _listen_once(self):
+        wrapper = connections['default']
+        raw = wrapper.Database.connect(**wrapper.get_connection_params())
+        raw.autocommit = True
+        try:
+            with raw.cursor() as cursor:
+                cursor.execute(
+                    f'LISTEN "{settings.PUBSUB_CHANNEL}"')
+            logger.info("Подписка на канал %s", settings.PUBSUB_CHANNEL)
+            while True:
+                for payload in self._notifications(raw):
+                    self._deliver(payload)
+        finally:
+            raw.close()
+
+    @staticmethod
+    def _notifications(raw):
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        if is_psycopg3:
+            return [n.payload for n in raw.notifies(timeout=5)]
+        if select.select([raw], [], [], 5) == ([], [], []):
+            return []
+        raw.poll()
+        payloads = [n.payload for n in raw.notifies]
+        raw.notifies.clear()
+        return payloads
+
+    @staticmethod
+    def _deliver(payload):
+        data = json.loads(payload)
+        for event, event_id, body in data['messages']:
+            if body is None and event == ANSWER:
+                rows = list(Answer.objects.filter(id=event_id)
+                            .values(*ANSWER_FIELDS))
+                connections['default'].close()
+                if not rows:
+                    continue
+                body = encode(answer_rows(rows)[0])
+            hub.dispatch(data['topic'], (event, event_id, body))
+
+
+BACKENDS = {'local': LocalBackend(), 'postgres': PostgresBackend()}
+
+
+def backend():
+    return BACKENDS[settings.PUBSUB_BACKEND]
+
+
+def encode(data):
+    return FastJSONRenderer().render(data).decode()
+
+
+def publish_answers(question_id, answers):
+    """
+    Публикует новые ответы после коммита текущей транзакции: подписчики
+    не должны увидеть ответ, которого потом не окажется в БД. Сбой
+    публикации только логируется — ответ уже сохранён
+    """
+    rows = answer_rows([
+        {'id': a.id, 'text': a.text, 'created_at': a.created_at,
+         'user_id': a.user_id_id}
+        for a in answers
+    ])
+    messages = [(ANSWER, row['id'], encode(row)) for row in rows]
+    transaction.on_commit(
+        lambda: backend().publish(question_id, messages), robust=True)
+
+
+def publish_question_deleted(question_id):
+    message = (QUESTION_DELETED, None, encode({'id': question_id}))
+    transaction.on_commit(
+        lambda: backend().publish(question_id, [message]), robust=True)
@@ -0,0 +1,169 @@
+"""
+Ограничение частоты запросов: token bucket на пару (API-ключ, маршрут).
+Общий ключ X_API_KEY (LEGACY_KEY) используют все старые клиенты, поэтому
+для него ведро заводится на адрес клиента, а не на ключ.
+
+Ведро вмещает RATE_LIMIT_BURST запросов и пополняется со скоростью
+RATE_LIMIT_RATE в секунду; для отдельных маршрутов (по имени из urls)
+лимиты переопределяются в RATE_LIMIT_ROUTES. Состояние хранится в памяти
+процесса (memory) или в общем кэше Django (cache), чтобы лимит был один
+на все воркеры.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+# Модулем, а не именем: core.auth сам импортирует ratelimit
+from . import auth
+
+# Маршрут-ведро для походов в БД за неизвестными API-ключами
+LOOKUP_ROUTE = 'api-key-lookup'
+
+
+def _refill(state, rate, burst, now):
+    """Новое состояние ведра и время ожидания (0 — запрос пропущен)"""
+    if state is None:
+        tokens = burst
+    else:
+        tokens, updated = state
+        tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class MemoryBackend:
+    """Вёдра в памяти процесса; самые давние вытесняются при переполнении"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            state, wait = _refill(self._buckets.get(key), rate, burst, now)
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > settings.RATE_LIMIT_MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBackend:
+    """
+    Вёдра в кэше RATE_LIMIT_CACHE_ALIAS, общем для процессов.
+
+    Чтение и запись не атомарны: при параллельных запросах одного клиента
+    лимит может быть превышен на число одновременных запросов
+    """
+
+    def take(self, key, rate, burst):
+        cache = caches[settings.RATE_LIMIT_CACHE_ALIAS]
+        cache_key = f'ratelimit:{key}'
+        state, wait = _refill(cache.get(cache_key), rate, burst, time.time())
+        # За burst / rate секунд ведро наполняется целиком — дальше запись не нужна
+        cache.set(cache_key, state, timeout=math.ceil(burst / rate) + 1)
+        return wait
+
+    def clear(self):
+        caches[settings.RATE_LIMIT_CACHE_ALIAS].clear()
+
+
+BACKENDS = {'memory': MemoryBackend(), 'cache': CacheBackend()}
+
+
+def limits_for(route):
+    """(rate, burst) для маршрута"""
+    return settings.RATE_LIMIT_ROUTES.get(
+        route, (settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST))
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.url_name if match is not None else request.path
+
+
+def client_address(request):
+    """
+    Адрес клиента: REMOTE_ADDR или адрес из RATE_LIMIT_CLIENT_HEADER,
+    дописанный ближайшим из RATE_LIMIT_TRUSTED_PROXIES доверенных прокси.
+    Левые адреса в заголовке пишет сам клиент, им верить нельзя
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    if not settings.RATE_LIMIT_CLIENT_HEADER:
+        return address
+    forwarded = [part.strip() for part in request.headers.get(
+        settings.RATE_LIMIT_CLIENT_HEADER, '').split(',') if part.strip()]
+    if not forwarded:
+        return address
+    hops = max(1, settings.RATE_LIMIT_TRUSTED_PROXIES)
+    return forwarded[max(0, len(forwarded) - hops)]
+
+
+def client_id(key_id, request):
+    """Чьё ведро: id ключа, а для общего ключа — ещё и адрес клиента"""
+    if key_id != auth.LEGACY_KEY:
+        return key_id
+    return f'{key_id}@{client_address(request)}'
+
+
+def take(key_id, route):
+    """
+    Забирает токен из ведра (key_id, route). Возвращает None, если запрос
+    можно выполнять, иначе через сколько секунд повторить (для Retry-After)
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    rate, burst = limits_for(route)
+    wait = BACKENDS[settings.RATE_LIMIT_BACKEND].take(
+        f'{key_id}:{route}', rate, burst)
+    return max(1, math.ceil(wait)) if wait else None
+
+
+async def atake(key_id, route):
+    """take для async-представлений: бэкенд cache ходит в кэш синхронно"""
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND == 'cache':
+        return await sync_to_async(take)(key_id, route)
+    return take(key_id, route)
+
+
+def take_lookup(request):
+    """
+    Токен на проверку ключа, которого нет в кэшах: ведро на адрес клиента,
+    лимиты маршрута LOOKUP_ROUTE
+    """
+    return take(f'lookup@{client_address(request)}', LOOKUP_ROUTE)
+
+
+async def atake_lookup(request):
+    return await atake(f'lookup@{client_address(request)}', LOOKUP_ROUTE)
+
+
+def reset():
+    for backend in BACKENDS.values():
+        backend.clear()
+
+
+class ApiKeyRateThrottle(BaseThrottle):
+    """DRF-обёртка для представлений с core.auth.ApiKeyAuthentication"""
+
+    def allow_request(self, request, view):
+        if request.auth is None:
+            return True
+        self.retry_after = take(client_id(request.auth, request),
+                                route_name(request))
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
@@ -0,0 +1,138 @@
+import json
+from operator import itemgetter
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Рендерер для потоковой выгрузки: одна JSON-строка на запись.
+
+    Саму выгрузку отдаёт StreamingHttpResponse, класс нужен, чтобы DRF
+    принимал ?format=ndjson при согласовании, и для ответов с ошибками.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, ensure_ascii=False) + '\n').encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer DRF на orjson, если он установлен; вывод побайтно тот же.
+
+    Отступы, ensure_ascii и всё, что orjson не умеет (большие целые,
+    нестроковые ключи), отдаются родительскому классу. Числа с плавающей
+    точкой orjson пишет иначе (1e-5 вместо 1e-05), поэтому рендерер
+    подключается только к ответам без них: вопросам и ответам
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii
+                or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {})
+                is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer, экранируем разделители строк для JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def columnar(data):
+    """
+    Списки словарей -> словарь колонок: ключи один раз, за каждым — массив
+    значений по строкам. [{"id": 1, "text": "a"}, {"id": 2, "text": "b"}]
+    превращается в {"id": [1, 2], "text": ["a", "b"]}. Пустой список — {}
+    """
+    if isinstance(data, dict):
+        return {key: columnar(value) for key, value in data.items()}
+    if isinstance(data, list):
+        if not data:
+            return {}
+        if all(isinstance(item, dict) for item in data):
+            return _columns(data)
+        return [columnar(item) for item in data]
+    return data
+
+
+def _columns(rows):
+    keys = list(rows[0])
+    if len(keys) > 1 and all(len(row) == len(keys) for row in rows):
+        # Строки с одинаковыми полями (обычный случай) транспонируются
+        # без цикла на Python; KeyError — поля всё же разные
+        try:
+            columns = zip(*map(itemgetter(*keys), rows))
+            return {key: _column(list(values))
+                    for key, values in zip(keys, columns)}
+        except KeyError:
+            pass
+    keys = dict.fromkeys(key for row in rows for key in row)
+    return {key: _column([row.get(key) for row in rows]) for key in keys}
+
+
+def _column(values):
+    # Обычно в колонке только скаляры — тогда она отдаётся как есть
+    types = set(map(type, values))
+    if any(issubclass(kind, (dict, list)) for kind in types):
+        return [columnar(value) for value in values]
+    return values
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """
+    JSON с колоночной раскладкой списков (см. columnar): в длинных
+    страницах имена полей не повторяются в каждой строке
+    """
+    media_type = 'application/vnd.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return super().render(columnar(data), accepted_media_type,
+                              renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack (пакет msgpack). Структура та же, что у JSON; даты — те же
+    строки ISO 8601, прочие типы кодируются энкодером DRF
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=JSONRenderer.encoder_class().default,
+                             use_bin_type=True)
+
+
+# Компактные форматы для больших ответов; MessagePack — только если
+# установлен msgpack
+COMPACT_RENDERERS = [ColumnarJSONRenderer]
+if msgpack is not None:
+    COMPACT_RENDERERS.append(MessagePackRenderer)
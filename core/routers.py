@@ -0,0 +1,142 @@
+"""
+Чтение с реплик (DATABASE_REPLICAS) с read-your-writes.
+
+Пишет всё в default. Представления, помеченные replica_reads, читают с
+одной из живых реплик, выбранной случайно; остальной код читает с default,
+как и раньше. Реплика, к которой не удалось подключиться, исключается на
+REPLICA_RETRY_SECONDS секунд, а запрос идёт на следующую реплику или на
+default.
+
+Кэш вопросов наполняется только чтениями с default (primary_reads):
+страница с отстающей реплики могла бы вернуть в кэш версию, которую
+только что сбросила запись, на весь QUESTION_CACHE_TTL. «Липкий» клиент
+читает вопрос мимо кэша: запись сбрасывает кэш только своего процесса.
+
+Реплика отстаёт от основной БД, поэтому после успешного изменяющего
+запроса клиент получает метку primary_until (cookie и заголовок
+X-Primary-Until, см. PrimaryStickinessMiddleware). Пока она не истекла,
+чтения клиента идут в default, и только что созданный ответ всегда виден.
+Клиенты без cookie повторяют метку в заголовке X-Primary-Until.
+"""
+import contextvars
+import logging
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'primary_until'
+STICKY_HEADER = 'X-Primary-Until'
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+_lock = threading.Lock()
+_down_until = {}
+
+
+class ReplicaRouter:
+    """Чтения — в алиас, выбранный replica_reads для текущего запроса"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и default
+        return True
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут в default, даже в представлении с replica_reads"""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def sticky_until(request):
+    """Время (unix), до которого клиент читает с основной БД; 0 — не задано"""
+    value = (request.headers.get(STICKY_HEADER)
+             or request.COOKIES.get(STICKY_COOKIE))
+    try:
+        return float(value) if value else 0
+    except ValueError:
+        return 0
+
+
+def is_sticky(request):
+    return sticky_until(request) > time.time()
+
+
+def stick_to_primary(response):
+    """Ставит клиенту метку чтения с основной БД на REPLICA_STICKY_SECONDS"""
+    window = settings.REPLICA_STICKY_SECONDS
+    # Отбрасываем, а не округляем: окно не должно вырасти на миллисекунду
+    until = f'{math.floor((time.time() + window) * 1000) / 1000:.3f}'
+    response[STICKY_HEADER] = until
+    response.set_cookie(STICKY_COOKIE, until, max_age=window,
+                        httponly=True, samesite='Lax')
+    return response
+
+
+def _mark_down(alias):
+    with _lock:
+        _down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+
+def _healthy(replicas):
+    now = time.monotonic()
+    with _lock:
+        return [alias for alias in replicas if _down_until.get(alias, 0) <= now]
+
+
+def reset():
+    """Забывает недоступные реплики (для тестов)"""
+    with _lock:
+        _down_until.clear()
+
+
+def choose_read_alias(request):
+    """
+    Алиас БД для чтений запроса: default для «липкого» клиента и когда
+    живых реплик нет, иначе случайная реплика, к которой удалось подключиться
+    """
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas or is_sticky(request):
+        return DEFAULT_DB_ALIAS
+    candidates = _healthy(replicas)
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError as e:
+            logger.warning(
+                "Реплика %s недоступна, исключена на %s с: %s",
+                alias, settings.REPLICA_RETRY_SECONDS, e)
+            _mark_down(alias)
+            continue
+        return alias
+    return DEFAULT_DB_ALIAS
+
+
+def replica_reads(view_func):
+    """Декоратор: чтения метода класса идут через choose_read_alias"""
+    @wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        token = _read_alias.set(choose_read_alias(request))
+        try:
+            return view_func(self, request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
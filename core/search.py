@@ -0,0 +1,66 @@
+"""
+Полнотекстовый поиск по вопросам и ответам.
+
+В PostgreSQL ищем по search_vector (поддерживается триггером, GIN-индекс)
+и ранжируем SearchRank. На других СУБД (SQLite в тестах) — запасной
+вариант через icontains по каждому слову запроса, ранг у всех одинаковый.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+
+from .models import Question, Answer
+
+SEARCH_CONFIG = 'simple'
+RESULT_FIELDS = ('kind', 'id', 'question', 'text', 'created_at', 'rank')
+
+
+def _postgres_querysets(q):
+    query = SearchQuery(q, config=SEARCH_CONFIG, search_type='websearch')
+    rank = SearchRank(F('search_vector'), query)
+    questions = Question.objects.filter(search_vector=query).annotate(
+        kind=Value('question'), question=F('id'), rank=rank)
+    answers = Answer.objects.filter(search_vector=query).annotate(
+        kind=Value('answer'), question=F('question_id'), rank=rank)
+    return questions, answers
+
+
+def _fallback_querysets(q):
+    condition = Q()
+    for term in q.split():
+        condition &= Q(text__icontains=term)
+    rank = Value(1.0, output_field=FloatField())
+    questions = Question.objects.filter(condition).annotate(
+        kind=Value('question'), question=F('id'), rank=rank)
+    answers = Answer.objects.filter(condition).annotate(
+        kind=Value('answer'), question=F('question_id'), rank=rank)
+    return questions, answers
+
+
+def search(q, offset, limit):
+    """
+    Страница результатов поиска одним запросом (UNION ALL вопросов и ответов),
+    по убыванию ранга. Возвращает не больше limit + 1 строк, чтобы вызывающий
+    мог понять, есть ли следующая страница.
+    """
+    if connection.vendor == 'postgresql':
+        questions, answers = _postgres_querysets(q)
+    else:
+        questions, answers = _fallback_querysets(q)
+
+    results = (
+        questions.values(*RESULT_FIELDS)
+        .union(answers.values(*RESULT_FIELDS), all=True)
+        .order_by('-rank', 'kind', 'id')
+    )
+    return [
+        {
+            'type': row['kind'],
+            'id': row['id'],
+            'question_id': row['question'],
+            'text': row['text'],
+            'created_at': row['created_at'],
+            'rank': row['rank'],
+        }
+        for row in results[offset:offset + limit + 1]
+    ]
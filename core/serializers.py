@@ -1,14 +1,103 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from core.models import Question, Answer
 
+# Поля ответов API в порядке сериализаторов ниже — для .values()
+QUESTION_FIELDS = ('id', 'text', 'created_at', 'answer_count', 'last_answer_at')
+ANSWER_FIELDS = ('id', 'text', 'created_at', 'user_id')
+
 
 class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Question
-        fields = ['id', 'text', "created_at"]
+        fields = ['id', 'text', "created_at", "answer_count", "last_answer_at"]
+        read_only_fields = ['answer_count', 'last_answer_at']
 
 class AnswerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Answer
         fields = ["id", "text", "created_at", "user_id"]
-        read_only_fields = ['user_id']
\ No newline at end of file
+        read_only_fields = ['user_id']
+
+class SearchResultSerializer(serializers.Serializer):
+    """Строка результата поиска: вопрос или ответ"""
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    question_id = serializers.IntegerField()
+    text = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    rank = serializers.FloatField()
+
+
+def datetime_formatter():
+    """
+    Функция, форматирующая даты так же, как DateTimeField DRF.
+
+    Зона выбирается один раз на пачку строк; для UTC строка собирается
+    без astimezone и без обращения к настройкам на каждое значение
+    """
+    field = serializers.DateTimeField()
+    if not settings.USE_TZ or timezone.get_current_timezone_name() != 'UTC':
+        return field.to_representation
+
+    def format_utc(value):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.isoformat() + 'Z'
+        if value.utcoffset():
+            return field.to_representation(value)
+        return value.isoformat()[:-6] + 'Z'
+    return format_utc
+
+
+def question_rows(rows):
+    """
+    Строки Question.objects.values(*QUESTION_FIELDS) -> то же, что
+    QuestionSerializer(many=True).data, без машинерии полей DRF
+    """
+    format_datetime = datetime_formatter()
+    for row in rows:
+        row['created_at'] = format_datetime(row['created_at'])
+        row['last_answer_at'] = format_datetime(row['last_answer_at'])
+    return rows
+
+
+def answer_rows(rows):
+    """Строки Answer.objects.values(*ANSWER_FIELDS) -> как AnswerSerializer"""
+    format_datetime = datetime_formatter()
+    for row in rows:
+        row['created_at'] = format_datetime(row['created_at'])
+    return rows
+
+
+def answer_page_fields(with_username=False):
+    """
+    Поля .values() для страницы ответов вместе с их вопросом: колонки
+    вопроса приезжают JOIN-ом в каждой строке, и страница читается одним
+    запросом по индексу ответов (question_id, created_at, id)
+    """
+    fields = [*ANSWER_FIELDS,
+              *(f'question_id__{field}' for field in QUESTION_FIELDS)]
+    if with_username:
+        fields.append('user_id__username')
+    return fields
+
+
+def split_answer_page(rows, with_username=False):
+    """
+    Строки answer_page_fields -> (вопрос или None, если строк нет; ответы).
+    Ответы в формате AnswerSerializer, плюс username по запросу
+    """
+    question = None
+    if rows:
+        question = {field: rows[0][f'question_id__{field}']
+                    for field in QUESTION_FIELDS}
+    answers = []
+    for row in rows:
+        answer = {field: row[field] for field in ANSWER_FIELDS}
+        if with_username:
+            answer['username'] = row['user_id__username']
+        answers.append(answer)
+    return question, answers
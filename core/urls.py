@@ -1,14 +1,40 @@
 from django.urls import path
+from .async_views import (
+    AsyncQuestionListView,
+    AsyncQuestionDetailView,
+    AsyncAnswerCreateView,
+    AsyncAnswerDetailView,
+    AnswerStreamView
+)
 from .views import (
     QuestionListView,
     QuestionDetailView,
     AnswerCreateView,
-    AnswerDetailView
+    QuestionBulkCreateView,
+    AnswerBulkCreateView,
+    AnswerDetailView,
+    ChangesView,
+    ExportView,
+    IngestStatusView,
+    SearchView
 )
 
 urlpatterns = [
     path('questions', QuestionListView.as_view(), name='question-list'),
+    path('questions/bulk', QuestionBulkCreateView.as_view(), name='question-bulk-create'),
     path('questions/<int:id>', QuestionDetailView.as_view(), name='question-detail'),
     path('questions/<int:id>/answers', AnswerCreateView.as_view(), name='answer-create'),
+    path('questions/<int:id>/stream', AnswerStreamView.as_view(), name='answer-stream'),
+    path('questions/<int:id>/answers/bulk', AnswerBulkCreateView.as_view(), name='answer-bulk-create'),
     path('answers/<int:answer_id>', AnswerDetailView.as_view(), name='answer-detail'),
+    path('changes', ChangesView.as_view(), name='changes'),
+    path('ingest/<str:tracking_id>', IngestStatusView.as_view(), name='ingest-status'),
+    path('export', ExportView.as_view(), name='export'),
+    path('search', SearchView.as_view(), name='search'),
+
+    # Те же эндпоинты на async ORM для запуска под ASGI (uvicorn/daphne)
+    path('async/questions', AsyncQuestionListView.as_view(), name='async-question-list'),
+    path('async/questions/<int:id>', AsyncQuestionDetailView.as_view(), name='async-question-detail'),
+    path('async/questions/<int:id>/answers', AsyncAnswerCreateView.as_view(), name='async-answer-create'),
+    path('async/answers/<int:answer_id>', AsyncAnswerDetailView.as_view(), name='async-answer-detail'),
 ]
\ No newline at end of file
@@ -1,18 +1,100 @@
-from functools import wraps
+from functools import lru_cache, wraps
+from django.contrib.auth.models import User
+from django.http import HttpResponse
 from rest_framework import status
 from rest_framework.response import Response
-from Test.settings import X_API_KEY
+
+from .auth import KeyLookupThrottled, acheck_key, check_key
+from .ratelimit import atake, client_id, route_name, take
+from .renderers import FastJSONRenderer
+
+RATE_LIMITED = {"error": "Слишком много запросов, повторите позже"}
+
+
+def rate_limited(retry_after):
+    return Response(
+        RATE_LIMITED,
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(retry_after)},
+        content_type='application/json; charset=utf-8'
+    )
+
 
 def api_key_required(view_func):
     """Декоратор для проверки API-KEY для методов класса"""
     @wraps(view_func)
     def wrapper(self, request, *args, **kwargs):
-        api_key = request.headers.get('X-API-KEY')
-        if not api_key or api_key != X_API_KEY:
+        try:
+            key_id = check_key(request.headers.get('X-API-KEY'), request)
+        except KeyLookupThrottled as exc:
+            return rate_limited(exc.retry_after)
+        if key_id is None:
             return Response(
                 {"error": "Неверный API-Ключ"},
                 status=status.HTTP_403_FORBIDDEN,
                 content_type='application/json; charset=utf-8'
             )
+        retry_after = take(client_id(key_id, request), route_name(request))
+        if retry_after is not None:
+            return rate_limited(retry_after)
         return view_func(self, request, *args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+def json_response(data, status=200):
+    """HttpResponse с тем же JSON, что отдаёт DRF (для async-представлений)"""
+    return HttpResponse(
+        FastJSONRenderer().render(data),
+        status=status,
+        content_type='application/json'
+    )
+
+
+def async_rate_limited(retry_after):
+    response = json_response(
+        RATE_LIMITED, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def async_api_key_required(view_func):
+    """Декоратор для проверки API-KEY для async-методов класса"""
+    @wraps(view_func)
+    async def wrapper(self, request, *args, **kwargs):
+        try:
+            key_id = await acheck_key(request.headers.get('X-API-KEY'), request)
+        except KeyLookupThrottled as exc:
+            return async_rate_limited(exc.retry_after)
+        if key_id is None:
+            return json_response(
+                {"error": "Неверный API-Ключ"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        retry_after = await atake(client_id(key_id, request),
+                                  route_name(request))
+        if retry_after is not None:
+            return async_rate_limited(retry_after)
+        return await view_func(self, request, *args, **kwargs)
+    return wrapper
+
+
+SYSTEM_USER_USERNAME = 'system_answer_bot'
+
+
+@lru_cache(maxsize=None)
+def get_system_user_id():
+    """
+    id системного пользователя, от имени которого создаются ответы.
+
+    Ищется один раз на процесс; get_or_create сам переживает гонку
+    параллельного создания. Сбросить кэш — get_system_user_id.cache_clear()
+    """
+    user, _ = User.objects.get_or_create(
+        username=SYSTEM_USER_USERNAME,
+        defaults={
+            'is_staff': False,
+            'is_superuser': False,
+            'is_active': True
+        }
+    )
+    return user.id
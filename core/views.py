@@ -1,118 +1,266 @@
+import json
 import logging
-from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Question, Answer
-from core.serializers import QuestionSerializer, AnswerSerializer
-from .utils import api_key_required
+from core.serializers import (
+    ANSWER_FIELDS, QUESTION_FIELDS, AnswerSerializer, QuestionSerializer,
+    SearchResultSerializer, answer_page_fields, answer_rows, question_rows,
+    split_answer_page
+)
+from .cache import get_question_payload, invalidate_question
+from .changes import (
+    InvalidSince, answers_created, changes_since, parse_since,
+    questions_created
+)
+from .counters import answers_added
+from .deletion import (
+    delete_answer, delete_question, schedule_purge, start_purge
+)
+from .ingest import IngestQueueFull, get_status, submit_answer
+from .conditional import (
+    make_etag, not_modified, question_versions, representation_etag,
+    set_validators, timestamp
+)
+from .metrics import timer
+from .pubsub import publish_answers
+from .renderers import COMPACT_RENDERERS, FastJSONRenderer, NDJSONRenderer
+from .routers import is_sticky, primary_reads, replica_reads
+from .search import search
+from .pagination import (
+    InvalidCursor, answer_page_params, get_page_size, keyset_page
+)
+from .utils import api_key_required, get_system_user_id
 
 logger = logging.getLogger(__name__)
 
 
-class QuestionListView(APIView):
+class FormatNegotiationMixin:
+    """
+    Кроме JSON, ответ отдаётся колоночным JSON или MessagePack — по
+    заголовку Accept или ?format=columnar / ?format=msgpack
+    """
+    renderer_classes = [FastJSONRenderer, *COMPACT_RENDERERS,
+                        BrowsableAPIRenderer]
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+
+class QuestionListView(FormatNegotiationMixin, APIView):
+
     @api_key_required
     def post(self, request):
         """
         POST /questions/ — создать новый вопрос
         """
         logger.info(
-            f"POST /questions/ - создание вопроса. Данные: {request.data}")
+            "POST /questions/ - создание вопроса. Данные: %s", request.data)
 
         serializer = QuestionSerializer(data=request.data)
 
         if serializer.is_valid():
-            question = serializer.save()
-            logger.info(f"Вопрос создан успешно. ID: {question.id}")
+            with transaction.atomic():
+                question = serializer.save()
+                questions_created([question.id])
+            logger.info("Вопрос создан успешно. ID: %s", question.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        logger.warning(f"Ошибка валидации вопроса: {serializer.errors}")
+        logger.warning("Ошибка валидации вопроса: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @api_key_required
+    @replica_reads
     def get(self, request):
         """
-        GET /questions/ — список всех вопросов
+        GET /questions/ — список вопросов постранично (курсор по created_at, id)
         """
         logger.info("GET /questions/ - получение списка вопросов")
 
+        page_size = get_page_size(request)
         try:
-            questions = Question.objects.all()
-            serializer = QuestionSerializer(questions, many=True)
-            logger.info(f"Найдено {len(questions)} вопросов")
-            return Response(serializer.data)
+            questions, next_cursor = keyset_page(
+                Question.objects.values(*QUESTION_FIELDS),
+                request.query_params.get('cursor'),
+                page_size
+            )
+            # Без Last-Modified: удаление вопроса или ответа не сдвигает
+            # ни одну дату на странице, меняется только ETag
+            etag = representation_etag(request, make_etag(
+                'questions', next_cursor, *question_versions(questions)))
+            cached = not_modified(request, etag)
+            if cached is not None:
+                return cached
+
+            with timer('serialize'):
+                results = question_rows(questions)
+            logger.info("Найдено %s вопросов на странице", len(questions))
+            return set_validators(Response({
+                "next": next_cursor,
+                "results": results
+            }), etag)
+        except InvalidCursor:
+            logger.warning("Передан некорректный курсор пагинации")
+            return Response(
+                {"error": "Некорректный курсор"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
-            logger.error(f"Ошибка при получении вопросов: {str(e)}")
+            logger.error("Ошибка при получении вопросов: %s", e)
             return Response(
                 {"error": "Вопросов не найдено!"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
 
-class QuestionDetailView(APIView):
+class QuestionDetailView(FormatNegotiationMixin, APIView):
+
     @api_key_required
+    @replica_reads
     def get(self, request, id):
         """
-        GET /questions/{id} — получить вопрос и все ответы на него
+        GET /questions/{id} — получить вопрос и страницу ответов на него
+        (?cursor=, ?page_size=, ?include=username)
         """
-        logger.info(f"GET /questions/{id} - получение вопроса с ответами")
+        logger.info("GET /questions/%s - получение вопроса с ответами", id)
 
+        cursor, page_size, with_username, default_page = (
+            answer_page_params(request))
         try:
-            question = Question.objects.get(id=id)
-            answers = Answer.objects.filter(question_id=question.id)
+            def load():
+                return self._load_payload(id, cursor, page_size, with_username)
 
-            question_serializer = QuestionSerializer(question)
-            answer_serializer = AnswerSerializer(answers, many=True)
+            def load_primary():
+                with primary_reads():
+                    return load()
 
-            logger.info(f"Вопрос {id} найден. Ответов: {answers.count()}")
+            # В кэш кладём только первую страницу с параметрами по умолчанию.
+            # Промах читается с основной БД: страница с отстающей реплики
+            # вернула бы в кэш версию, сброшенную записью. «Липкий» клиент
+            # читает мимо кэша: его запись сбросила кэш только того воркера,
+            # который её обработал
+            if is_sticky(request):
+                payload = load_primary()
+            elif default_page:
+                payload = get_question_payload(id, load_primary)
+            else:
+                payload = load()
+            etag = representation_etag(request, payload['etag'])
+            cached = not_modified(request, etag)
+            if cached is not None:
+                return cached
+
+            logger.info(
+                "Вопрос %s найден. Ответов на странице: %s", id, len(payload['data']['answers']))
+            return set_validators(
+                Response(payload['data'], status=status.HTTP_200_OK),
+                etag
+            )
+        except InvalidCursor:
+            logger.warning("Передан некорректный курсор ответов")
             return Response(
-                {
-                    "question": question_serializer.data,
-                    "answers": answer_serializer.data
-                },
-                status=status.HTTP_200_OK
+                {"error": "Некорректный курсор"},
+                status=status.HTTP_400_BAD_REQUEST
             )
         except Question.DoesNotExist:
-            logger.warning(f"Вопрос с id={id} не найден")
+            logger.warning("Вопрос с id=%s не найден", id)
             return Response(
                 {"error": f"Вопрос id={id} не найден!"},
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Ошибка при получении вопроса {id}: {str(e)}")
+            logger.error("Ошибка при получении вопроса %s: %s", id, e)
             return Response(
                 {"error": "Произошла ошибка при получении вопроса"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @staticmethod
+    def _load_payload(id, cursor, page_size, with_username):
+        """
+        Читает вопрос со страницей ответов в виде, пригодном для кэша.
+
+        Один запрос: ответы по индексу с вопросом через JOIN. Второй нужен,
+        только если на странице нет ни одного ответа. ETag меняется вместе
+        с answer_count, то есть при любом добавлении или удалении ответа
+        """
+        rows, next_cursor = keyset_page(
+            Answer.objects.filter(question_id=id,
+                                  question_id__purge_started_at__isnull=True)
+            .values(*answer_page_fields(with_username)),
+            cursor, page_size
+        )
+        question, answers = split_answer_page(rows, with_username)
+        if question is None:
+            question = Question.objects.values(*QUESTION_FIELDS).get(id=id)
+        etag = make_etag(
+            'question', question['id'], question['created_at'].isoformat(),
+            question['answer_count'], cursor, next_cursor, with_username,
+            *(a['id'] for a in answers)
+        )
+        with timer('serialize'):
+            data = {
+                "question": question_rows([question])[0],
+                "answers": answer_rows(answers),
+                "next": next_cursor
+            }
+        return {"etag": etag, "data": data}
+
     @api_key_required
     def delete(self, request, id):
         """
-        DELETE /questions/{id} — удалить вопрос (вместе с ответами)
+        DELETE /questions/{id} — удалить вопрос (вместе с ответами).
+        С ?mode=purge вопрос сразу скрывается, а ответы удаляются в фоне
         """
-        logger.info(f"DELETE /questions/{id} - удаление вопроса")
+        logger.info("DELETE /questions/%s - удаление вопроса", id)
 
         try:
-            question = Question.objects.get(id=id)
-            answers_count = Answer.objects.filter(question_id=id).count()
-            question.delete()
+            if request.query_params.get('mode') == 'purge':
+                return self._purge(id)
+
+            answers_count = delete_question(id)
+            if answers_count is None:
+                raise Question.DoesNotExist
+            invalidate_question(id)
 
             logger.info(
-                f"Вопрос {id} удален. Удалено ответов: {answers_count}")
+                "Вопрос %s удален. Удалено ответов: %s", id, answers_count)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Question.DoesNotExist:
-            logger.warning(f"Попытка удаления несуществующего вопроса id={id}")
+            logger.warning(
+                "Попытка удаления несуществующего вопроса id=%s", id)
             return Response(
                 {"error": f"Вопроса с id={id} не найдено!"},
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Ошибка при удалении вопроса {id}: {str(e)}")
+            logger.error("Ошибка при удалении вопроса %s: %s", id, e)
             return Response(
                 {"error": "Произошла ошибка при удалении вопроса"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @staticmethod
+    def _purge(id):
+        if not start_purge(id):
+            raise Question.DoesNotExist
+        invalidate_question(id)
+        schedule_purge(id)
+        logger.info("Вопрос %s скрыт, ответы удаляются в фоне", id)
+        return Response({"id": id, "status": "purging"},
+                        status=status.HTTP_202_ACCEPTED)
+
 
 class AnswerCreateView(APIView):
     @api_key_required
@@ -121,75 +269,251 @@ class AnswerCreateView(APIView):
         POST /questions/{id}/answers/ — добавить ответ к вопросу
         """
         logger.info(
-            f"POST /questions/{id}/answers/ - создание ответа. Данные: {request.data}")
+            "POST /questions/%s/answers/ - создание ответа. Данные: %s", id, request.data)
+
+        serializer = AnswerSerializer(data=request.data)
+        if not serializer.is_valid():
+            logger.warning("Ошибка валидации ответа: %s", serializer.errors)
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         try:
-            question = Question.objects.get(id=id)
-            serializer = AnswerSerializer(data=request.data)
-
-            if serializer.is_valid():
-                # Получаем системного пользователя
-                user, created = User.objects.get_or_create(
-                    username='system_answer_bot',
-                    defaults={
-                        'is_staff': False,
-                        'is_superuser': False,
-                        'is_active': True
-                    }
-                )
+            if settings.ANSWER_WRITE_BEHIND:
+                return self._enqueue(id, serializer.validated_data['text'])
 
-                answer = serializer.save(question_id=question, user_id=user)
-                logger.info(
-                    f"Ответ создан успешно. ID ответа: {answer.id}, вопрос: {id}")
-                return Response(serializer.data,
-                                status=status.HTTP_201_CREATED)
-            else:
-                logger.warning(f"Ошибка валидации ответа: {serializer.errors}")
-                return Response(
-                    serializer.errors,
-                    status=status.HTTP_400_BAD_REQUEST
+            with transaction.atomic():
+                answer = serializer.save(
+                    question_id_id=id,
+                    user_id_id=get_system_user_id()
                 )
+                # UPDATE счётчиков заодно проверяет, что вопрос существует
+                if not answers_added(id, answer.created_at):
+                    raise Question.DoesNotExist
+                answers_created(id, [answer.id])
+                publish_answers(id, [answer])
+            invalidate_question(id)
+            logger.info(
+                "Ответ создан успешно. ID ответа: %s, вопрос: %s", answer.id, id)
+            return Response(serializer.data,
+                            status=status.HTTP_201_CREATED)
 
         except Question.DoesNotExist:
             logger.warning(
-                f"Попытка создания ответа для несуществующего вопроса id={id}")
+                "Попытка создания ответа для несуществующего вопроса id=%s", id)
             return Response(
                 {"error": f"Вопрос с id={id} не был найден"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except IntegrityError:
+            # Вопрос на месте, значит, нарушен ключ системного пользователя
+            get_system_user_id.cache_clear()
+            logger.error(
+                "Системный пользователь не найден при создании ответа для вопроса %s", id)
+            return Response(
+                {"error": "Произошла ошибка при создании ответа"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
         except Exception as e:
             logger.error(
-                f"Ошибка при создании ответа для вопроса {id}: {str(e)}")
+                "Ошибка при создании ответа для вопроса %s: %s", id, e)
             return Response(
                 {"error": "Произошла ошибка при создании ответа"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @staticmethod
+    def _enqueue(id, text):
+        """
+        Буферизованная запись (ANSWER_WRITE_BEHIND): ответ ставится в
+        очередь, клиент получает tracking_id и адрес статуса
+        """
+        if not Question.objects.filter(id=id).exists():
+            raise Question.DoesNotExist
+        try:
+            tracking_id = submit_answer(id, get_system_user_id(), text)
+        except IngestQueueFull:
+            logger.warning("Очередь записи ответов переполнена")
+            return Response(
+                {"error": "Сервер перегружен, повторите позже"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'}
+            )
+        logger.info(
+            "Ответ принят в очередь записи. tracking_id: %s, вопрос: %s",
+            tracking_id, id)
+        location = reverse('ingest-status', kwargs={'tracking_id': tracking_id})
+        return Response(
+            {"tracking_id": tracking_id, "status": "queued", "question_id": id},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': location}
+        )
+
+
+class IngestStatusView(APIView):
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    @api_key_required
+    def get(self, request, tracking_id):
+        """
+        GET /ingest/{tracking_id} — статус ответа, принятого в очередь
+        записи: queued, written (с answer_id) или failed (с error)
+        """
+        data = get_status(tracking_id)
+        if data is None:
+            return Response(
+                {"error": f"Ответ с tracking_id={tracking_id} не найден"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({"tracking_id": tracking_id, **data},
+                        status=status.HTTP_200_OK)
+
+
+def bulk_errors(serializer):
+    """Ошибки валидации пакета в виде [{"index": i, "errors": {...}}]"""
+    errors = serializer.errors
+    if isinstance(errors, list):
+        errors = dict(enumerate(errors))
+    if errors and all(isinstance(index, int) for index in errors):
+        return {"errors": [
+            {"index": index, "errors": errors[index]}
+            for index in sorted(errors) if errors[index]
+        ]}
+    return {"errors": errors}
+
+
+class QuestionBulkCreateView(APIView):
+    @api_key_required
+    def post(self, request):
+        """
+        POST /questions/bulk — создать пакет вопросов одной транзакцией
+        """
+        logger.info("POST /questions/bulk - пакетное создание вопросов")
+
+        serializer = QuestionSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.BULK_MAX_ITEMS
+        )
+        if not serializer.is_valid():
+            logger.warning(
+                "Ошибка валидации пакета вопросов: %s", serializer.errors)
+            return Response(bulk_errors(serializer),
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                questions = Question.objects.bulk_create(
+                    [Question(**item) for item in serializer.validated_data],
+                    batch_size=settings.BULK_BATCH_SIZE
+                )
+                questions_created([q.id for q in questions])
+            logger.info("Создано вопросов пакетом: %s", len(questions))
+            return Response(QuestionSerializer(questions, many=True).data,
+                            status=status.HTTP_201_CREATED)
+        except Exception as e:
+            logger.error("Ошибка при пакетном создании вопросов: %s", e)
+            return Response(
+                {"error": "Произошла ошибка при создании вопросов"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AnswerBulkCreateView(APIView):
+    @api_key_required
+    def post(self, request, id):
+        """
+        POST /questions/{id}/answers/bulk — добавить пакет ответов к вопросу
+        """
+        logger.info(
+            "POST /questions/%s/answers/bulk - пакетное создание ответов", id)
+
+        serializer = AnswerSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.BULK_MAX_ITEMS
+        )
+        if not serializer.is_valid():
+            logger.warning(
+                "Ошибка валидации пакета ответов: %s", serializer.errors)
+            return Response(bulk_errors(serializer),
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            user_id = get_system_user_id()
+            with transaction.atomic():
+                answers = Answer.objects.bulk_create(
+                    [
+                        Answer(question_id_id=id, user_id_id=user_id, **item)
+                        for item in serializer.validated_data
+                    ],
+                    batch_size=settings.BULK_BATCH_SIZE
+                )
+                if not answers_added(id, max(a.created_at for a in answers),
+                                     count=len(answers)):
+                    raise Question.DoesNotExist
+                answers_created(id, [a.id for a in answers])
+                publish_answers(id, answers)
+            invalidate_question(id)
+            logger.info(
+                "Создано ответов пакетом: %s, вопрос: %s", len(answers), id)
+            return Response(AnswerSerializer(answers, many=True).data,
+                            status=status.HTTP_201_CREATED)
+        except Question.DoesNotExist:
+            logger.warning(
+                "Попытка создания ответов для несуществующего вопроса id=%s", id)
+            return Response(
+                {"error": f"Вопрос с id={id} не был найден"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(
+                "Ошибка при пакетном создании ответов для вопроса %s: %s", id, e)
+            return Response(
+                {"error": "Произошла ошибка при создании ответов"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 
 class AnswerDetailView(APIView):
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
     @api_key_required
+    @replica_reads
     def get(self, request, answer_id):
         """
         GET /answers/{id} — получить конкретный ответ
         """
-        logger.info(f"GET /answers/{answer_id} - получение ответа")
+        logger.info("GET /answers/%s - получение ответа", answer_id)
 
         try:
-            answer = Answer.objects.get(id=answer_id)
-            serializer = AnswerSerializer(answer)
-            logger.info(f"Ответ {answer_id} найден")
-            return Response(
-                serializer.data,
+            answer = Answer.objects.values(*ANSWER_FIELDS).get(id=answer_id)
+            # Ответы не редактируются: версия определяется id и датой создания
+            etag = make_etag(
+                'answer', answer['id'], answer['created_at'].isoformat())
+            last_modified = timestamp(answer['created_at'])
+            cached = not_modified(request, etag, last_modified)
+            if cached is not None:
+                return cached
+
+            with timer('serialize'):
+                data = answer_rows([answer])[0]
+            logger.info("Ответ %s найден", answer_id)
+            return set_validators(Response(
+                data,
                 status=status.HTTP_200_OK
-            )
+            ), etag, last_modified)
         except Answer.DoesNotExist:
-            logger.warning(f"Ответ с id={answer_id} не найден")
+            logger.warning("Ответ с id=%s не найден", answer_id)
             return Response(
                 {"error": f"Ответ с id={answer_id} не был найден."},
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Ошибка при получении ответа {answer_id}: {str(e)}")
+            logger.error("Ошибка при получении ответа %s: %s", answer_id, e)
             return Response(
                 {"error": "Произошла ошибка при получении ответа"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -200,23 +524,219 @@ class AnswerDetailView(APIView):
         """
         DELETE /answers/{id} — удалить ответ
         """
-        logger.info(f"DELETE /answers/{answer_id} - удаление ответа")
+        logger.info("DELETE /answers/%s - удаление ответа", answer_id)
 
         try:
-            answer = Answer.objects.get(id=answer_id)
-            answer.delete()
-            logger.info(f"Ответ {answer_id} удален успешно")
+            question_id = delete_answer(answer_id)
+            if question_id is None:
+                raise Answer.DoesNotExist
+            invalidate_question(question_id)
+            logger.info("Ответ %s удален успешно", answer_id)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Answer.DoesNotExist:
             logger.warning(
-                f"Попытка удаления несуществующего ответа id={answer_id}")
+                "Попытка удаления несуществующего ответа id=%s", answer_id)
             return Response(
                 {"error": f"Ответ с id={answer_id} не был найден."},
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Ошибка при удалении ответа {answer_id}: {str(e)}")
+            logger.error("Ошибка при удалении ответа %s: %s", answer_id, e)
             return Response(
                 {"error": "Произошла ошибка при удалении ответа"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+class ChangesView(APIView):
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    @api_key_required
+    def get(self, request):
+        """
+        GET /changes?since=<курсор> — созданные и удалённые вопросы и ответы
+        после курсора, по порядку (?page_size= — размер пачки)
+        """
+        logger.info("GET /changes - лента изменений с %s",
+                    request.query_params.get('since'))
+
+        try:
+            since = parse_since(request.query_params.get('since'))
+        except InvalidSince:
+            logger.warning("Передан некорректный курсор ленты изменений")
+            return Response(
+                {"error": "Некорректный курсор"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        page_size = get_page_size(request, settings.CHANGES_PAGE_SIZE,
+                                  settings.CHANGES_MAX_PAGE_SIZE)
+        try:
+            changes, next_since, has_more = changes_since(since, page_size)
+            logger.info("Изменений в пачке: %s", len(changes))
+            return Response({
+                "next": str(next_since),
+                "has_more": has_more,
+                "changes": changes
+            })
+        except Exception as e:
+            logger.error("Ошибка при чтении ленты изменений: %s", e)
+            return Response(
+                {"error": "Произошла ошибка при чтении ленты изменений"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ExportView(APIView):
+    renderer_classes = [NDJSONRenderer]
+
+    @api_key_required
+    def get(self, request):
+        """
+        GET /export?format=ndjson — потоковая выгрузка всех вопросов с ответами
+        """
+        logger.info("GET /export - потоковая выгрузка вопросов")
+
+        # Под ASGI синхронный итератор Django собрал бы в список целиком
+        stream = (self._astream() if isinstance(request._request, ASGIRequest)
+                  else self._stream())
+        response = StreamingHttpResponse(
+            stream,
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'attachment; filename="questions.ndjson"'
+        return response
+
+    @staticmethod
+    def _querysets():
+        """
+        Вопросы по id и все ответы по (question_id, created_at, id) — по
+        индексу ответов. Оба читаются пачками серверных курсоров и
+        сливаются по question_id, поэтому память не зависит от размера веток
+        """
+        questions = Question.objects.order_by('id').values(*QUESTION_FIELDS)
+        answers = (Answer.objects.order_by('question_id', 'created_at', 'id')
+                   .values('question_id', *ANSWER_FIELDS))
+        return questions, answers
+
+    @staticmethod
+    def _dumps(row):
+        return json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+    def _question_head(self, question):
+        """Строка вопроса до списка ответов: '{..., "answers": ['"""
+        return self._dumps(question_rows([question])[0])[:-1] + ', "answers": ['
+
+    def _answer(self, answer, first):
+        del answer['question_id']
+        return ('' if first else ', ') + self._dumps(answer_rows([answer])[0])
+
+    def _stream(self):
+        """Строка NDJSON на вопрос; отдаётся кусками до EXPORT_BUFFER_SIZE"""
+        chunk_size = settings.EXPORT_CHUNK_SIZE
+        questions, answers = self._querysets()
+        answers = answers.iterator(chunk_size=chunk_size)
+        buffer = ExportBuffer()
+        answer = next(answers, None)
+        exported = 0
+        for question in questions.iterator(chunk_size=chunk_size):
+            yield from buffer.add(self._question_head(question))
+            first = True
+            # Ответы скрытых (удаляемых в фоне) вопросов пропускаем
+            while answer is not None and answer['question_id'] <= question['id']:
+                if answer['question_id'] == question['id']:
+                    yield from buffer.add(self._answer(answer, first))
+                    first = False
+                answer = next(answers, None)
+            yield from buffer.add(']}\n')
+            exported += 1
+        yield from buffer.flush()
+        logger.info("Выгрузка завершена. Вопросов: %s", exported)
+
+    async def _astream(self):
+        """_stream на async ORM для ASGI"""
+        chunk_size = settings.EXPORT_CHUNK_SIZE
+        questions, answers = self._querysets()
+        answers = answers.aiterator(chunk_size=chunk_size)
+        buffer = ExportBuffer()
+        answer = await anext(answers, None)
+        exported = 0
+        async for question in questions.aiterator(chunk_size=chunk_size):
+            for part in buffer.add(self._question_head(question)):
+                yield part
+            first = True
+            while answer is not None and answer['question_id'] <= question['id']:
+                if answer['question_id'] == question['id']:
+                    for part in buffer.add(self._answer(answer, first)):
+                        yield part
+                    first = False
+                answer = await anext(answers, None)
+            for part in buffer.add(']}\n'):
+                yield part
+            exported += 1
+        for part in buffer.flush():
+            yield part
+        logger.info("Выгрузка завершена. Вопросов: %s", exported)
+
+
+class ExportBuffer:
+    """Собирает мелкие куски выгрузки в блоки по EXPORT_BUFFER_SIZE"""
+
+    def __init__(self):
+        self.limit = settings.EXPORT_BUFFER_SIZE
+        self.parts = []
+        self.size = 0
+
+    def add(self, part):
+        self.parts.append(part)
+        self.size += len(part)
+        if self.size >= self.limit:
+            yield from self.flush()
+
+    def flush(self):
+        if self.parts:
+            yield ''.join(self.parts)
+            self.parts = []
+            self.size = 0
+
+
+class SearchView(APIView):
+    @api_key_required
+    def get(self, request):
+        """
+        GET /search?q=... — полнотекстовый поиск по вопросам и ответам
+        """
+        q = request.query_params.get('q', '').strip()
+        logger.info("GET /search - поиск по запросу: %s", q)
+
+        if not q:
+            return Response(
+                {"error": "Не задан параметр q"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            page = max(1, int(request.query_params.get('page', 1)))
+        except ValueError:
+            page = 1
+        page_size = get_page_size(request)
+        offset = (page - 1) * page_size
+        if offset >= settings.SEARCH_MAX_RESULTS:
+            return Response(
+                {"error": "Слишком глубокая страница, уточните запрос"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            results = search(q, offset, page_size)
+            has_next = len(results) > page_size
+            results = results[:page_size]
+            logger.info("По запросу найдено на странице: %s", len(results))
+            return Response({
+                "next": page + 1 if has_next else None,
+                "results": SearchResultSerializer(results, many=True).data
+            })
+        except Exception as e:
+            logger.error("Ошибка при поиске: %s", e)
+            return Response(
+                {"error": "Произошла ошибка при поиске"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,67 @@
+"""
+Настройки gunicorn для продакшен-запуска:
+    gunicorn -c gunicorn.conf.py
+
+По умолчанию WSGI (Test.wsgi) с потоками gthread. Для async-эндпоинтов
+/api/async/... GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+переключает на ASGI (Test.asgi).
+
+Приложение загружается в мастер-процессе до fork (preload_app), поэтому
+воркеры стартуют быстро и делят память с мастером. Соединений с БД
+мастер не открывает: каждый воркер заводит свои.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+asgi = 'uvicorn' in worker_class
+wsgi_app = 'Test.asgi:application' if asgi else 'Test.wsgi:application'
+
+workers = int(os.getenv(
+    'WEB_CONCURRENCY', str(multiprocessing.cpu_count() * 2 + 1)))
+# Потоки используются только gthread; uvicorn-воркер работает в event loop
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+preload_app = True
+
+# Зависший запрос убивается через timeout секунд; на SIGTERM воркеры
+# дорабатывают текущие запросы graceful_timeout секунд
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Перезапуск воркера после max_requests запросов ограничивает рост памяти;
+# jitter разносит перезапуски воркеров во времени
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    # Импортируем urls и все представления в мастере: иначе каждый
+    # воркер делал бы это на первом запросе
+    from django.conf import settings
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+
+    # Запись сбрасывает кэш вопросов только там, где он лежит: с locmem
+    # остальные воркеры отдают старую страницу до QUESTION_CACHE_TTL
+    backend = settings.CACHES[settings.QUESTION_CACHE_ALIAS]['BACKEND']
+    if server.cfg.workers > 1 and backend.endswith('LocMemCache'):
+        server.log.warning(
+            "Кэш вопросов (%s) у каждого из %s воркеров свой: задайте общий "
+            "QUESTION_CACHE_BACKEND (RedisCache, FileBasedCache)",
+            backend, server.cfg.workers)
+
+
+def worker_exit(server, worker):
+    # Дописываем в БД очередь буферизованной записи ответов
+    # (ANSWER_WRITE_BEHIND), пока воркер не завершился
+    from core.ingest import drain
+
+    drain()
@@ -2,6 +2,48 @@ import pytest
 from django.conf import settings
 from django.contrib.auth.models import User
 from core.models import Question, Answer
+from core.counters import answers_added
+from core.cache import get_question_cache, reset_cache_stats
+from core.utils import get_system_user_id
+from core.auth import key_cache, negative_cache
+from core import ingest, ratelimit, routers
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    """Сбрасывает кэши уровня процесса: база между тестами откатывается"""
+    get_system_user_id.cache_clear()
+    get_question_cache().clear()
+    reset_cache_stats()
+    key_cache.clear()
+    negative_cache.clear()
+    ratelimit.reset()
+    routers.reset()
+    ingest.status_cache().clear()
+    yield
+    get_system_user_id.cache_clear()
+    get_question_cache().clear()
+    key_cache.clear()
+    negative_cache.clear()
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix):
+    """
+    Вторая тестовая БД 'replica' с теми же таблицами, но своими данными:
+    запись в default на ней не видна, как на отставшей реплике
+    """
+    from django.db import connections
+
+    replica = {key: value for key, value in connections['default'].settings_dict.items()
+               if key != 'TEST'}
+    # SQLite и так создаёт для каждого алиаса свою тестовую БД в памяти
+    if 'sqlite' not in replica['ENGINE']:
+        replica['TEST'] = {'NAME': f"test_{replica['NAME']}_replica"}
+    connections.settings['replica'] = connections.configure_settings(
+        {'default': connections['default'].settings_dict,
+         'replica': replica})['replica']
+
 
 @pytest.fixture
 def api_client():
@@ -27,11 +69,13 @@ def test_answer(db, test_question):
         username='system_answer_bot',
         defaults={'is_staff': False, 'is_superuser': False}
     )
-    return Answer.objects.create(
+    answer = Answer.objects.create(
         question_id=test_question,
         user_id=user,
         text="Test answer text"
     )
+    answers_added(test_question.id, answer.created_at)
+    return answer
 
 @pytest.fixture
 def valid_api_key():
@@ -0,0 +1,214 @@
+import io
+import time
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from core.auth import (
+    LEGACY_KEY, ApiKeyAuthentication, HasApiKey, check_key, create_key,
+    hash_key, key_cache, negative_cache, revoke_key
+)
+from core.ratelimit import LOOKUP_ROUTE
+from core.models import ApiKey
+
+pytestmark = pytest.mark.django_db
+
+
+class KeyView(APIView):
+    authentication_classes = [ApiKeyAuthentication]
+    permission_classes = [HasApiKey]
+
+    def get(self, request):
+        return Response({'key': request.auth})
+
+
+class TestKeyRegistry:
+    def test_registry_key_accepted(self, api_client):
+        """Тест: ключ из реестра открывает API"""
+        api_key, raw_key = create_key('client')
+
+        response = api_client.get(reverse('question-list'),
+                                  HTTP_X_API_KEY=raw_key)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert check_key(raw_key) == api_key.id
+
+    def test_only_hash_stored(self):
+        """Тест: в БД лежит только хэш ключа"""
+        api_key, raw_key = create_key('client')
+
+        assert api_key.key_hash == hash_key(raw_key)
+        assert not ApiKey.objects.filter(key_hash=raw_key).exists()
+        assert api_key.prefix == raw_key[:8]
+
+    def test_legacy_key_still_accepted(self, valid_api_key):
+        """Тест: общий ключ из настроек продолжает работать без БД"""
+        assert check_key(valid_api_key) == LEGACY_KEY
+
+    def test_cached_lookup_without_queries(self, django_assert_num_queries):
+        """Тест: повторная проверка ключа не ходит в БД"""
+        api_key, raw_key = create_key('client')
+        with django_assert_num_queries(2):
+            check_key(raw_key)
+            check_key('invalid-key')
+        with django_assert_num_queries(0):
+            assert check_key(raw_key) == api_key.id
+            assert check_key('invalid-key') is None
+
+    def test_revoked_key_rejected(self, api_client):
+        """Тест: отозванный ключ перестаёт работать сразу в этом процессе"""
+        api_key, raw_key = create_key('client')
+        assert check_key(raw_key) == api_key.id
+
+        revoke_key(api_key)
+
+        response = api_client.get(reverse('question-list'),
+                                  HTTP_X_API_KEY=raw_key)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_revocation_elsewhere_expires_with_ttl(self, settings):
+        """Тест: отзыв в другом процессе виден после истечения TTL"""
+        settings.API_KEY_CACHE_TTL = 0.01
+        api_key, raw_key = create_key('client')
+        assert check_key(raw_key) == api_key.id
+
+        # Как если бы ключ отозвали из другого процесса: кэш не трогаем
+        ApiKey.objects.filter(id=api_key.id).update(revoked_at='2026-01-01T00:00Z')
+        time.sleep(0.02)
+
+        assert check_key(raw_key) is None
+
+    def test_cache_is_bounded(self, settings):
+        """Тест: кэши не растут больше API_KEY_*CACHE_MAX_ENTRIES"""
+        settings.API_KEY_CACHE_MAX_ENTRIES = 3
+        settings.API_KEY_NEGATIVE_CACHE_MAX_ENTRIES = 2
+        for _ in range(5):
+            check_key(create_key('client')[1])
+        for index in range(10):
+            check_key(f'invalid-{index}')
+
+        assert len(key_cache._entries) == 3
+        assert len(negative_cache._entries) == 2
+
+    def test_unknown_keys_do_not_evict_valid(self, settings,
+                                             django_assert_num_queries):
+        """Тест: поток неизвестных ключей не вытесняет настоящий из кэша"""
+        settings.API_KEY_CACHE_MAX_ENTRIES = 3
+        settings.API_KEY_NEGATIVE_CACHE_MAX_ENTRIES = 3
+        api_key, raw_key = create_key('client')
+        check_key(raw_key)
+        for index in range(10):
+            check_key(f'invalid-{index}')
+
+        with django_assert_num_queries(0):
+            assert check_key(raw_key) == api_key.id
+
+
+class TestKeyLookupThrottle:
+    @pytest.fixture(autouse=True)
+    def lookup_limits(self, settings):
+        settings.RATE_LIMIT_ROUTES = {**settings.RATE_LIMIT_ROUTES,
+                                      LOOKUP_ROUTE: (0.001, 3)}
+
+    def test_random_keys_throttled_before_db(self, api_client,
+                                             django_assert_num_queries):
+        """Тест: перебор ключей с одного адреса упирается в 429 без запросов к БД"""
+        url = reverse('question-list')
+        for index in range(3):
+            response = api_client.get(url, HTTP_X_API_KEY=f'invalid-{index}')
+            assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        with django_assert_num_queries(0):
+            response = api_client.get(url, HTTP_X_API_KEY='invalid-next')
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response['Retry-After']) >= 1
+
+    def test_cached_keys_not_throttled(self, api_client):
+        """Тест: ключи из кэша токенов не тратят, другие адреса не страдают"""
+        _, raw_key = create_key('client')
+        url = reverse('question-list')
+        api_client.get(url, HTTP_X_API_KEY=raw_key)
+        for index in range(3):
+            api_client.get(url, HTTP_X_API_KEY=f'invalid-{index}')
+
+        assert api_client.get(url, HTTP_X_API_KEY=raw_key).status_code == \
+            status.HTTP_200_OK
+        assert api_client.get(url, HTTP_X_API_KEY='invalid-0').status_code == \
+            status.HTTP_403_FORBIDDEN
+        assert api_client.get(url, HTTP_X_API_KEY='invalid-next',
+                              REMOTE_ADDR='10.0.0.2').status_code == \
+            status.HTTP_403_FORBIDDEN
+
+    def test_async_view_throttled(self, client):
+        """Тест: async-представления тоже ограничивают перебор ключей"""
+        url = reverse('async-question-list')
+        for index in range(3):
+            client.get(url, HTTP_X_API_KEY=f'invalid-{index}')
+
+        response = client.get(url, HTTP_X_API_KEY='invalid-next')
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_drf_authentication_throttled(self):
+        """Тест: DRF-аутентификация отвечает 429 на перебор ключей"""
+        for index in range(3):
+            request = APIRequestFactory().get('/', HTTP_X_API_KEY=f'invalid-{index}')
+            KeyView.as_view()(request)
+
+        request = APIRequestFactory().get('/', HTTP_X_API_KEY='invalid-next')
+        response = KeyView.as_view()(request)
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+class TestDRFAuthentication:
+    def test_valid_key(self):
+        """Тест: DRF-аутентификация кладёт id ключа в request.auth"""
+        api_key, raw_key = create_key('client')
+        request = APIRequestFactory().get('/', HTTP_X_API_KEY=raw_key)
+
+        response = KeyView.as_view()(request)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'key': api_key.id}
+
+    @pytest.mark.parametrize('headers', [{}, {'HTTP_X_API_KEY': 'invalid-key'}])
+    def test_rejected(self, headers):
+        """Тест: без ключа или с неверным ключом — 401"""
+        request = APIRequestFactory().get('/', **headers)
+
+        response = KeyView.as_view()(request)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestAsyncRegistryKey:
+    def test_async_view_accepts_registry_key(self, client, test_question):
+        """Тест: async-представления принимают ключи из реестра"""
+        _, raw_key = create_key('client')
+
+        response = client.get(reverse('async-question-list'),
+                              HTTP_X_API_KEY=raw_key)
+
+        assert response.status_code == status.HTTP_200_OK
+
+
+class TestApiKeysCommand:
+    def test_create_list_revoke(self):
+        """Тест команды api_keys: создать, показать, отозвать"""
+        out = io.StringIO()
+        call_command('api_keys', 'create', 'partner', stdout=out)
+        raw_key = out.getvalue().strip().splitlines()[-1]
+        assert check_key(raw_key) is not None
+
+        out = io.StringIO()
+        call_command('api_keys', 'list', stdout=out)
+        assert 'partner' in out.getvalue() and 'активен' in out.getvalue()
+
+        call_command('api_keys', 'revoke', raw_key[:8], stdout=io.StringIO())
+        assert check_key(raw_key) is None
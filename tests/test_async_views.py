@@ -0,0 +1,83 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from core.models import Question, Answer
+
+pytestmark = pytest.mark.django_db
+
+
+class TestAsyncQuestionViews:
+    def test_create_and_list_questions(self, client, valid_api_key):
+        """Тест создания и получения списка вопросов через async-представления"""
+        url = reverse('async-question-list')
+
+        created = client.post(url, {'text': 'Async question'},
+                              content_type='application/json',
+                              HTTP_X_API_KEY=valid_api_key)
+        listed = client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert created.status_code == status.HTTP_201_CREATED
+        assert created.json()['text'] == 'Async question'
+        assert [q['text'] for q in listed.json()['results']] == [
+            'Async question']
+
+    def test_detail_matches_sync_view(self, client, valid_api_key,
+                                      test_answer):
+        """Тест: async и sync детальные представления отдают одинаковый JSON"""
+        question_id = test_answer.question_id_id
+
+        async_response = client.get(
+            reverse('async-question-detail', kwargs={'id': question_id}),
+            HTTP_X_API_KEY=valid_api_key)
+        sync_response = client.get(
+            reverse('question-detail', kwargs={'id': question_id}),
+            HTTP_X_API_KEY=valid_api_key)
+
+        assert async_response.status_code == status.HTTP_200_OK
+        assert async_response.content == sync_response.content
+        assert async_response['ETag'] == sync_response['ETag']
+
+    def test_delete_question(self, client, valid_api_key, test_answer):
+        """Тест удаления вопроса через async-представление"""
+        url = reverse('async-question-detail',
+                      kwargs={'id': test_answer.question_id_id})
+
+        response = client.delete(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert Question.objects.count() == 0
+        assert Answer.objects.count() == 0
+
+    def test_missing_api_key(self, client):
+        """Тест async-запроса без API ключа"""
+        response = client.get(reverse('async-question-list'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestAsyncAnswerViews:
+    def test_create_get_delete_answer(self, client, valid_api_key,
+                                      test_question):
+        """Тест жизненного цикла ответа через async-представления"""
+        created = client.post(
+            reverse('async-answer-create', kwargs={'id': test_question.id}),
+            {'text': 'Async answer'},
+            content_type='application/json',
+            HTTP_X_API_KEY=valid_api_key)
+        answer_url = reverse('async-answer-detail',
+                             kwargs={'answer_id': created.json()['id']})
+        fetched = client.get(answer_url, HTTP_X_API_KEY=valid_api_key)
+        deleted = client.delete(answer_url, HTTP_X_API_KEY=valid_api_key)
+
+        assert created.status_code == status.HTTP_201_CREATED
+        assert fetched.json()['text'] == 'Async answer'
+        assert deleted.status_code == status.HTTP_204_NO_CONTENT
+        assert Answer.objects.count() == 0
+
+    def test_get_nonexistent_answer(self, client, valid_api_key):
+        """Тест получения несуществующего ответа"""
+        response = client.get(
+            reverse('async-answer-detail', kwargs={'answer_id': 999}),
+            HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,105 @@
+import io
+import json
+import random
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import URLResolver, get_resolver, resolve
+from benchmarks.harness import SCENARIOS, UNMEASURED, Context
+from core.models import Question
+
+pytestmark = pytest.mark.django_db
+
+
+def route_names(patterns):
+    """Имена маршрутов проекта, кроме админки"""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name != 'admin':
+                yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+def test_scenarios_cover_all_routes():
+    """Тест: у каждого маршрута есть сценарий bench"""
+    ctx = Context(range(1, 10), range(1, 10), random.Random(7))
+    covered = {resolve(SCENARIOS[name](ctx)[1].split('?')[0]).url_name
+               for name in SCENARIOS}
+
+    assert set(route_names(get_resolver().url_patterns)) - UNMEASURED == covered
+
+
+class TestBenchCommand:
+    def test_bench_writes_results(self, tmp_path):
+        """Тест: bench прогоняет все сценарии и пишет JSON"""
+        output = tmp_path / 'bench.json'
+
+        call_command('bench', questions=30, max_answers=5, requests=3,
+                     output=str(output), stdout=io.StringIO())
+
+        results = json.loads(output.read_text())
+        assert results['mode'] == 'client'
+        assert 'question-detail' in results['scenarios']
+        for name, row in results['scenarios'].items():
+            assert row['errors'] == 0, name
+            assert row['p50_ms'] <= row['p95_ms'] <= row['p99_ms']
+            assert row['queries_per_request'] is not None
+        # Данные бенчмарка откатываются
+        assert Question.objects.count() == 0
+
+    def test_bench_fails_on_regression(self, tmp_path):
+        """Тест: ухудшение относительно baseline роняет прогон"""
+        baseline = tmp_path / 'baseline.json'
+        baseline.write_text(json.dumps({'scenarios': {
+            'question-list': {'p95_ms': 0.0001, 'queries_per_request': 0.1,
+                              'throughput_rps': 10 ** 9},
+        }}))
+
+        with pytest.raises(CommandError, match='question-list'):
+            call_command('bench', questions=10, max_answers=2, requests=3,
+                         scenario=['question-list'], baseline=str(baseline),
+                         stdout=io.StringIO())
+
+    def test_bench_serialization(self, tmp_path):
+        """Тест: --serialization сравнивает DRF и быстрый путь"""
+        output = tmp_path / 'bench.json'
+
+        call_command('bench', questions=20, max_answers=2, requests=1,
+                     scenario=['question-list'], serialization=True,
+                     output=str(output), stdout=io.StringIO())
+
+        serialization = json.loads(output.read_text())['serialization']
+        assert serialization['rows'] == 20
+        assert serialization['identical'] is True
+
+    def test_bench_connections(self, tmp_path):
+        """Тест: --connections замеряет режимы соединений с БД"""
+        output = tmp_path / 'bench.json'
+
+        call_command('bench', questions=5, max_answers=1, requests=5,
+                     scenario=['question-list'], connections=True,
+                     output=str(output), stdout=io.StringIO())
+
+        connections = json.loads(output.read_text())['connections']
+        for mode in ('no-persistence', 'persistent'):
+            assert connections[mode]['requests'] == 5
+            assert connections[mode]['p50_ms'] <= connections[mode]['p95_ms']
+        # Пул есть только у PostgreSQL с psycopg 3
+        assert 'pool' in connections
+
+    def test_bench_formats(self, tmp_path):
+        """Тест: --formats сравнивает размер и время кодирования форматов"""
+        output = tmp_path / 'bench.json'
+
+        call_command('bench', questions=20, max_answers=5, requests=1,
+                     scenario=['question-list'], formats=True,
+                     output=str(output), stdout=io.StringIO())
+
+        formats = json.loads(output.read_text())['formats']
+        rows = formats['question-list']
+        assert {'json', 'columnar'} <= set(rows)
+        assert rows['columnar']['bytes'] < rows['json']['bytes']
+        assert rows['json']['gzip_bytes'] < rows['json']['bytes']
+        assert 'question-detail' in formats
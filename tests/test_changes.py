@@ -0,0 +1,146 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from core.models import Change
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def settled(settings):
+    """Записи журнала попадают в ленту сразу"""
+    settings.CHANGES_SETTLE_SECONDS = 0
+
+
+def fetch(api_client, api_key, since=None, **params):
+    if since is not None:
+        params['since'] = since
+    return api_client.get(reverse('changes'), params,
+                          HTTP_X_API_KEY=api_key)
+
+
+def summary(changes):
+    return [(c['type'], c['action'], c['id']) for c in changes]
+
+
+class TestChangesView:
+    def test_creates_and_deletes_in_order(self, api_client, valid_api_key):
+        """Тест: создания и удаления идут в ленте по порядку"""
+        question = api_client.post(
+            reverse('question-list'), {'text': 'Вопрос'}, format='json',
+            HTTP_X_API_KEY=valid_api_key).data
+        answer = api_client.post(
+            reverse('answer-create', kwargs={'id': question['id']}),
+            {'text': 'Ответ'}, format='json',
+            HTTP_X_API_KEY=valid_api_key).data
+        api_client.delete(
+            reverse('answer-detail', kwargs={'answer_id': answer['id']}),
+            HTTP_X_API_KEY=valid_api_key)
+
+        response = fetch(api_client, valid_api_key)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert summary(response.data['changes']) == [
+            ('question', 'created', question['id']),
+            ('answer', 'created', answer['id']),
+            ('answer', 'deleted', answer['id']),
+        ]
+        assert response.data['changes'][0]['data']['text'] == 'Вопрос'
+        # Ответ уже удалён — его состояние не прикладывается
+        assert response.data['changes'][1]['data'] is None
+        assert response.data['changes'][2]['question_id'] == question['id']
+
+    def test_cursor_returns_only_newer_changes(self, api_client, valid_api_key):
+        """Тест: с курсором приходят только изменения после него"""
+        url = reverse('question-list')
+        api_client.post(url, {'text': 'Первый'}, format='json',
+                        HTTP_X_API_KEY=valid_api_key)
+        cursor = fetch(api_client, valid_api_key).data['next']
+        second = api_client.post(url, {'text': 'Второй'}, format='json',
+                                 HTTP_X_API_KEY=valid_api_key).data
+
+        response = fetch(api_client, valid_api_key, since=cursor)
+
+        assert summary(response.data['changes']) == [
+            ('question', 'created', second['id'])]
+        # Новых изменений нет — курсор не двигается
+        again = fetch(api_client, valid_api_key,
+                      since=response.data['next']).data
+        assert again['changes'] == []
+        assert again['next'] == response.data['next']
+
+    def test_bounded_batches(self, api_client, valid_api_key):
+        """Тест: лента отдаётся пачками по page_size"""
+        api_client.post(reverse('question-bulk-create'),
+                        [{'text': f'Вопрос {i}'} for i in range(5)],
+                        format='json', HTTP_X_API_KEY=valid_api_key)
+
+        first = fetch(api_client, valid_api_key, page_size=3).data
+        rest = fetch(api_client, valid_api_key, since=first['next'],
+                     page_size=3).data
+
+        assert len(first['changes']) == 3 and first['has_more'] is True
+        assert len(rest['changes']) == 2 and rest['has_more'] is False
+
+    def test_question_delete_is_single_tombstone(self, api_client,
+                                                 valid_api_key, test_answer):
+        """Тест: удаление вопроса — одно надгробие, без записей по ответам"""
+        question_id = test_answer.question_id_id
+        since = fetch(api_client, valid_api_key, since='head').data['next']
+
+        api_client.delete(reverse('question-detail', kwargs={'id': question_id}),
+                          HTTP_X_API_KEY=valid_api_key)
+
+        changes = fetch(api_client, valid_api_key, since=since).data['changes']
+        assert summary(changes) == [('question', 'deleted', question_id)]
+
+    def test_tombstone_written_after_delete(self, test_answer, monkeypatch):
+        """Тест: надгробие получает id и время уже после удаления ветки"""
+        from core import deletion
+        from core.models import Answer
+        question_id = test_answer.question_id_id
+        left = []
+        journal = deletion.questions_deleted
+
+        def questions_deleted(ids):
+            left.append(Answer.objects.filter(question_id__in=ids).count())
+            journal(ids)
+        monkeypatch.setattr(deletion, 'questions_deleted', questions_deleted)
+
+        deletion.delete_question(question_id)
+
+        assert left == [0]
+        assert Change.objects.filter(kind=Change.QUESTION,
+                                     object_id=question_id).count() == 1
+
+    def test_purge_writes_tombstone_immediately(self, api_client, valid_api_key,
+                                                test_question, monkeypatch):
+        """Тест: при ?mode=purge вопрос удалён для ленты уже до очистки"""
+        from core import deletion
+        monkeypatch.setattr(deletion, 'run_in_background', lambda id: None)
+        url = reverse('question-detail', kwargs={'id': test_question.id})
+
+        api_client.delete(url + '?mode=purge', HTTP_X_API_KEY=valid_api_key)
+
+        assert Change.objects.filter(
+            kind=Change.QUESTION, action=Change.DELETED,
+            object_id=test_question.id).count() == 1
+
+    def test_fresh_changes_wait_for_settle_window(self, api_client,
+                                                  valid_api_key, settings):
+        """Тест: свежие записи не отдаются, пока не истекло окно"""
+        settings.CHANGES_SETTLE_SECONDS = 60
+        api_client.post(reverse('question-list'), {'text': 'Вопрос'},
+                        format='json', HTTP_X_API_KEY=valid_api_key)
+
+        response = fetch(api_client, valid_api_key)
+
+        assert response.data['changes'] == []
+        assert response.data['next'] == '0'
+
+    @pytest.mark.parametrize('since', ['abc', '-1'])
+    def test_invalid_cursor(self, api_client, valid_api_key, since):
+        """Тест: некорректный курсор — 400"""
+        response = fetch(api_client, valid_api_key, since=since)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,156 @@
+import gzip
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from core.models import Question
+from core.renderers import columnar
+
+pytestmark = pytest.mark.django_db
+
+
+def get(api_client, api_key, url, **headers):
+    return api_client.get(url, HTTP_X_API_KEY=api_key, **headers)
+
+
+def content(response):
+    return b''.join(response.streaming_content) if response.streaming \
+        else response.content
+
+
+class TestColumnar:
+    def test_rows_become_columns(self):
+        """Тест: список словарей — ключи один раз, значения массивами"""
+        data = {'next': None, 'results': [{'id': 1, 'text': 'a'},
+                                          {'id': 2, 'text': 'b'}]}
+
+        assert columnar(data) == {
+            'next': None, 'results': {'id': [1, 2], 'text': ['a', 'b']}}
+
+    def test_rows_with_different_fields(self):
+        """Тест: поля, которых нет в строке, становятся null"""
+        assert columnar([{'id': 1}, {'id': 2, 'username': 'bot'}]) == {
+            'id': [1, 2], 'username': [None, 'bot']}
+
+    def test_nested_rows(self):
+        """Тест: вложенные списки строк тоже раскладываются по колонкам"""
+        data = [{'id': 1, 'answers': [{'id': 10}]},
+                {'id': 2, 'answers': []}]
+
+        assert columnar(data) == {'id': [1, 2],
+                                  'answers': [{'id': [10]}, {}]}
+
+    def test_question_detail(self, api_client, valid_api_key, test_answer):
+        """Тест: Accept: application/vnd.columnar+json для вопроса с ответами"""
+        url = reverse('question-detail',
+                      kwargs={'id': test_answer.question_id_id})
+
+        response = get(api_client, valid_api_key, url,
+                       HTTP_ACCEPT='application/vnd.columnar+json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('application/vnd.columnar+json')
+        answers = response.json()['answers']
+        assert answers['id'] == [test_answer.id]
+        assert answers['text'] == [test_answer.text]
+
+
+class TestMessagePack:
+    def test_question_list(self, api_client, valid_api_key, test_question):
+        """Тест: ?format=msgpack — те же данные, что в JSON"""
+        msgpack = pytest.importorskip('msgpack')
+        url = reverse('question-list')
+
+        packed = get(api_client, valid_api_key, url + '?format=msgpack')
+        plain = get(api_client, valid_api_key, url)
+
+        assert packed['Content-Type'] == 'application/msgpack'
+        assert msgpack.unpackb(packed.content) == plain.json()
+
+    def test_formats_have_own_etags(self, api_client, valid_api_key,
+                                    test_question):
+        """Тест: у форматов разные ETag, 304 — только для своего формата"""
+        pytest.importorskip('msgpack')
+        url = reverse('question-detail', kwargs={'id': test_question.id})
+        plain = get(api_client, valid_api_key, url)
+        packed = get(api_client, valid_api_key, url,
+                     HTTP_ACCEPT='application/msgpack')
+
+        assert plain['ETag'] != packed['ETag']
+        assert 'Accept' in packed['Vary']
+        cross = get(api_client, valid_api_key, url,
+                    HTTP_ACCEPT='application/msgpack',
+                    HTTP_IF_NONE_MATCH=plain['ETag'])
+        assert cross.status_code == status.HTTP_200_OK
+        same = get(api_client, valid_api_key, url,
+                   HTTP_ACCEPT='application/msgpack',
+                   HTTP_IF_NONE_MATCH=packed['ETag'])
+        assert same.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+class TestCompression:
+    @pytest.fixture
+    def many_questions(self, db):
+        Question.objects.bulk_create(
+            [Question(text=f'Вопрос номер {i}') for i in range(50)])
+
+    def test_large_response_is_gzipped(self, api_client, valid_api_key,
+                                       many_questions):
+        """Тест: большой ответ сжимается, ETag становится слабым"""
+        url = reverse('question-list')
+        plain = get(api_client, valid_api_key, url)
+
+        response = get(api_client, valid_api_key, url,
+                       HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        assert gzip.decompress(response.content) == plain.content
+        assert response['ETag'] == 'W/' + plain['ETag']
+        again = get(api_client, valid_api_key, url,
+                    HTTP_ACCEPT_ENCODING='gzip',
+                    HTTP_IF_NONE_MATCH=response['ETag'])
+        assert again.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_brotli_preferred(self, api_client, valid_api_key, many_questions):
+        """Тест: br выбирается, если клиент его принимает"""
+        brotli = pytest.importorskip('brotli')
+        url = reverse('question-list')
+        plain = get(api_client, valid_api_key, url)
+
+        response = get(api_client, valid_api_key, url,
+                       HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+
+        assert response['Content-Encoding'] == 'br'
+        assert brotli.decompress(response.content) == plain.content
+
+    def test_small_response_not_compressed(self, api_client, valid_api_key,
+                                           test_question, settings):
+        """Тест: ответ меньше COMPRESS_MIN_BYTES отдаётся как есть"""
+        settings.COMPRESS_MIN_BYTES = 10 ** 6
+
+        response = get(api_client, valid_api_key, reverse('question-list'),
+                       HTTP_ACCEPT_ENCODING='gzip')
+
+        assert not response.has_header('Content-Encoding')
+
+    def test_gzip_refused_by_quality(self, api_client, valid_api_key,
+                                     many_questions):
+        """Тест: gzip;q=0 — без сжатия"""
+        response = get(api_client, valid_api_key, reverse('question-list'),
+                       HTTP_ACCEPT_ENCODING='gzip;q=0')
+
+        assert not response.has_header('Content-Encoding')
+
+    def test_streamed_export_is_gzipped(self, api_client, valid_api_key,
+                                        test_answer):
+        """Тест: потоковая выгрузка сжимается по кускам"""
+        url = reverse('export') + '?format=ndjson'
+        plain = content(get(api_client, valid_api_key, url))
+
+        response = get(api_client, valid_api_key, url,
+                       HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response.streaming
+        assert response['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(content(response)) == plain
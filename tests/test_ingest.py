@@ -0,0 +1,266 @@
+import os
+import threading
+import time
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from core import ingest
+from core.models import Answer, Change, Question
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def ingestor(monkeypatch, settings):
+    """Буферизованная запись без фонового потока: очередь пишет flush()"""
+    settings.ANSWER_WRITE_BEHIND = True
+    instance = ingest.Ingestor(flusher=False)
+    monkeypatch.setattr(ingest, 'ingestor', instance)
+    return instance
+
+
+def post_answer(api_client, api_key, question_id, text='Ответ'):
+    return api_client.post(
+        reverse('answer-create', kwargs={'id': question_id}),
+        {'text': text}, format='json', HTTP_X_API_KEY=api_key)
+
+
+def get_status(api_client, api_key, tracking_id):
+    return api_client.get(
+        reverse('ingest-status', kwargs={'tracking_id': tracking_id}),
+        HTTP_X_API_KEY=api_key)
+
+
+class TestWriteBehind:
+    def test_accepted_then_written(self, api_client, valid_api_key,
+                                   test_question, ingestor):
+        """Тест: 202 с tracking_id, после записи — written с answer_id"""
+        response = post_answer(api_client, valid_api_key, test_question.id)
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        tracking_id = response.data['tracking_id']
+        assert response['Location'] == reverse(
+            'ingest-status', kwargs={'tracking_id': tracking_id})
+        assert not Answer.objects.exists()
+        assert get_status(api_client, valid_api_key,
+                          tracking_id).data['status'] == 'queued'
+
+        ingestor.flush()
+
+        answer = Answer.objects.get()
+        data = get_status(api_client, valid_api_key, tracking_id).data
+        assert data == {'tracking_id': tracking_id, 'status': 'written',
+                        'question_id': test_question.id,
+                        'answer_id': answer.id}
+        test_question.refresh_from_db()
+        assert test_question.answer_count == 1
+        assert Change.objects.filter(kind=Change.ANSWER,
+                                     object_id=answer.id).exists()
+
+    def test_batch_is_one_transaction(self, api_client, valid_api_key,
+                                      test_question, ingestor, settings,
+                                      django_assert_max_num_queries):
+        """Тест: пачка ответов пишется фиксированным числом запросов"""
+        settings.INGEST_BATCH_SIZE = 100
+        for i in range(20):
+            post_answer(api_client, valid_api_key, test_question.id, f'Ответ {i}')
+
+        # SAVEPOINT-ы теста, SELECT FOR UPDATE, INSERT, UPDATE счётчиков,
+        # INSERT журнала
+        with django_assert_max_num_queries(6):
+            ingestor.flush()
+
+        assert Answer.objects.count() == 20
+        test_question.refresh_from_db()
+        assert test_question.answer_count == 20
+
+    def test_invalid_answer_rejected_synchronously(self, api_client,
+                                                   valid_api_key,
+                                                   test_question, ingestor):
+        """Тест: невалидный ответ — 400 сразу, в очередь не попадает"""
+        response = api_client.post(
+            reverse('answer-create', kwargs={'id': test_question.id}),
+            {}, format='json', HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert ingestor.depth() == 0
+
+    def test_unknown_question(self, api_client, valid_api_key, ingestor):
+        """Тест: ответ к несуществующему вопросу — 404 сразу"""
+        response = post_answer(api_client, valid_api_key, 999)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_question_deleted_before_flush(self, api_client, valid_api_key,
+                                           test_question, ingestor):
+        """Тест: вопрос удалили до записи — ответ failed, остальные пишутся"""
+        other = Question.objects.create(text='Другой')
+        lost = post_answer(api_client, valid_api_key, test_question.id).data
+        kept = post_answer(api_client, valid_api_key, other.id).data
+        test_question.delete()
+
+        ingestor.flush()
+
+        assert get_status(api_client, valid_api_key,
+                          lost['tracking_id']).data['status'] == 'failed'
+        assert get_status(api_client, valid_api_key,
+                          kept['tracking_id']).data['status'] == 'written'
+        assert list(Answer.objects.values_list('question_id', flat=True)) == [other.id]
+
+    def test_backpressure(self, api_client, valid_api_key, test_question,
+                          ingestor, settings):
+        """Тест: очередь полна — 503 с Retry-After"""
+        settings.INGEST_QUEUE_SIZE = 1
+        post_answer(api_client, valid_api_key, test_question.id)
+
+        response = post_answer(api_client, valid_api_key, test_question.id)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response['Retry-After']
+
+    def test_drain_writes_queue_and_stops_intake(self, api_client,
+                                                 valid_api_key, test_question,
+                                                 ingestor):
+        """Тест: при остановке очередь дописывается, новые ответы не берутся"""
+        post_answer(api_client, valid_api_key, test_question.id)
+
+        assert ingestor.drain() is True
+
+        assert Answer.objects.count() == 1
+        response = post_answer(api_client, valid_api_key, test_question.id)
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    def test_unknown_tracking_id(self, api_client, valid_api_key, ingestor):
+        """Тест: статус неизвестного tracking_id — 404"""
+        response = get_status(api_client, valid_api_key, 'missing')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_status_set_directly(self, api_client, valid_api_key, ingestor):
+        """Тест: статус, записанный через set_status, отдаётся по /ingest/{id}"""
+        ingest.set_status('seeded', {'status': ingest.WRITTEN,
+                                     'question_id': 1, 'answer_id': 2})
+
+        data = get_status(api_client, valid_api_key, 'seeded').data
+
+        assert data['status'] == ingest.WRITTEN
+        assert data['answer_id'] == 2
+
+    def test_disabled_by_default(self, api_client, valid_api_key,
+                                 test_question):
+        """Тест: без ANSWER_WRITE_BEHIND ответ пишется сразу"""
+        response = post_answer(api_client, valid_api_key, test_question.id)
+
+        assert response.status_code == status.HTTP_201_CREATED
+
+
+class TestFlusherThread:
+    def test_batches_by_size_and_drains(self, monkeypatch, settings):
+        """Тест: поток пишет пачками не больше INGEST_BATCH_SIZE и дописывает всё"""
+        settings.INGEST_BATCH_SIZE = 3
+        settings.INGEST_FLUSH_MS = 1000
+        batches = []
+        monkeypatch.setattr(ingest, 'write_batch', lambda batch: (
+            batches.append(len(batch)) or {}))
+        ingestor = ingest.Ingestor()
+
+        for i in range(7):
+            ingestor.submit(1, 1, f'Ответ {i}')
+
+        assert ingestor.drain(timeout=5) is True
+        assert sum(batches) == 7
+        assert max(batches) <= 3
+
+    def test_status_failure_keeps_thread(self, monkeypatch, settings):
+        """Тест: сбой кэша статусов не останавливает поток записи"""
+        settings.INGEST_FLUSH_MS = 0
+        batches = []
+        monkeypatch.setattr(ingest, 'write_batch', lambda batch: (
+            batches.append(len(batch)) or {item.tracking_id: {
+                'status': ingest.WRITTEN} for item in batch}))
+        real = ingest._set_statuses
+
+        def set_statuses(statuses):
+            if any(s['status'] != ingest.QUEUED for s in statuses.values()):
+                raise ConnectionError('кэш недоступен')
+            real(statuses)
+        monkeypatch.setattr(ingest, '_set_statuses', set_statuses)
+        ingestor = ingest.Ingestor()
+
+        ingestor.submit(1, 1, 'Первый')
+        deadline = time.monotonic() + 5
+        while not batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        ingestor.submit(1, 1, 'Второй')
+
+        assert ingestor.drain(timeout=5) is True
+        assert sum(batches) == 2
+
+    def test_dead_thread_is_restarted(self, monkeypatch):
+        """Тест: упавший поток записи перезапускается при следующем ответе"""
+        ingestor = ingest.Ingestor()
+        monkeypatch.setattr(ingestor, '_run', lambda: None)
+        ingestor.submit(1, 1, 'Очередь никто не разбирает')
+        ingestor._thread.join(timeout=5)
+        monkeypatch.undo()
+        batches = []
+        monkeypatch.setattr(ingest, 'write_batch', lambda batch: (
+            batches.append(len(batch)) or {}))
+
+        ingestor.submit(1, 1, 'Перезапуск')
+
+        assert ingestor._thread.is_alive()
+        assert ingestor.drain(timeout=5) is True
+        assert sum(batches) == 2
+
+
+class TestSpool:
+    def test_orphan_spool_is_replayed(self, settings, tmp_path, test_answer):
+        """Тест: ответы из файла упавшего процесса дописываются, записанные — нет"""
+        settings.INGEST_SPOOL_DIR = str(tmp_path)
+        question_id, user_id = test_answer.question_id_id, test_answer.user_id_id
+        crashed = ingest.Ingestor(flusher=False)
+        first = crashed.submit(question_id, user_id, 'Записан до падения')
+        second = crashed.submit(question_id, user_id, 'Не успел')
+        crashed._spool.done([first])
+        # Процесс упал: файл больше никто не держит
+        crashed._spool._file.close()
+        path = next(tmp_path.iterdir())
+
+        ingest.Ingestor(flusher=False).replay_orphans()
+
+        texts = Answer.objects.exclude(id=test_answer.id).values_list(
+            'text', flat=True)
+        assert list(texts) == ['Не успел']
+        assert ingest.get_status(second)['status'] == 'written'
+        assert not os.path.exists(path)
+
+    def test_fsync_is_grouped(self, settings, tmp_path, monkeypatch):
+        """Тест: параллельные ответы делят fsync, а не ждут по одному"""
+        settings.INGEST_SPOOL_FSYNC = True
+        spool = ingest.Spool(str(tmp_path))
+        calls = []
+
+        def slow_fsync(fd):
+            calls.append(fd)
+            time.sleep(0.05)
+        monkeypatch.setattr(ingest.os, 'fsync', slow_fsync)
+        threads = [threading.Thread(target=spool.append, args=(
+            ingest.Pending(str(i), 1, 1, 'Ответ'),)) for i in range(10)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert 1 <= len(calls) < 10
+        assert spool._synced == 10
+
+    def test_live_spool_is_not_replayed(self, settings, tmp_path):
+        """Тест: файл живого процесса не трогается"""
+        settings.INGEST_SPOOL_DIR = str(tmp_path)
+        live = ingest.Ingestor(flusher=False)
+        live.submit(1, 1, 'Ждёт записи')
+
+        assert list(ingest.Spool.orphans(str(tmp_path))) == []
@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+from core.log import JsonFormatter, NonBlockingQueueHandler, SamplingFilter
+
+
+def make_record(level=logging.INFO, msg="Вопрос %s найден", args=(1,), **extra):
+    record = logging.makeLogRecord({
+        'name': 'core.views', 'levelno': level,
+        'levelname': logging.getLevelName(level), 'msg': msg, 'args': args,
+    })
+    record.__dict__.update(extra)
+    return record
+
+
+class TestJsonFormatter:
+    def test_one_json_line(self):
+        """Тест: запись превращается в одну JSON-строку с полями extra"""
+        line = JsonFormatter().format(make_record(request_id='abc'))
+
+        data = json.loads(line)
+        assert data['message'] == "Вопрос 1 найден"
+        assert data['level'] == 'INFO'
+        assert data['request_id'] == 'abc'
+        assert '\n' not in line
+
+
+class TestSamplingFilter:
+    def test_zero_rate_drops_info_keeps_warning(self):
+        """Тест: при rate=0 INFO отбрасывается, WARNING проходит"""
+        sampling = SamplingFilter(rate=0)
+
+        assert not sampling.filter(make_record(logging.INFO))
+        assert sampling.filter(make_record(logging.WARNING))
+
+    def test_full_rate_keeps_everything(self):
+        """Тест: при rate=1 проходят все записи"""
+        assert SamplingFilter(rate=1).filter(make_record(logging.DEBUG))
+
+
+class TestNonBlockingQueueHandler:
+    def test_writes_json_to_file(self, tmp_path):
+        """Тест: фоновый поток пишет записи в файл в формате JSON"""
+        path = tmp_path / 'app.log'
+        handler = NonBlockingQueueHandler(str(path), console=False)
+        try:
+            handler.handle(make_record())
+        finally:
+            handler.close()
+
+        data = json.loads(path.read_text(encoding='utf-8'))
+        assert data['message'] == "Вопрос 1 найден"
+
+    def test_stdout_without_file(self, capsys):
+        """Тест: без файла записи идут в stdout в формате JSON"""
+        handler = NonBlockingQueueHandler(None)
+        try:
+            handler.handle(make_record(request_id='abc'))
+        finally:
+            handler.close()
+
+        data = json.loads(capsys.readouterr().out)
+        assert data['message'] == "Вопрос 1 найден"
+        assert data['request_id'] == 'abc'
+
+    def test_exception_rendered_in_caller(self, tmp_path):
+        """Тест: трейсбек сохраняется текстом до постановки в очередь"""
+        path = tmp_path / 'app.log'
+        handler = NonBlockingQueueHandler(str(path), console=False)
+        try:
+            try:
+                raise ValueError("сбой")
+            except ValueError:
+                record = make_record(logging.ERROR)
+                record.exc_info = sys.exc_info()
+                handler.handle(record)
+        finally:
+            handler.close()
+
+        data = json.loads(path.read_text(encoding='utf-8'))
+        assert 'ValueError: сбой' in data['exc']
+
+    def test_full_queue_drops_instead_of_blocking(self, tmp_path):
+        """Тест: переполненная очередь не блокирует вызывающий поток"""
+        handler = NonBlockingQueueHandler(
+            str(tmp_path / 'app.log'), console=False, queue_size=1)
+        handler.listener.stop()
+        try:
+            handler.queue.put_nowait(make_record())
+            handler.handle(make_record())
+            handler.handle(make_record())
+
+            assert handler.dropped == 2
+            assert handler.queue.full()
+        finally:
+            handler.close()
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason="нужен fork")
+    def test_child_process_restarts_listener(self, tmp_path):
+        """Тест: после fork (gunicorn --preload) записи дочернего процесса пишутся"""
+        path = tmp_path / 'app.log'
+        handler = NonBlockingQueueHandler(str(path), console=False)
+        try:
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    handler.handle(make_record(args=('из воркера',)))
+                    handler.close()
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+        finally:
+            handler.close()
+
+        data = json.loads(path.read_text(encoding='utf-8'))
+        assert data['message'] == "Вопрос из воркера найден"
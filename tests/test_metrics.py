@@ -0,0 +1,94 @@
+import warnings
+
+import pytest
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.metrics import NPlusOneWarning, measure, reset_metrics
+from core.models import Question
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+class TestInstrumentationMiddleware:
+    def test_server_timing_header(self, api_client, valid_api_key,
+                                  test_question):
+        """Тест заголовка Server-Timing с временем и числом запросов к БД"""
+        response = api_client.get(
+            reverse('question-detail', kwargs={'id': test_question.id}),
+            HTTP_X_API_KEY=valid_api_key)
+
+        timing = response['Server-Timing']
+        assert 'app;dur=' in timing
+        assert 'db;dur=' in timing and 'queries"' in timing
+        assert 'serialize;dur=' in timing
+
+    def test_metrics_endpoint(self, api_client, valid_api_key, test_question):
+        """Тест гистограмм по маршрутам на /metrics"""
+        api_client.get(reverse('question-list'), HTTP_X_API_KEY=valid_api_key)
+
+        response = api_client.get(reverse('metrics'))
+
+        body = response.content.decode()
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        assert ('http_request_duration_seconds_count'
+                '{method="GET",route="api/questions"} 1') in body
+        assert 'http_request_db_queries_bucket' in body
+        assert 'http_response_size_bytes_sum' in body
+
+
+class TestNPlusOneDetection:
+    def test_repeated_select_warns(self, settings, test_question):
+        """Тест: повторяющийся SELECT внутри запроса даёт NPlusOneWarning"""
+        settings.N_PLUS_ONE_WARNINGS = True
+        settings.N_PLUS_ONE_THRESHOLD = 3
+        request = RequestFactory().get('/api/questions')
+
+        def n_plus_one_view():
+            for _ in range(3):
+                Question.objects.get(id=test_question.id)
+            return HttpResponse()
+
+        with pytest.warns(NPlusOneWarning):
+            measure(request, n_plus_one_view)
+
+    def test_views_have_no_n_plus_one(self, api_client, valid_api_key,
+                                      settings, test_question):
+        """Тест: список, карточка вопроса и выгрузка — без N+1"""
+        settings.N_PLUS_ONE_WARNINGS = True
+        settings.N_PLUS_ONE_THRESHOLD = 2
+        settings.EXPORT_CHUNK_SIZE = 1
+        url = reverse('answer-bulk-create', kwargs={'id': test_question.id})
+        api_client.post(url, [{'text': f'a{i}'} for i in range(20)],
+                        format='json', HTTP_X_API_KEY=valid_api_key)
+        Question.objects.bulk_create(Question(text=f'q{i}') for i in range(3))
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', NPlusOneWarning)
+            api_client.get(reverse('question-list'),
+                           HTTP_X_API_KEY=valid_api_key)
+            api_client.get(
+                reverse('question-detail', kwargs={'id': test_question.id}),
+                HTTP_X_API_KEY=valid_api_key)
+            # Поток читает БД уже после ответа, мимо middleware: его
+            # запросы считаем здесь, дочитав тело
+            with CaptureQueriesContext(connection) as export:
+                response = api_client.get(reverse('export'),
+                                          {'format': 'ndjson'},
+                                          HTTP_X_API_KEY=valid_api_key)
+                body = b''.join(response.streaming_content)
+
+        assert len(body.splitlines()) == 4
+        answer_selects = [query for query in export.captured_queries
+                          if 'core_answer' in query['sql']]
+        assert len(answer_selects) == 1
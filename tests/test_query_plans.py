@@ -0,0 +1,167 @@
+"""
+Регрессия планов запросов: горячие запросы представлений должны идти
+по индексам, без полного сканирования таблиц и без сортировки.
+
+Запросы снимаются с реальных вызовов API и прогоняются через EXPLAIN:
+в PostgreSQL с enable_seqscan/enable_sort = off (если индекс подходит,
+план его использует даже на маленькой таблице), в SQLite — через
+EXPLAIN QUERY PLAN.
+"""
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.cache import get_question_cache
+from core.models import Question, Answer
+from core.utils import get_system_user_id
+
+pytestmark = pytest.mark.django_db
+
+CORE_TABLES = ('core_question', 'core_answer')
+
+
+@pytest.fixture
+def seeded(db):
+    """Несколько сотен вопросов с неравномерным числом ответов"""
+    questions = Question.objects.bulk_create(
+        Question(text=f"Seeded question {i}") for i in range(300))
+    user_id = get_system_user_id()
+    Answer.objects.bulk_create(
+        Answer(question_id=question, user_id_id=user_id,
+               text=f"Seeded answer {j}")
+        for index, question in enumerate(questions)
+        for j in range(index % 7)
+    )
+    return questions
+
+
+def _sqlite_problems(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        details = [row[3] for row in cursor.fetchall()]
+    problems = []
+    for detail in details:
+        if (detail.startswith('SCAN ')
+                and detail.split()[1] in CORE_TABLES
+                and 'INDEX' not in detail):
+            problems.append(detail)
+        if 'TEMP B-TREE' in detail:
+            problems.append(detail)
+    return problems
+
+
+def _postgres_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _postgres_nodes(child)
+
+
+def _postgres_problems(sql):
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("SET LOCAL enable_sort = off")
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+        cursor.execute("RESET enable_seqscan")
+        cursor.execute("RESET enable_sort")
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    problems = []
+    for node in _postgres_nodes(plan[0]['Plan']):
+        if (node['Node Type'] == 'Seq Scan'
+                and node.get('Relation Name') in CORE_TABLES):
+            problems.append(f"Seq Scan on {node['Relation Name']}")
+        if node['Node Type'] in ('Sort', 'Incremental Sort'):
+            problems.append(f"{node['Node Type']} by {node.get('Sort Key')}")
+    return problems
+
+
+def plan_problems(sql):
+    if connection.vendor == 'postgresql':
+        return _postgres_problems(sql)
+    return _sqlite_problems(sql)
+
+
+def assert_indexed(call):
+    """Выполняет call() и проверяет план каждого запроса к таблицам core"""
+    get_question_cache().clear()
+    with CaptureQueriesContext(connection) as ctx:
+        response = call()
+    assert response.status_code < 400, response.status_code
+
+    checked = 0
+    for query in ctx.captured_queries:
+        sql = query['sql']
+        if not sql.split()[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+            continue
+        if not any(table in sql for table in CORE_TABLES):
+            continue
+        problems = plan_problems(sql)
+        assert not problems, f"{sql}\n-> {problems}"
+        checked += 1
+    assert checked, "не перехвачено ни одного запроса к таблицам core"
+
+
+class TestHotQueryPlans:
+    def test_question_list_first_page(self, api_client, valid_api_key,
+                                      seeded):
+        assert_indexed(lambda: api_client.get(
+            reverse('question-list'), {'page_size': 20},
+            HTTP_X_API_KEY=valid_api_key))
+
+    def test_question_list_deep_page(self, api_client, valid_api_key,
+                                     seeded):
+        url = reverse('question-list')
+        page = api_client.get(url, {'page_size': 200},
+                              HTTP_X_API_KEY=valid_api_key)
+
+        assert_indexed(lambda: api_client.get(
+            url, {'page_size': 20, 'cursor': page.data['next']},
+            HTTP_X_API_KEY=valid_api_key))
+
+    def test_question_detail(self, api_client, valid_api_key, seeded):
+        assert_indexed(lambda: api_client.get(
+            reverse('question-detail', kwargs={'id': seeded[6].id}),
+            HTTP_X_API_KEY=valid_api_key))
+
+    def test_question_detail_answer_page(self, api_client, valid_api_key,
+                                         seeded):
+        url = reverse('question-detail', kwargs={'id': seeded[6].id})
+        page = api_client.get(url, {'page_size': 2},
+                              HTTP_X_API_KEY=valid_api_key)
+
+        assert_indexed(lambda: api_client.get(
+            url, {'page_size': 2, 'cursor': page.data['next'],
+                  'include': 'username'},
+            HTTP_X_API_KEY=valid_api_key))
+
+    def test_answer_create(self, api_client, valid_api_key, seeded):
+        assert_indexed(lambda: api_client.post(
+            reverse('answer-create', kwargs={'id': seeded[3].id}),
+            {'text': 'Plan check'}, format='json',
+            HTTP_X_API_KEY=valid_api_key))
+
+    def test_answer_detail(self, api_client, valid_api_key, seeded):
+        answer = Answer.objects.filter(question_id=seeded[6]).first()
+        assert_indexed(lambda: api_client.get(
+            reverse('answer-detail', kwargs={'answer_id': answer.id}),
+            HTTP_X_API_KEY=valid_api_key))
+
+    def test_answer_delete(self, api_client, valid_api_key, seeded):
+        answer = Answer.objects.filter(question_id=seeded[6]).first()
+        assert_indexed(lambda: api_client.delete(
+            reverse('answer-detail', kwargs={'answer_id': answer.id}),
+            HTTP_X_API_KEY=valid_api_key))
+
+    def test_question_delete(self, api_client, valid_api_key, seeded):
+        assert_indexed(lambda: api_client.delete(
+            reverse('question-detail', kwargs={'id': seeded[6].id}),
+            HTTP_X_API_KEY=valid_api_key))
+
+    def test_checker_flags_unindexed_query(self, seeded):
+        """Проверка самой проверки: фильтр по неиндексированной колонке"""
+        sql = "SELECT id FROM core_answer WHERE text = 'x' ORDER BY text"
+
+        assert plan_problems(sql)
@@ -0,0 +1,189 @@
+import pytest
+from django.urls import reverse
+from core import ratelimit
+from core.auth import create_key
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def small_bucket(settings):
+    settings.RATE_LIMIT_ENABLED = True
+    settings.RATE_LIMIT_RATE = 0.5
+    settings.RATE_LIMIT_BURST = 2
+    settings.RATE_LIMIT_ROUTES = {}
+    return settings
+
+
+class TestTokenBucket:
+    def test_burst_then_wait(self):
+        """Тест: ведро пропускает burst запросов и считает время ожидания"""
+        backend = ratelimit.MemoryBackend()
+
+        assert backend.take('k', rate=2, burst=2) == 0
+        assert backend.take('k', rate=2, burst=2) == 0
+        assert backend.take('k', rate=2, burst=2) == pytest.approx(0.5, abs=0.01)
+
+    def test_refill(self):
+        """Тест: токены восстанавливаются со скоростью rate"""
+        state, wait = ratelimit._refill((0, 100.0), rate=2, burst=5, now=101.0)
+
+        assert wait == 0
+        assert state == (1, 101.0)
+
+    def test_refill_capped_by_burst(self):
+        """Тест: ведро не наполняется больше burst"""
+        state, _ = ratelimit._refill((0, 0.0), rate=10, burst=3, now=1000.0)
+
+        assert state[0] == 2
+
+    def test_buckets_are_bounded(self, settings):
+        """Тест: число вёдер в памяти ограничено"""
+        settings.RATE_LIMIT_MAX_BUCKETS = 3
+        backend = ratelimit.MemoryBackend()
+        for index in range(10):
+            backend.take(f'k{index}', rate=1, burst=1)
+
+        assert len(backend._buckets) == 3
+
+
+class TestRateLimitedViews:
+    def test_429_with_retry_after(self, api_client, valid_api_key, small_bucket):
+        """Тест: сверх лимита — 429 и Retry-After"""
+        url = reverse('question-list')
+        codes = [api_client.get(url, HTTP_X_API_KEY=valid_api_key).status_code
+                 for _ in range(3)]
+
+        assert codes == [200, 200, 429]
+        response = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+        assert response['Retry-After'] == '2'
+        assert 'error' in response.json()
+
+    def test_buckets_per_key_and_route(self, api_client, valid_api_key,
+                                       test_question, small_bucket):
+        """Тест: у каждого ключа и маршрута своё ведро"""
+        _, other_key = create_key('other')
+        url = reverse('question-list')
+        for _ in range(2):
+            api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert api_client.get(url, HTTP_X_API_KEY=valid_api_key).status_code == 429
+        assert api_client.get(url, HTTP_X_API_KEY=other_key).status_code == 200
+        detail = reverse('question-detail', kwargs={'id': test_question.id})
+        assert api_client.get(detail, HTTP_X_API_KEY=valid_api_key).status_code == 200
+
+    def test_route_override(self, api_client, valid_api_key, settings):
+        """Тест: для тяжёлых маршрутов свой лимит"""
+        settings.RATE_LIMIT_ENABLED = True
+        settings.RATE_LIMIT_ROUTES = {'export': (0.1, 1)}
+        url = reverse('export') + '?format=ndjson'
+
+        first = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+        b''.join(first.streaming_content)
+        second = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert first.status_code == 200
+        assert second.status_code == 429
+        assert second['Retry-After'] == '10'
+
+    def test_shared_key_buckets_per_client(self, api_client, valid_api_key,
+                                           small_bucket):
+        """Тест: общий X_API_KEY — у каждого адреса клиента своё ведро"""
+        url = reverse('question-list')
+        for _ in range(2):
+            api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                           REMOTE_ADDR='10.0.0.1')
+
+        busy = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                              REMOTE_ADDR='10.0.0.1')
+        other = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                               REMOTE_ADDR='10.0.0.2')
+
+        assert busy.status_code == 429
+        assert other.status_code == 200
+
+    def test_client_header_behind_proxy(self, api_client, valid_api_key,
+                                        small_bucket):
+        """Тест: за прокси берётся адрес, дописанный прокси, а не клиентом"""
+        small_bucket.RATE_LIMIT_CLIENT_HEADER = 'X-Forwarded-For'
+        url = reverse('question-list')
+        for spoofed in ('1.1.1.1', '2.2.2.2'):
+            api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                           HTTP_X_FORWARDED_FOR=f'{spoofed}, 10.0.0.1')
+
+        busy = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                              HTTP_X_FORWARDED_FOR='3.3.3.3, 10.0.0.1')
+        other = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                               HTTP_X_FORWARDED_FOR='3.3.3.3, 10.0.0.2')
+
+        assert busy.status_code == 429
+        assert other.status_code == 200
+
+    def test_trusted_proxy_hops(self, rf, settings):
+        """Тест: за двумя прокси адрес клиента — второй с конца"""
+        settings.RATE_LIMIT_CLIENT_HEADER = 'X-Forwarded-For'
+        settings.RATE_LIMIT_TRUSTED_PROXIES = 2
+        request = rf.get('/', HTTP_X_FORWARDED_FOR='6.6.6.6, 10.0.0.1, 10.1.0.1')
+        direct = rf.get('/', HTTP_X_FORWARDED_FOR='10.0.0.1')
+        missing = rf.get('/', REMOTE_ADDR='10.9.9.9')
+
+        assert ratelimit.client_address(request) == '10.0.0.1'
+        assert ratelimit.client_address(direct) == '10.0.0.1'
+        assert ratelimit.client_address(missing) == '10.9.9.9'
+
+    def test_invalid_key_not_counted(self, api_client, small_bucket):
+        """Тест: неверный ключ получает 403, а не 429"""
+        url = reverse('question-list')
+        codes = {api_client.get(url, HTTP_X_API_KEY='invalid-key').status_code
+                 for _ in range(5)}
+
+        assert codes == {403}
+
+    def test_async_view(self, client, valid_api_key, small_bucket):
+        """Тест: async-представления ограничиваются так же"""
+        url = reverse('async-question-list')
+        codes = [client.get(url, HTTP_X_API_KEY=valid_api_key).status_code
+                 for _ in range(3)]
+
+        assert codes == [200, 200, 429]
+
+    def test_enabled_by_default(self):
+        """Тест: без RATE_LIMIT_ENABLED лимит включён"""
+        from Test import settings as project_settings
+
+        assert project_settings.RATE_LIMIT_ENABLED is True
+
+    def test_disabled(self, api_client, valid_api_key, small_bucket):
+        """Тест: RATE_LIMIT_ENABLED=False отключает лимит"""
+        small_bucket.RATE_LIMIT_ENABLED = False
+        url = reverse('question-list')
+        codes = {api_client.get(url, HTTP_X_API_KEY=valid_api_key).status_code
+                 for _ in range(5)}
+
+        assert codes == {200}
+
+
+class TestCacheBackend:
+    def test_shared_bucket(self, api_client, valid_api_key, small_bucket):
+        """Тест: бэкенд cache хранит вёдра в кэше Django (locmem вместо Redis)"""
+        small_bucket.RATE_LIMIT_BACKEND = 'cache'
+        url = reverse('question-list')
+        for _ in range(2):
+            api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        # Память процесса не при чём: состояние лежит в кэше
+        ratelimit.BACKENDS['memory'].clear()
+        response = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == 429
+        assert response['Retry-After'] == '2'
+
+    def test_async_view_uses_cache_backend(self, client, valid_api_key,
+                                           small_bucket):
+        """Тест: async-представления ходят в бэкенд cache через поток"""
+        small_bucket.RATE_LIMIT_BACKEND = 'cache'
+        url = reverse('async-question-list')
+        codes = [client.get(url, HTTP_X_API_KEY=valid_api_key).status_code
+                 for _ in range(3)]
+
+        assert codes == [200, 200, 429]
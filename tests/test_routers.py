@@ -0,0 +1,202 @@
+import pytest
+from django.db import OperationalError, connections
+from django.urls import reverse
+from rest_framework import status
+from core import routers
+from core.counters import answers_added
+from core.models import Answer, Question
+from core.utils import get_system_user_id
+
+pytestmark = pytest.mark.django_db(databases=['default', 'replica'])
+
+
+@pytest.fixture(autouse=True)
+def replica(settings):
+    """Одна реплика — отдельная тестовая БД без данных основной"""
+    settings.DATABASE_REPLICAS = ['replica']
+    settings.REPLICA_STICKY_SECONDS = 60
+
+
+def get_question(api_client, api_key, question_id, page_size=None,
+                 **headers):
+    url = reverse('question-detail', kwargs={'id': question_id})
+    if page_size is not None:
+        # Не первая страница по умолчанию: мимо кэша, промах которого
+        # всегда читается с основной БД
+        url += f'?page_size={page_size}'
+    return api_client.get(url, HTTP_X_API_KEY=api_key, **headers)
+
+
+class TestReplicaReads:
+    def test_reads_go_to_replica(self, api_client, valid_api_key):
+        """Тест: GET читает с реплики, запись остаётся в default"""
+        on_primary = Question.objects.create(text='Только в default')
+        on_replica = Question.objects.using('replica').create(text='На реплике')
+
+        response = api_client.get(reverse('question-list'),
+                                  HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_200_OK
+        ids = [q['id'] for q in response.data['results']]
+        assert on_replica.id in ids
+        assert on_primary.text not in [q['text'] for q in response.data['results']]
+
+    def test_write_makes_reads_sticky(self, api_client, valid_api_key):
+        """Тест: после POST клиент видит свой ответ, хотя реплика отстаёт"""
+        question = Question.objects.create(text='Вопрос')
+        Question.objects.using('replica').create(id=question.id, text='Вопрос')
+
+        created = api_client.post(
+            reverse('answer-create', kwargs={'id': question.id}),
+            {'text': 'Только что'}, format='json',
+            HTTP_X_API_KEY=valid_api_key)
+        response = get_question(api_client, valid_api_key, question.id)
+
+        assert created['X-Primary-Until']
+        assert routers.STICKY_COOKIE in created.cookies
+        assert [a['text'] for a in response.data['answers']] == ['Только что']
+        answer = api_client.get(
+            reverse('answer-detail', kwargs={'answer_id': created.data['id']}),
+            HTTP_X_API_KEY=valid_api_key)
+        assert answer.status_code == status.HTTP_200_OK
+
+    def test_cache_is_filled_from_primary(self, api_client, valid_api_key):
+        """Тест: после записи отстающая реплика не возвращает в кэш старую страницу"""
+        question = Question.objects.create(text='Вопрос')
+        Question.objects.using('replica').create(id=question.id, text='Вопрос')
+        created = api_client.post(
+            reverse('answer-create', kwargs={'id': question.id}),
+            {'text': 'Только что'}, format='json',
+            HTTP_X_API_KEY=valid_api_key)
+        api_client.cookies.clear()
+
+        # Метка истекла у писавшего, остальные клиенты читают с реплики
+        for _ in range(2):
+            response = get_question(api_client, valid_api_key, question.id)
+            assert [a['id'] for a in response.data['answers']] == [
+                created.data['id']]
+
+    @pytest.mark.parametrize('route', ['question-detail', 'async-question-detail'])
+    def test_sticky_client_skips_cache(self, client, valid_api_key, route):
+        """Тест: «липкий» клиент не получает страницу из несброшенного кэша"""
+        question = Question.objects.create(text='Вопрос')
+        url = reverse(route, kwargs={'id': question.id})
+        client.get(url, HTTP_X_API_KEY=valid_api_key)
+        # Ответ записал другой воркер: кэш этого процесса не сброшен
+        answer = Answer.objects.create(question_id=question, text='Только что',
+                                       user_id_id=get_system_user_id())
+        answers_added(question.id, answer.created_at)
+        created = client.post(reverse('question-list'), {'text': 'Новый'},
+                              content_type='application/json',
+                              HTTP_X_API_KEY=valid_api_key)
+        client.cookies.clear()
+
+        sticky = client.get(url, HTTP_X_API_KEY=valid_api_key,
+                            HTTP_X_PRIMARY_UNTIL=created['X-Primary-Until'])
+        plain = client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert [a['id'] for a in sticky.json()['answers']] == [answer.id]
+        assert plain.json()['answers'] == []
+
+    def test_sticky_header_without_cookie(self, client, valid_api_key):
+        """Тест: метка в заголовке X-Primary-Until работает без cookie"""
+        question = Question.objects.create(text='Вопрос')
+        created = client.post(reverse('question-list'), {'text': 'Новый'},
+                              content_type='application/json',
+                              HTTP_X_API_KEY=valid_api_key)
+        client.cookies.clear()
+
+        sticky = get_question(client, valid_api_key, question.id, page_size=10,
+                              HTTP_X_PRIMARY_UNTIL=created['X-Primary-Until'])
+        plain = get_question(client, valid_api_key, question.id, page_size=10)
+
+        assert sticky.status_code == status.HTTP_200_OK
+        assert plain.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_stickiness_expires(self, api_client, valid_api_key, settings):
+        """Тест: по истечении окна чтения снова идут на реплику"""
+        settings.REPLICA_STICKY_SECONDS = 0
+        question = api_client.post(reverse('question-list'), {'text': 'Вопрос'},
+                                   format='json',
+                                   HTTP_X_API_KEY=valid_api_key).data
+
+        response = get_question(api_client, valid_api_key, question['id'],
+                                page_size=10)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_failed_write_is_not_sticky(self, api_client, valid_api_key):
+        """Тест: ошибочный запрос не переключает клиента на основную БД"""
+        response = api_client.post(reverse('question-list'), {},
+                                   format='json', HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'X-Primary-Until' not in response
+
+    def test_no_replicas_no_cookie(self, api_client, valid_api_key, settings):
+        """Тест: без реплик метка не ставится и чтения идут в default"""
+        settings.DATABASE_REPLICAS = []
+        question = api_client.post(reverse('question-list'), {'text': 'Вопрос'},
+                                   format='json',
+                                   HTTP_X_API_KEY=valid_api_key)
+        api_client.cookies.clear()
+
+        response = get_question(api_client, valid_api_key, question.data['id'])
+
+        assert 'X-Primary-Until' not in question
+        assert response.status_code == status.HTTP_200_OK
+
+
+class TestFailover:
+    @pytest.fixture
+    def replica_down(self, monkeypatch):
+        calls = []
+
+        def refuse():
+            calls.append(1)
+            raise OperationalError('connection refused')
+
+        monkeypatch.setattr(connections['replica'], 'ensure_connection', refuse)
+        return calls
+
+    def test_unreachable_replica_falls_back_to_primary(
+            self, api_client, valid_api_key, test_answer, replica_down):
+        """Тест: реплика недоступна — чтение с default"""
+        response = api_client.get(
+            reverse('answer-detail', kwargs={'answer_id': test_answer.id}),
+            HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['text'] == test_answer.text
+
+    def test_unreachable_replica_is_skipped_until_retry(
+            self, api_client, valid_api_key, test_answer, replica_down):
+        """Тест: после сбоя реплика не проверяется до REPLICA_RETRY_SECONDS"""
+        url = reverse('answer-detail', kwargs={'answer_id': test_answer.id})
+        for _ in range(3):
+            api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert len(replica_down) == 1
+
+    def test_replica_is_retried(self, settings, rf, replica_down):
+        """Тест: по истечении REPLICA_RETRY_SECONDS реплика проверяется снова"""
+        settings.REPLICA_RETRY_SECONDS = 0
+
+        routers.choose_read_alias(rf.get('/'))
+        routers.choose_read_alias(rf.get('/'))
+
+        assert len(replica_down) == 2
+
+
+class TestRouter:
+    def test_writes_always_go_to_primary(self):
+        """Тест: запись в default, даже внутри чтения с реплики"""
+        router = routers.ReplicaRouter()
+        token = routers._read_alias.set('replica')
+        try:
+            assert router.db_for_read(Answer) == 'replica'
+            assert router.db_for_write(Answer) == 'default'
+        finally:
+            routers._read_alias.reset(token)
+
+        assert router.db_for_read(Answer) is None
@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from core import renderers
+from core.models import Answer, Question
+from core.renderers import FastJSONRenderer
+from core.serializers import (
+    ANSWER_FIELDS, QUESTION_FIELDS, AnswerSerializer, QuestionSerializer,
+    answer_rows, question_rows
+)
+
+pytestmark = pytest.mark.django_db
+
+# Всё, что JSON экранирует по-особому: кавычки, управляющие символы,
+# разделители строк JavaScript, не-ASCII и символы вне BMP
+TRICKY_TEXTS = [
+    'plain', 'кириллица', 'кавычки " и \\ слэш', 'строки\nи\tтабы\r',
+    'управляющие \x01\x1f\x7f', 'разделители \u2028 и \u2029',
+    'эмодзи \U0001F600', '',
+]
+
+
+@pytest.fixture
+def questions(test_user):
+    now = timezone.now()
+    created = []
+    for index, text in enumerate(TRICKY_TEXTS):
+        question = Question.objects.create(
+            text=text, answer_count=index,
+            last_answer_at=now - timedelta(microseconds=index) if index % 2 else None)
+        Answer.objects.create(question_id=question, user_id=test_user, text=text)
+        created.append(question)
+    return created
+
+
+def drf_bytes(data):
+    return JSONRenderer().render(data)
+
+
+class TestRowsMatchSerializers:
+    def test_question_rows(self, questions):
+        """Тест: question_rows даёт то же, что QuestionSerializer"""
+        expected = QuestionSerializer(
+            Question.objects.order_by('id'), many=True).data
+
+        rows = question_rows(list(
+            Question.objects.order_by('id').values(*QUESTION_FIELDS)))
+
+        assert rows == [dict(item) for item in expected]
+        assert [list(row) for row in rows] == [list(item) for item in expected]
+
+    def test_answer_rows(self, questions):
+        """Тест: answer_rows даёт то же, что AnswerSerializer"""
+        expected = AnswerSerializer(Answer.objects.order_by('id'), many=True).data
+
+        rows = answer_rows(list(
+            Answer.objects.order_by('id').values(*ANSWER_FIELDS)))
+
+        assert drf_bytes(rows) == drf_bytes(expected)
+
+    def test_other_timezone(self, questions):
+        """Тест: вне UTC даты форматируются как у DRF"""
+        with timezone.override('Europe/Moscow'):
+            expected = QuestionSerializer(
+                Question.objects.order_by('id'), many=True).data
+            rows = question_rows(list(
+                Question.objects.order_by('id').values(*QUESTION_FIELDS)))
+
+        assert drf_bytes(rows) == drf_bytes(expected)
+        assert rows[0]['created_at'].endswith('+03:00')
+
+
+class TestFastJSONRenderer:
+    @pytest.mark.parametrize('data', [
+        {'results': TRICKY_TEXTS, 'next': None, 'count': 0},
+        [{'id': 1, 'flag': True, 'nested': {'list': [1, 'два', None]}}],
+        {'big': 2 ** 70},
+        {1: 'нестроковый ключ'},
+        'просто строка',
+        [],
+    ])
+    def test_byte_identical(self, data):
+        """Тест: вывод побайтно совпадает с JSONRenderer DRF"""
+        assert FastJSONRenderer().render(data) == drf_bytes(data)
+
+    def test_none_is_empty(self):
+        assert FastJSONRenderer().render(None) == b''
+
+    def test_indent_falls_back(self):
+        """Тест: ?indent через Accept обрабатывает родительский класс"""
+        data = {'a': [1, 2]}
+        media_type = 'application/json; indent=2'
+
+        assert (FastJSONRenderer().render(data, media_type)
+                == JSONRenderer().render(data, media_type))
+
+    def test_without_orjson(self, monkeypatch):
+        """Тест: без orjson работает стандартный json"""
+        monkeypatch.setattr(renderers, 'orjson', None)
+        data = {'results': TRICKY_TEXTS}
+
+        assert FastJSONRenderer().render(data) == drf_bytes(data)
+
+
+class TestResponsesUnchanged:
+    def test_question_list(self, api_client, valid_api_key, questions):
+        """Тест: тело GET /questions такое же, как через ModelSerializer"""
+        response = api_client.get(reverse('question-list'),
+                                  HTTP_X_API_KEY=valid_api_key)
+
+        expected = QuestionSerializer(
+            Question.objects.order_by('created_at', 'id'), many=True).data
+        assert response.content == drf_bytes(
+            {'next': None, 'results': expected})
+
+    def test_question_detail(self, api_client, valid_api_key, questions):
+        """Тест: тело GET /questions/{id} такое же, как через ModelSerializer"""
+        question = questions[5]
+
+        response = api_client.get(
+            reverse('question-detail', kwargs={'id': question.id}),
+            HTTP_X_API_KEY=valid_api_key)
+
+        question.refresh_from_db()
+        assert response.content == drf_bytes({
+            'question': QuestionSerializer(question).data,
+            'answers': AnswerSerializer(
+                question.answer_set.order_by('created_at', 'id'), many=True).data,
+            'next': None,
+        })
+
+    def test_async_answer_detail(self, client, valid_api_key, questions):
+        """Тест: async-ответ совпадает с AnswerSerializer"""
+        answer = Answer.objects.get(question_id=questions[5])
+
+        response = client.get(
+            reverse('async-answer-detail', kwargs={'answer_id': answer.id}),
+            HTTP_X_API_KEY=valid_api_key)
+
+        assert response.content == drf_bytes(AnswerSerializer(answer).data)
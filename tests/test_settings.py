@@ -0,0 +1,28 @@
+import runpy
+from pathlib import Path
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+SETTINGS = Path(__file__).resolve().parent.parent / 'Test' / 'settings.py'
+
+
+class TestSecretKey:
+    def test_required_without_debug(self, monkeypatch):
+        """Тест: при DEBUG=False без SECRET_KEY настройки не загружаются"""
+        monkeypatch.setenv('DEBUG', 'False')
+        monkeypatch.setenv('SECRET_KEY', '')
+
+        with pytest.raises(ImproperlyConfigured, match='SECRET_KEY'):
+            runpy.run_path(str(SETTINGS))
+
+    def test_taken_from_environment(self, monkeypatch):
+        """Тест: ключ из окружения, отладочный только при DEBUG"""
+        monkeypatch.setenv('DEBUG', 'False')
+        monkeypatch.setenv('SECRET_KEY', 'prod-key')
+        assert runpy.run_path(str(SETTINGS))['SECRET_KEY'] == 'prod-key'
+
+        monkeypatch.setenv('DEBUG', 'True')
+        monkeypatch.setenv('SECRET_KEY', '')
+        assert runpy.run_path(str(SETTINGS))['SECRET_KEY'].startswith(
+            'django-insecure-')
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+from core import pubsub
+from core.models import Answer
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_hub():
+    """Потоки, не дочитанные тестом, остаются подписанными"""
+    pubsub.hub.clear()
+    yield
+    pubsub.hub.clear()
+
+
+def parse(chunk):
+    """Поля одного SSE-события"""
+    fields = {}
+    for line in chunk.decode().strip().split('\n'):
+        name, _, value = line.partition(': ')
+        fields[name] = value
+    return fields
+
+
+async def next_chunk(stream, timeout=2):
+    return await asyncio.wait_for(anext(stream), timeout)
+
+
+async def open_stream(api_key, question_id, **headers):
+    """Открывает поток и читает приветствие; возвращает итератор событий"""
+    response = await AsyncClient().get(
+        reverse('answer-stream', kwargs={'id': question_id}),
+        headers={'X-API-KEY': api_key, **headers})
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'] == 'text/event-stream'
+    stream = response.streaming_content
+    assert parse(await next_chunk(stream))['retry']
+    return stream
+
+
+def committed(capture, request):
+    """
+    Запрос через синхронный клиент с выполнением on_commit. Вызывается
+    через sync_to_async: соединение с БД есть только у основного потока
+    """
+    @sync_to_async
+    def run():
+        with capture(execute=True):
+            return request()
+    return run()
+
+
+class TestAnswerStreamView:
+    def test_new_answer_is_pushed(self, client, valid_api_key, test_question,
+                                  django_capture_on_commit_callbacks):
+        """Тест: ответ, созданный через API, приходит подписчику после коммита"""
+        url = reverse('answer-create', kwargs={'id': test_question.id})
+
+        @async_to_sync
+        async def scenario():
+            stream = await open_stream(valid_api_key, test_question.id)
+            assert pubsub.hub.subscriber_count() == 1
+            await committed(django_capture_on_commit_callbacks, lambda: (
+                client.post(url, {'text': 'Свежий ответ'},
+                            content_type='application/json',
+                            HTTP_X_API_KEY=valid_api_key)))
+            return parse(await next_chunk(stream))
+
+        event = scenario()
+
+        answer = Answer.objects.get()
+        assert event['event'] == 'answer'
+        assert event['id'] == str(answer.id)
+        assert json.loads(event['data'])['text'] == 'Свежий ответ'
+
+    def test_reconnect_replays_missed_answers(self, valid_api_key,
+                                              test_answer):
+        """Тест: с Last-Event-ID досылаются ответы после него"""
+        question = test_answer.question_id
+        newer = Answer.objects.create(question_id=question,
+                                      user_id=test_answer.user_id,
+                                      text='Пропущенный')
+
+        @async_to_sync
+        async def scenario():
+            stream = await open_stream(
+                valid_api_key, question.id,
+                **{'Last-Event-ID': str(test_answer.id)})
+            return parse(await next_chunk(stream))
+
+        event = scenario()
+
+        assert event['id'] == str(newer.id)
+        assert json.loads(event['data'])['text'] == 'Пропущенный'
+
+    def test_question_delete_closes_stream(self, client, valid_api_key,
+                                           test_question,
+                                           django_capture_on_commit_callbacks):
+        """Тест: удаление вопроса — событие question-deleted и конец потока"""
+        url = reverse('question-detail', kwargs={'id': test_question.id})
+
+        @async_to_sync
+        async def scenario():
+            stream = await open_stream(valid_api_key, test_question.id)
+            await committed(django_capture_on_commit_callbacks, lambda: (
+                client.delete(url, HTTP_X_API_KEY=valid_api_key)))
+            event = parse(await next_chunk(stream))
+            with pytest.raises(StopAsyncIteration):
+                await next_chunk(stream)
+            return event
+
+        assert scenario()['event'] == 'question-deleted'
+        assert pubsub.hub.subscriber_count() == 0
+
+    def test_heartbeat(self, valid_api_key, test_question, settings):
+        """Тест: без событий поток шлёт комментарии-пинги"""
+        settings.SSE_HEARTBEAT_SECONDS = 0.01
+
+        @async_to_sync
+        async def scenario():
+            stream = await open_stream(valid_api_key, test_question.id)
+            return await next_chunk(stream)
+
+        assert scenario() == b': ping\n\n'
+
+    def test_subscriber_limit(self, valid_api_key, test_question, settings):
+        """Тест: сверх SSE_MAX_SUBSCRIBERS — 503 с Retry-After"""
+        settings.SSE_MAX_SUBSCRIBERS = 0
+
+        response = async_to_sync(AsyncClient().get)(
+            reverse('answer-stream', kwargs={'id': test_question.id}),
+            headers={'X-API-KEY': valid_api_key})
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response['Retry-After']
+
+    def test_unknown_question(self, valid_api_key):
+        """Тест: поток несуществующего вопроса — 404"""
+        response = async_to_sync(AsyncClient().get)(
+            reverse('answer-stream', kwargs={'id': 999}),
+            headers={'X-API-KEY': valid_api_key})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_wsgi_is_rejected(self, client, valid_api_key, test_question):
+        """Тест: под WSGI поток не открывается"""
+        response = client.get(
+            reverse('answer-stream', kwargs={'id': test_question.id}),
+            HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+
+
+class TestHub:
+    def test_dispatch_from_another_thread(self):
+        """Тест: публикация из чужого потока доходит до подписчика"""
+        @async_to_sync
+        async def scenario():
+            subscription = pubsub.hub.subscribe(1)
+            try:
+                thread = threading.Thread(target=pubsub.hub.dispatch,
+                                          args=(1, ('answer', 5, '{}')))
+                thread.start()
+                return await asyncio.wait_for(subscription.queue.get(), 2)
+            finally:
+                pubsub.hub.unsubscribe(subscription)
+
+        assert scenario() == ('answer', 5, '{}')
+
+    def test_slow_subscriber_overflows(self, settings):
+        """Тест: переполненная очередь помечает подписчика, а не блокирует"""
+        settings.SSE_QUEUE_SIZE = 1
+
+        @async_to_sync
+        async def scenario():
+            subscription = pubsub.hub.subscribe(1)
+            try:
+                for event_id in (1, 2):
+                    pubsub.hub.dispatch(1, ('answer', event_id, '{}'))
+                await asyncio.sleep(0)
+                return subscription.overflowed, subscription.queue.qsize()
+            finally:
+                pubsub.hub.unsubscribe(subscription)
+
+        assert scenario() == (True, 1)
+
+
+class TestPostgresPayloads:
+    def test_small_messages_share_notify(self):
+        """Тест: короткие сообщения упаковываются в один NOTIFY"""
+        messages = [('answer', i, '{"text": "x"}') for i in range(10)]
+
+        payloads = list(pubsub.PostgresBackend._payloads(1, messages))
+
+        assert len(payloads) == 1
+        assert len(json.loads(payloads[0])['messages']) == 10
+
+    def test_long_answer_sent_as_id(self):
+        """Тест: длинный ответ не влезает в NOTIFY и уходит без тела"""
+        messages = [('answer', 1, json.dumps({'text': 'x' * 9000})),
+                    ('answer', 2, '{}')]
+
+        payloads = list(pubsub.PostgresBackend._payloads(1, messages))
+
+        assert all(len(p.encode()) <= 8000 for p in payloads)
+        sent = [m for p in payloads for m in json.loads(p)['messages']]
+        assert sent == [['answer', 1, None], ['answer', 2, '{}']]
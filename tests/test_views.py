@@ -1,7 +1,14 @@
+import io
+import json
 import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from core.cache import cache_stats
 from core.models import Question, Answer
+from core.utils import get_system_user_id
 
 pytestmark = pytest.mark.django_db
 
@@ -45,7 +52,8 @@ class TestQuestionListView:
         response = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
 
         assert response.status_code == status.HTTP_200_OK
-        assert response.data == []
+        assert response.data['results'] == []
+        assert response.data['next'] is None
 
     def test_get_questions_with_data(self, api_client, valid_api_key,
                                      test_question):
@@ -55,8 +63,56 @@ class TestQuestionListView:
         response = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]['text'] == test_question.text
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['text'] == test_question.text
+
+    def test_get_questions_paginated(self, api_client, valid_api_key):
+        """Тест курсорной пагинации списка вопросов"""
+        Question.objects.bulk_create(
+            Question(text=f"Question {i}") for i in range(5))
+        url = reverse('question-list')
+
+        seen = []
+        cursor = None
+        while True:
+            params = {'page_size': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = api_client.get(url, params,
+                                      HTTP_X_API_KEY=valid_api_key)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data['results']) <= 2
+            seen.extend(item['id'] for item in response.data['results'])
+            cursor = response.data['next']
+            if cursor is None:
+                break
+
+        assert seen == list(
+            Question.objects.order_by('created_at', 'id')
+            .values_list('id', flat=True))
+
+    def test_get_questions_page_size_capped(self, api_client, valid_api_key,
+                                            settings):
+        """Тест ограничения максимального размера страницы"""
+        settings.QUESTIONS_MAX_PAGE_SIZE = 3
+        Question.objects.bulk_create(
+            Question(text=f"Question {i}") for i in range(5))
+        url = reverse('question-list')
+
+        response = api_client.get(url, {'page_size': 100},
+                                  HTTP_X_API_KEY=valid_api_key)
+
+        assert len(response.data['results']) == 3
+        assert response.data['next'] is not None
+
+    def test_get_questions_invalid_cursor(self, api_client, valid_api_key):
+        """Тест некорректного курсора"""
+        url = reverse('question-list')
+
+        response = api_client.get(url, {'cursor': 'not-a-cursor'},
+                                  HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
 
 
 class TestQuestionDetailView:
@@ -92,6 +148,420 @@ class TestQuestionDetailView:
         assert Question.objects.count() == 0
 
 
+class TestQuestionDetailAnswerPages:
+    @pytest.fixture
+    def question_with_answers(self, test_question, test_user):
+        Answer.objects.bulk_create(
+            Answer(question_id=test_question, user_id=test_user,
+                   text=f"Answer {i}")
+            for i in range(5)
+        )
+        return test_question
+
+    def test_pages_follow_cursor(self, api_client, valid_api_key,
+                                 question_with_answers):
+        """Тест: ответы отдаются страницами по курсору без пропусков"""
+        url = reverse('question-detail',
+                      kwargs={'id': question_with_answers.id})
+        texts, cursor = [], None
+        for _ in range(5):
+            params = {'page_size': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = api_client.get(url, params, HTTP_X_API_KEY=valid_api_key)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.data['question']['id'] == question_with_answers.id
+            texts += [a['text'] for a in response.data['answers']]
+            cursor = response.data['next']
+            if cursor is None:
+                break
+
+        assert texts == [f"Answer {i}" for i in range(5)]
+
+    def test_default_page_is_bounded(self, api_client, valid_api_key,
+                                     question_with_answers, settings):
+        """Тест: без параметров отдаётся не больше ANSWERS_PAGE_SIZE ответов"""
+        settings.ANSWERS_PAGE_SIZE = 3
+        url = reverse('question-detail',
+                      kwargs={'id': question_with_answers.id})
+
+        response = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert len(response.data['answers']) == 3
+        assert response.data['next'] is not None
+
+    def test_single_query(self, api_client, valid_api_key,
+                          question_with_answers, django_assert_num_queries):
+        """Тест: вопрос и страница ответов читаются одним запросом"""
+        url = reverse('question-detail',
+                      kwargs={'id': question_with_answers.id})
+
+        with django_assert_num_queries(1):
+            response = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert len(response.data['answers']) == 5
+
+    def test_include_username(self, api_client, valid_api_key,
+                              question_with_answers, test_user,
+                              django_assert_num_queries):
+        """Тест: ?include=username добавляет имя автора тем же запросом"""
+        url = reverse('question-detail',
+                      kwargs={'id': question_with_answers.id})
+
+        with django_assert_num_queries(1):
+            response = api_client.get(url, {'include': 'username'},
+                                      HTTP_X_API_KEY=valid_api_key)
+
+        assert {a['username'] for a in response.data['answers']} == {
+            test_user.username}
+
+    def test_past_last_page(self, api_client, valid_api_key,
+                            question_with_answers):
+        """Тест: страница после последнего ответа пустая, вопрос на месте"""
+        url = reverse('question-detail',
+                      kwargs={'id': question_with_answers.id})
+        first = api_client.get(url, {'page_size': 4},
+                               HTTP_X_API_KEY=valid_api_key)
+        second = api_client.get(url, {'page_size': 4,
+                                      'cursor': first.data['next']},
+                                HTTP_X_API_KEY=valid_api_key)
+        last = Answer.objects.order_by('created_at', 'id').last()
+        Answer.objects.filter(id=last.id).delete()
+
+        response = api_client.get(url, {'page_size': 4,
+                                        'cursor': first.data['next']},
+                                  HTTP_X_API_KEY=valid_api_key)
+
+        assert len(second.data['answers']) == 1
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['answers'] == []
+        assert response.data['question']['id'] == question_with_answers.id
+
+    def test_invalid_cursor(self, api_client, valid_api_key, test_question):
+        """Тест: некорректный курсор ответов даёт 400"""
+        url = reverse('question-detail', kwargs={'id': test_question.id})
+
+        response = api_client.get(url, {'cursor': 'not-a-cursor'},
+                                  HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_only_default_page_cached(self, api_client, valid_api_key,
+                                      question_with_answers):
+        """Тест: в кэш попадает только первая страница по умолчанию"""
+        url = reverse('question-detail',
+                      kwargs={'id': question_with_answers.id})
+
+        api_client.get(url, {'page_size': 2}, HTTP_X_API_KEY=valid_api_key)
+        api_client.get(url, {'include': 'username'},
+                       HTTP_X_API_KEY=valid_api_key)
+        assert cache_stats() == {'hits': 0, 'misses': 0}
+
+        api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+        api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+        assert cache_stats() == {'hits': 1, 'misses': 1}
+
+    def test_async_pages(self, client, valid_api_key, question_with_answers):
+        """Тест: async-вариант отдаёт те же страницы"""
+        url = reverse('async-question-detail',
+                      kwargs={'id': question_with_answers.id})
+        sync_url = reverse('question-detail',
+                           kwargs={'id': question_with_answers.id})
+        params = {'page_size': 2, 'include': 'username'}
+
+        first = client.get(url, params, HTTP_X_API_KEY=valid_api_key).json()
+        second = client.get(url, {**params, 'cursor': first['next']},
+                            HTTP_X_API_KEY=valid_api_key).json()
+        sync_second = client.get(sync_url, {**params, 'cursor': first['next']},
+                                 HTTP_X_API_KEY=valid_api_key).json()
+
+        assert [a['text'] for a in second['answers']] == ['Answer 2', 'Answer 3']
+        assert second == sync_second
+
+
+class TestQuestionDelete:
+    @pytest.fixture
+    def thread(self, test_question, test_user):
+        Answer.objects.bulk_create(
+            Answer(question_id=test_question, user_id=test_user,
+                   text=f"Answer {i}")
+            for i in range(5)
+        )
+        return test_question
+
+    @pytest.fixture
+    def inline_purge(self, monkeypatch):
+        """Фоновая очистка выполняется в том же потоке, что и тест"""
+        from core import deletion
+        monkeypatch.setattr(deletion, 'run_in_background',
+                            deletion.purge_question)
+
+    def test_answers_not_loaded(self, api_client, valid_api_key, thread):
+        """Тест: каскад не читает ответы в Python"""
+        url = reverse('question-detail', kwargs={'id': thread.id})
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = api_client.delete(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not Answer.objects.exists()
+        assert not any(
+            query['sql'].startswith('SELECT') and 'core_answer' in query['sql']
+            for query in ctx.captured_queries)
+
+    def test_delete_question_counts_answers(self, thread):
+        """Тест: delete_question возвращает число удалённых ответов"""
+        from core.deletion import delete_question
+
+        assert delete_question(thread.id) == 5
+        assert delete_question(thread.id) is None
+
+    def test_purge_hides_then_deletes(self, api_client, valid_api_key, thread,
+                                      inline_purge, settings,
+                                      django_capture_on_commit_callbacks):
+        """Тест: ?mode=purge сразу скрывает вопрос и удаляет ответы в фоне"""
+        settings.PURGE_BATCH_SIZE = 2
+        url = reverse('question-detail', kwargs={'id': thread.id})
+        api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = api_client.delete(url + '?mode=purge',
+                                         HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data == {'id': thread.id, 'status': 'purging'}
+        # Пока очистка не прошла, вопроса уже не видно
+        assert api_client.get(
+            url, HTTP_X_API_KEY=valid_api_key).status_code == 404
+        assert api_client.get(
+            reverse('question-list'),
+            HTTP_X_API_KEY=valid_api_key).data['results'] == []
+        assert api_client.post(
+            reverse('answer-create', kwargs={'id': thread.id}),
+            {'text': 'Late answer'}, format='json',
+            HTTP_X_API_KEY=valid_api_key).status_code == 404
+        assert api_client.delete(
+            url + '?mode=purge',
+            HTTP_X_API_KEY=valid_api_key).status_code == 404
+
+        with CaptureQueriesContext(connection) as ctx:
+            for callback in callbacks:
+                callback()
+
+        assert not Answer.objects.exists()
+        assert not Question.all_objects.exists()
+        batches = [query for query in ctx.captured_queries
+                   if query['sql'].startswith(
+                       'DELETE FROM "core_answer" WHERE "core_answer"."id" IN')]
+        assert len(batches) == 3
+
+    def test_purge_command_resumes(self, thread):
+        """Тест: purge_questions доделывает прерванную очистку"""
+        from core.deletion import start_purge
+
+        start_purge(thread.id)
+        out = io.StringIO()
+        call_command('purge_questions', batch_size=2, stdout=out)
+
+        assert not Question.all_objects.exists()
+        assert not Answer.objects.exists()
+        assert f"Вопрос {thread.id}: удалено ответов 5" in out.getvalue()
+
+    def test_async_purge(self, client, valid_api_key, thread, inline_purge,
+                         django_capture_on_commit_callbacks):
+        """Тест: async-вариант ?mode=purge"""
+        url = reverse('async-question-detail', kwargs={'id': thread.id})
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.delete(url + '?mode=purge',
+                                     HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert not Question.all_objects.exists()
+
+
+class TestQuestionDetailCache:
+    def test_repeated_get_served_from_cache(self, api_client, valid_api_key,
+                                            test_answer,
+                                            django_assert_num_queries):
+        """Тест: повторное чтение вопроса не обращается к БД"""
+        url = reverse('question-detail',
+                      kwargs={'id': test_answer.question_id_id})
+        first = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        with django_assert_num_queries(0):
+            second = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert second.data == first.data
+        assert cache_stats() == {'hits': 1, 'misses': 1}
+
+    def test_answer_create_invalidates_cache(self, api_client, valid_api_key,
+                                             test_question):
+        """Тест: новый ответ сбрасывает закэшированный вопрос"""
+        detail_url = reverse('question-detail',
+                             kwargs={'id': test_question.id})
+        api_client.get(detail_url, HTTP_X_API_KEY=valid_api_key)
+
+        api_client.post(
+            reverse('answer-create', kwargs={'id': test_question.id}),
+            {'text': 'Fresh answer'},
+            format='json',
+            HTTP_X_API_KEY=valid_api_key
+        )
+        response = api_client.get(detail_url, HTTP_X_API_KEY=valid_api_key)
+
+        assert [a['text'] for a in response.data['answers']] == ['Fresh answer']
+
+    def test_answer_delete_invalidates_cache(self, api_client, valid_api_key,
+                                             test_answer):
+        """Тест: удаление ответа сбрасывает закэшированный вопрос"""
+        detail_url = reverse('question-detail',
+                             kwargs={'id': test_answer.question_id_id})
+        api_client.get(detail_url, HTTP_X_API_KEY=valid_api_key)
+
+        api_client.delete(
+            reverse('answer-detail', kwargs={'answer_id': test_answer.id}),
+            HTTP_X_API_KEY=valid_api_key
+        )
+        response = api_client.get(detail_url, HTTP_X_API_KEY=valid_api_key)
+
+        assert response.data['answers'] == []
+
+    def test_question_delete_invalidates_cache(self, api_client,
+                                               valid_api_key, test_question):
+        """Тест: удалённый вопрос не отдаётся из кэша"""
+        detail_url = reverse('question-detail',
+                             kwargs={'id': test_question.id})
+        api_client.get(detail_url, HTTP_X_API_KEY=valid_api_key)
+
+        api_client.delete(detail_url, HTTP_X_API_KEY=valid_api_key)
+        response = api_client.get(detail_url, HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_shared_cache_invalidated_across_workers(
+            self, api_client, valid_api_key, test_question, settings,
+            tmp_path):
+        """Тест: запись в одном воркере сбрасывает общий кэш для другого"""
+        shared = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        }
+        # Два воркера — два экземпляра кэша над одним каталогом
+        settings.CACHES = {**settings.CACHES,
+                           'worker-a': shared, 'worker-b': shared}
+        detail_url = reverse('question-detail',
+                             kwargs={'id': test_question.id})
+        settings.QUESTION_CACHE_ALIAS = 'worker-a'
+        api_client.get(detail_url, HTTP_X_API_KEY=valid_api_key)
+
+        settings.QUESTION_CACHE_ALIAS = 'worker-b'
+        api_client.get(detail_url, HTTP_X_API_KEY=valid_api_key)
+        api_client.post(
+            reverse('answer-create', kwargs={'id': test_question.id}),
+            {'text': 'Fresh answer'}, format='json',
+            HTTP_X_API_KEY=valid_api_key)
+        api_client.cookies.clear()
+        settings.QUESTION_CACHE_ALIAS = 'worker-a'
+        response = api_client.get(detail_url, HTTP_X_API_KEY=valid_api_key)
+
+        assert cache_stats() == {'hits': 1, 'misses': 2}
+        assert [a['text'] for a in response.data['answers']] == ['Fresh answer']
+
+
+class TestConditionalGet:
+    def test_question_detail_not_modified(self, api_client, valid_api_key,
+                                          test_answer):
+        """Тест: If-None-Match с актуальным ETag даёт 304"""
+        url = reverse('question-detail',
+                      kwargs={'id': test_answer.question_id_id})
+        first = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        response = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                                  HTTP_IF_NONE_MATCH=first['ETag'])
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == first['ETag']
+        assert response.content == b''
+
+    def test_question_detail_etag_changes_on_new_answer(
+            self, api_client, valid_api_key, test_question):
+        """Тест: новый ответ меняет ETag вопроса"""
+        url = reverse('question-detail', kwargs={'id': test_question.id})
+        first = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        api_client.post(
+            reverse('answer-create', kwargs={'id': test_question.id}),
+            {'text': 'Fresh answer'},
+            format='json',
+            HTTP_X_API_KEY=valid_api_key
+        )
+        response = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                                  HTTP_IF_NONE_MATCH=first['ETag'])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != first['ETag']
+
+    def test_answer_detail_not_modified(self, api_client, valid_api_key,
+                                        test_answer):
+        """Тест: условный GET ответа по ETag и Last-Modified"""
+        url = reverse('answer-detail', kwargs={'answer_id': test_answer.id})
+        first = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        by_etag = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                                 HTTP_IF_NONE_MATCH=first['ETag'])
+        by_date = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                                 HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+        assert by_etag.status_code == status.HTTP_304_NOT_MODIFIED
+        assert by_date.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_question_list_not_modified(self, api_client, valid_api_key,
+                                        test_question):
+        """Тест: страница списка поддерживает If-None-Match"""
+        url = reverse('question-list')
+        first = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        same = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                              HTTP_IF_NONE_MATCH=first['ETag'])
+        Question.objects.create(text="Another question")
+        by_etag = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                                 HTTP_IF_NONE_MATCH=first['ETag'])
+
+        assert same.status_code == status.HTTP_304_NOT_MODIFIED
+        assert by_etag.status_code == status.HTTP_200_OK
+
+        # Новый ответ меняет answer_count уже показанной строки
+        api_client.post(reverse('answer-create', kwargs={'id': test_question.id}),
+                        {'text': 'Ответ'}, format='json',
+                        HTTP_X_API_KEY=valid_api_key)
+        after_answer = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                                      HTTP_IF_NONE_MATCH=by_etag['ETag'])
+        assert after_answer.status_code == status.HTTP_200_OK
+
+    def test_question_list_changes_on_delete(self, api_client, valid_api_key,
+                                             test_answer):
+        """Тест: удаление ответа или вопроса не даёт устаревший 304"""
+        url = reverse('question-list')
+        other = Question.objects.create(text="Another question")
+        first = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
+
+        api_client.delete(
+            reverse('answer-detail', kwargs={'answer_id': test_answer.id}),
+            HTTP_X_API_KEY=valid_api_key)
+        after_answer = api_client.get(url, HTTP_X_API_KEY=valid_api_key,
+                                      HTTP_IF_NONE_MATCH=first['ETag'])
+        api_client.delete(reverse('question-detail', kwargs={'id': other.id}),
+                          HTTP_X_API_KEY=valid_api_key)
+        after_question = api_client.get(
+            url, HTTP_X_API_KEY=valid_api_key,
+            HTTP_IF_NONE_MATCH=after_answer['ETag'])
+
+        assert 'Last-Modified' not in first
+        assert after_answer.status_code == status.HTTP_200_OK
+        assert after_question.status_code == status.HTTP_200_OK
+
+
 class TestAnswerCreateView:
     def test_create_answer_success(self, api_client, valid_api_key,
                                    test_question):
@@ -111,6 +581,7 @@ class TestAnswerCreateView:
         assert Answer.objects.count() == 1
         assert response.data['text'] == 'New test answer'
 
+    @pytest.mark.django_db(transaction=True)
     def test_create_answer_nonexistent_question(self, api_client,
                                                 valid_api_key):
         """Тест создания ответа для несуществующего вопроса"""
@@ -125,6 +596,110 @@ class TestAnswerCreateView:
         )
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert Answer.objects.count() == 0
+
+    def test_create_answer_without_reads(self, api_client, valid_api_key,
+                                         test_question):
+        """
+        Тест: при прогретом кэше создание ответа — INSERT, UPDATE счётчиков
+        и INSERT в журнал изменений, без SELECT
+        """
+        url = reverse('answer-create', kwargs={'id': test_question.id})
+        api_client.post(url, {'text': 'Warm up'}, format='json',
+                        HTTP_X_API_KEY=valid_api_key)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = api_client.post(url, {'text': 'New test answer'},
+                                       format='json',
+                                       HTTP_X_API_KEY=valid_api_key)
+
+        statements = [q['sql'].split()[0].upper() for q in ctx.captured_queries
+                      if 'SAVEPOINT' not in q['sql'].upper()]
+        assert response.status_code == status.HTTP_201_CREATED
+        assert statements == ['INSERT', 'UPDATE', 'INSERT']
+        assert Answer.objects.filter(question_id=test_question).count() == 2
+
+    def test_create_answer_updates_counters(self, api_client, valid_api_key,
+                                            test_question):
+        """Тест: создание ответа обновляет answer_count и last_answer_at"""
+        url = reverse('answer-create', kwargs={'id': test_question.id})
+
+        response = api_client.post(url, {'text': 'New test answer'},
+                                   format='json',
+                                   HTTP_X_API_KEY=valid_api_key)
+
+        test_question.refresh_from_db()
+        answer = Answer.objects.get(id=response.data['id'])
+        assert test_question.answer_count == 1
+        assert test_question.last_answer_at == answer.created_at
+
+
+class TestBulkCreateViews:
+    def test_bulk_create_questions(self, api_client, valid_api_key):
+        """Тест пакетного создания вопросов"""
+        url = reverse('question-bulk-create')
+        data = [{'text': f'Bulk question {i}'} for i in range(3)]
+
+        response = api_client.post(url, data, format='json',
+                                   HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Question.objects.count() == 3
+        assert [item['text'] for item in response.data] == [
+            item['text'] for item in data]
+        assert all(item['id'] for item in response.data)
+
+    def test_bulk_create_answers(self, api_client, valid_api_key,
+                                 test_question, django_assert_max_num_queries):
+        """Тест пакетного создания ответов"""
+        url = reverse('answer-bulk-create', kwargs={'id': test_question.id})
+        data = [{'text': f'Bulk answer {i}'} for i in range(50)]
+        get_system_user_id()
+
+        # Проверка вопроса, один INSERT ответов и один в журнал изменений —
+        # число запросов не зависит от пакета
+        with django_assert_max_num_queries(5):
+            response = api_client.post(url, data, format='json',
+                                       HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Answer.objects.filter(question_id=test_question).count() == 50
+
+    def test_bulk_create_reports_item_errors(self, api_client, valid_api_key,
+                                             test_question):
+        """Тест: ошибки возвращаются по индексам, ничего не сохраняется"""
+        url = reverse('answer-bulk-create', kwargs={'id': test_question.id})
+        data = [{'text': 'ok'}, {'text': ''}, {'text': 'ok too'}]
+
+        response = api_client.post(url, data, format='json',
+                                   HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert [item['index'] for item in response.data['errors']] == [1]
+        assert Answer.objects.count() == 0
+
+    def test_bulk_create_too_many_items(self, api_client, valid_api_key,
+                                        settings):
+        """Тест ограничения размера пакета"""
+        settings.BULK_MAX_ITEMS = 2
+        url = reverse('question-bulk-create')
+        data = [{'text': f'Bulk question {i}'} for i in range(3)]
+
+        response = api_client.post(url, data, format='json',
+                                   HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Question.objects.count() == 0
+
+    def test_bulk_create_answers_nonexistent_question(self, api_client,
+                                                      valid_api_key):
+        """Тест пакетного создания ответов для несуществующего вопроса"""
+        url = reverse('answer-bulk-create', kwargs={'id': 999})
+
+        response = api_client.post(url, [{'text': 'answer'}], format='json',
+                                   HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
 class TestAnswerDetailView:
@@ -148,6 +723,50 @@ class TestAnswerDetailView:
 
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert Answer.objects.count() == 0
+        question = Question.objects.get(id=test_answer.question_id_id)
+        assert question.answer_count == 0
+        assert question.last_answer_at is None
+
+    def test_delete_answer_twice(self, api_client, valid_api_key,
+                                 test_answer):
+        """Тест: повторное удаление — 404, счётчик и журнал не меняются"""
+        from core.models import Change
+        url = reverse('answer-detail', kwargs={'answer_id': test_answer.id})
+        Question.objects.filter(id=test_answer.question_id_id).update(
+            answer_count=2)
+
+        first = api_client.delete(url, HTTP_X_API_KEY=valid_api_key)
+        second = api_client.delete(url, HTTP_X_API_KEY=valid_api_key)
+
+        assert first.status_code == status.HTTP_204_NO_CONTENT
+        assert second.status_code == status.HTTP_404_NOT_FOUND
+        question = Question.objects.get(id=test_answer.question_id_id)
+        assert question.answer_count == 1
+        assert Change.objects.filter(
+            kind=Change.ANSWER, action=Change.DELETED).count() == 1
+
+    def test_delete_answer_race(self, test_answer, monkeypatch):
+        """Тест: ответ удалили между чтением и DELETE — счётчик не трогаем"""
+        from contextlib import contextmanager
+        from types import SimpleNamespace
+        from django.db import transaction
+        from core import deletion
+        from core.models import Change
+
+        @contextmanager
+        def concurrent_delete():
+            # Параллельный запрос успел удалить ответ первым
+            Answer.objects.filter(id=test_answer.id)._raw_delete('default')
+            with transaction.atomic():
+                yield
+
+        monkeypatch.setattr(deletion, 'transaction',
+                            SimpleNamespace(atomic=concurrent_delete))
+
+        assert deletion.delete_answer(test_answer.id) is None
+        question = Question.objects.get(id=test_answer.question_id_id)
+        assert question.answer_count == 1
+        assert not Change.objects.filter(action=Change.DELETED).exists()
 
 
 class TestApiKeyAuthentication:
@@ -173,4 +792,156 @@ class TestApiKeyAuthentication:
 
         response = api_client.get(url, HTTP_X_API_KEY=valid_api_key)
 
-        assert response.status_code == status.HTTP_200_OK
\ No newline at end of file
+        assert response.status_code == status.HTTP_200_OK
+
+class TestExportView:
+    @pytest.fixture
+    def thread(self, test_question, test_user):
+        Answer.objects.bulk_create(
+            Answer(question_id=test_question, user_id=test_user,
+                   text=f"Answer {i}")
+            for i in range(5)
+        )
+        return test_question
+
+    def test_export_ndjson(self, api_client, valid_api_key, test_answer):
+        """Тест потоковой выгрузки вопросов с ответами"""
+        Question.objects.create(text="Question without answers")
+        url = reverse('export')
+
+        response = api_client.get(url, {'format': 'ndjson'},
+                                  HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        assert [row['id'] for row in rows] == list(
+            Question.objects.order_by('id').values_list('id', flat=True))
+        assert rows[0]['answers'][0]['text'] == test_answer.text
+        assert rows[1]['answers'] == []
+
+    def test_export_streams_answers_by_cursor(self, api_client, valid_api_key,
+                                              thread, settings):
+        """Тест: ответы читаются своим курсором, вывод — как у сериализаторов"""
+        from django.utils import timezone
+        from core.serializers import AnswerSerializer, QuestionSerializer
+        settings.EXPORT_CHUNK_SIZE = 2
+        settings.EXPORT_BUFFER_SIZE = 100
+        hidden = Question.objects.create(text="Удаляется в фоне")
+        Answer.objects.create(question_id=hidden, text="Скрытый ответ",
+                              user_id_id=get_system_user_id())
+        Question.objects.filter(id=hidden.id).update(
+            purge_started_at=timezone.now())
+        empty = Question.objects.create(text="Question without answers")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = api_client.get(reverse('export'), {'format': 'ndjson'},
+                                      HTTP_X_API_KEY=valid_api_key)
+            chunks = list(response.streaming_content)
+
+        assert len(ctx.captured_queries) == 2
+        assert len(chunks) > 1
+        lines = b''.join(chunks).decode().splitlines()
+        expected = []
+        for question in (thread, empty):
+            row = dict(QuestionSerializer(
+                Question.objects.get(id=question.id)).data)
+            row['answers'] = AnswerSerializer(
+                question.answer_set.order_by('created_at', 'id'),
+                many=True).data
+            expected.append(json.dumps(row, ensure_ascii=False))
+        assert lines == expected
+
+    def test_export_async_under_asgi(self, valid_api_key, thread):
+        """Тест: под ASGI выгрузка — асинхронный поток с тем же содержимым"""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient, Client
+
+        async def export():
+            response = await AsyncClient().get(
+                reverse('export'), {'format': 'ndjson'},
+                headers={'X-API-KEY': valid_api_key})
+            assert response.is_async
+            return b''.join([chunk async for chunk in
+                             response.streaming_content])
+
+        body = async_to_sync(export)()
+        sync = Client().get(reverse('export'), {'format': 'ndjson'},
+                            HTTP_X_API_KEY=valid_api_key)
+
+        assert body == b''.join(sync.streaming_content)
+        assert len(json.loads(body)['answers']) == 5
+
+    def test_export_requires_api_key(self, api_client):
+        """Тест выгрузки без API ключа"""
+        url = reverse('export')
+
+        response = api_client.get(url, {'format': 'ndjson'})
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestSearchView:
+    def test_search_questions_and_answers(self, api_client, valid_api_key,
+                                          test_question):
+        """Тест поиска по тексту вопросов и ответов"""
+        other = Question.objects.create(text="Как настроить Docker compose?")
+        api_client.post(
+            reverse('answer-create', kwargs={'id': test_question.id}),
+            {'text': 'Используйте docker compose up'},
+            format='json',
+            HTTP_X_API_KEY=valid_api_key
+        )
+        url = reverse('search')
+
+        response = api_client.get(url, {'q': 'docker compose'},
+                                  HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_200_OK
+        found = {(r['type'], r['question_id'])
+                 for r in response.data['results']}
+        assert found == {('question', other.id),
+                         ('answer', test_question.id)}
+        assert response.data['next'] is None
+
+    def test_search_paginated(self, api_client, valid_api_key):
+        """Тест постраничной выдачи результатов поиска"""
+        Question.objects.bulk_create(
+            Question(text=f"needle {i}") for i in range(3))
+        url = reverse('search')
+
+        first = api_client.get(url, {'q': 'needle', 'page_size': 2},
+                               HTTP_X_API_KEY=valid_api_key)
+        second = api_client.get(url, {'q': 'needle', 'page_size': 2,
+                                      'page': first.data['next']},
+                                HTTP_X_API_KEY=valid_api_key)
+
+        assert len(first.data['results']) == 2
+        assert len(second.data['results']) == 1
+        assert second.data['next'] is None
+
+    def test_search_requires_query(self, api_client, valid_api_key):
+        """Тест поиска без параметра q"""
+        response = api_client.get(reverse('search'),
+                                  HTTP_X_API_KEY=valid_api_key)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+
+class TestRecomputeAnswerStats:
+    def test_recompute_answer_stats(self, test_answer, test_question):
+        """Тест пересчёта счётчиков командой recompute_answer_stats"""
+        Question.objects.update(answer_count=0, last_answer_at=None)
+        empty = Question.objects.create(text="No answers")
+
+        call_command('recompute_answer_stats', batch_size=1, stdout=io.StringIO())
+
+        test_question.refresh_from_db()
+        empty.refresh_from_db()
+        assert test_question.answer_count == 1
+        assert test_question.last_answer_at == test_answer.created_at
+        assert empty.answer_count == 0
+        assert empty.last_answer_at is None